@@ -6,7 +6,12 @@ from datetime import datetime, timedelta
 
 from app import db
 from models import AdminUser, TelegramUser, ChessGame, UserActivity, SystemStats
-from utils import get_system_stats, get_user_stats, cleanup_old_data
+from utils import get_system_stats, get_user_stats, cleanup_old_data, get_opening_stats
+from utils import get_activity_histogram, HISTOGRAM_GRANULARITIES
+from telemetry import get_telemetry_writer
+from user_cache import get_user_cache
+from stats_counters import get_stats_counters
+from update_dispatcher import get_update_dispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -191,37 +196,81 @@ def realtime_stats():
 @admin_bp.route('/api/user-activity-chart')
 @login_required
 def user_activity_chart():
-    """Données pour le graphique d'activité utilisateur"""
+    """
+    Données pour le graphique d'activité utilisateur
+    
+    Paramètres: hours (défaut 24) ou days, et granularity (minute, hour
+    ou day; par défaut hour jusqu'à 2 jours, day au-delà).
+    """
     try:
-        # Activité par heure sur les dernières 24h
-        now = datetime.utcnow()
-        hours = []
-        activity_counts = []
+        days = request.args.get('days', type=int)
+        hours = request.args.get('hours', 24, type=int)
+        period = timedelta(days=days) if days else timedelta(hours=hours)
+        granularity = request.args.get('granularity') or ('day' if period > timedelta(days=2) else 'hour')
         
-        for i in range(24):
-            hour_start = now - timedelta(hours=i+1)
-            hour_end = now - timedelta(hours=i)
-            
-            count = UserActivity.query\
-                .filter(UserActivity.created_at >= hour_start)\
-                .filter(UserActivity.created_at < hour_end)\
-                .count()
-            
-            hours.append(hour_start.strftime('%H:00'))
-            activity_counts.append(count)
+        if granularity not in HISTOGRAM_GRANULARITIES:
+            return jsonify({'error': 'Granularité invalide'}), 400
+        if period > timedelta(days=366) or (granularity == 'minute' and period > timedelta(days=1)):
+            return jsonify({'error': 'Période trop longue pour cette granularité'}), 400
         
-        hours.reverse()
-        activity_counts.reverse()
+        now = datetime.utcnow()
+        histogram = get_activity_histogram(now - period, now, granularity)
+        
+        if granularity == 'day':
+            label_format = '%d/%m'
+        elif period > timedelta(days=1):
+            label_format = '%d/%m %H:00'
+        else:
+            label_format = '%H:%M' if granularity == 'minute' else '%H:00'
         
         return jsonify({
-            'labels': hours,
-            'data': activity_counts
+            'labels': [bucket.strftime(label_format) for bucket, _ in histogram],
+            'data': [count for _, count in histogram]
         })
         
     except Exception as e:
         logger.error(f"Erreur activity chart: {e}")
         return jsonify({'error': str(e)}), 500
 
+@admin_bp.route('/api/opening-stats')
+@login_required
+def opening_stats():
+    """Répartition des ouvertures jouées"""
+    try:
+        limit = request.args.get('limit', 1000, type=int)
+        return jsonify(get_opening_stats(limit))
+        
+    except Exception as e:
+        logger.error(f"Erreur opening stats: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/api/performance')
+@login_required
+def performance_stats():
+    """Métriques des moteurs, des caches et du service de rendu"""
+    try:
+        # Import lazy pour éviter la référence circulaire
+        from bot import chess_bot
+        
+        return jsonify({
+            'engine_pool': chess_bot.chess_engine.engine_pool.stats(),
+            'analysis_cache': chess_bot.chess_engine.analysis_cache.stats(),
+            'keyboard_cache': chess_bot.chess_engine.keyboard_cache.stats(),
+            'render_cache': chess_bot.board_renderer.cache.stats(),
+            'render_service': chess_bot.board_renderer.render_service.stats(),
+            'telegram_files': chess_bot.file_cache.stats(),
+            'live_games': chess_bot.live_games.stats(),
+            'send_scheduler': chess_bot.send_scheduler.stats(),
+            'telemetry': get_telemetry_writer().stats(),
+            'user_cache': get_user_cache().stats(),
+            'system_stats': get_stats_counters().stats(),
+            'update_dispatcher': get_update_dispatcher().stats()
+        })
+        
+    except Exception as e:
+        logger.error(f"Erreur performance stats: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @admin_bp.route('/api/cleanup', methods=['POST'])
 @login_required
 def api_cleanup():
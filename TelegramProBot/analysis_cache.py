@@ -0,0 +1,141 @@
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+
+import chess
+import chess.polyglot
+
+from app import app, db
+from models import PositionAnalysis
+
+logger = logging.getLogger(__name__)
+
+class AnalysisCache:
+    """Cache LRU des analyses Stockfish, indexé par position (transpositions incluses)"""
+
+    def __init__(self, max_entries: int = 10000, persistent: bool = False):
+        self.max_entries = max_entries
+        self.persistent = persistent
+
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def position_key(board: chess.Board) -> str:
+        """
+        Clé normalisée de la position
+
+        Le hash Zobrist Polyglot couvre le placement des pièces, le trait,
+        les droits de roque et la prise en passant, mais ignore les compteurs
+        de coups: deux ordres de coups menant à la même position partagent
+        donc la même entrée.
+        """
+        return f"{chess.polyglot.zobrist_hash(board):016x}"
+
+    def get(self, board: chess.Board, depth: int) -> Optional[Dict]:
+        """Retourne une analyse d'une profondeur au moins égale à celle demandée"""
+        key = self.position_key(board)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['depth'] >= depth:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry)
+
+        if self.persistent:
+            entry = self._load(key, depth)
+            if entry is not None:
+                self._remember(key, entry)
+                with self._lock:
+                    self.hits += 1
+                return dict(entry)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, board: chess.Board, analysis: Dict):
+        """Enregistre une analyse réussie si elle est plus profonde que l'existante"""
+        if not analysis.get('success'):
+            return
+
+        key = self.position_key(board)
+        entry = {
+            'success': True,
+            'evaluation': analysis['evaluation'],
+            'best_move': analysis['best_move'],
+            'depth': analysis['depth']
+        }
+
+        if self._remember(key, entry) and self.persistent:
+            self._store(key, board, entry)
+
+    def _remember(self, key: str, entry: Dict) -> bool:
+        """Insère en mémoire; retourne False si une analyse plus profonde existe"""
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None and existing['depth'] > entry['depth']:
+                self._entries.move_to_end(key)
+                return False
+
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return True
+
+    def _load(self, key: str, depth: int) -> Optional[Dict]:
+        """Lit le niveau persistant"""
+        try:
+            with app.app_context():
+                row = PositionAnalysis.query.filter_by(position_key=key).first()
+                if row is None or row.depth < depth:
+                    return None
+
+                return {
+                    'success': True,
+                    'evaluation': row.evaluation,
+                    'best_move': row.best_move,
+                    'depth': row.depth
+                }
+        except Exception as e:
+            logger.error(f"Erreur lecture cache d'analyse: {e}")
+            return None
+
+    def _store(self, key: str, board: chess.Board, entry: Dict):
+        """Écrit dans le niveau persistant"""
+        with app.app_context():
+            try:
+                row = PositionAnalysis.query.filter_by(position_key=key).first()
+                if row is None:
+                    row = PositionAnalysis(position_key=key, epd=board.epd())
+                    db.session.add(row)
+                elif row.depth > entry['depth']:
+                    return
+
+                row.evaluation = entry['evaluation']
+                row.best_move = entry['best_move']
+                row.depth = entry['depth']
+                row.updated_at = datetime.utcnow()
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Erreur écriture cache d'analyse: {e}")
+                db.session.rollback()
+
+    def stats(self) -> Dict:
+        """Statistiques du cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total * 100) if total > 0 else 0
+            }
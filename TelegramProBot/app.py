@@ -34,12 +34,61 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_pre_ping": True,
 }
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+app.config["DB_AUTO_MIGRATE"] = os.environ.get("DB_AUTO_MIGRATE", "false").lower() == "true"
+app.config["DB_SCHEMA_CHECK"] = os.environ.get("DB_SCHEMA_CHECK", "true").lower() == "true"
 
 # Configuration du bot Telegram
 app.config["TELEGRAM_BOT_TOKEN"] = os.environ.get("TELEGRAM_BOT_TOKEN")
 app.config["OWNER_ID"] = int(os.environ.get("OWNER_ID", "0"))
 app.config["OWNER_USERNAME"] = os.environ.get("OWNER_USERNAME", "admin")
 app.config["WEBHOOK_URL"] = os.environ.get("WEBHOOK_URL", "")
+app.config["WEBHOOK_QUEUE_SIZE"] = int(os.environ.get("WEBHOOK_QUEUE_SIZE", "1000"))
+app.config["WEBHOOK_WORKERS"] = int(os.environ.get("WEBHOOK_WORKERS", "8"))
+app.config["WEBHOOK_LANE_SIZE"] = int(os.environ.get("WEBHOOK_LANE_SIZE", "20"))
+app.config["WEBHOOK_LANE_IDLE_TIMEOUT"] = int(os.environ.get("WEBHOOK_LANE_IDLE_TIMEOUT", "60"))
+app.config["WEBHOOK_DEDUP_WINDOW"] = int(os.environ.get("WEBHOOK_DEDUP_WINDOW", "600"))
+app.config["WEBHOOK_DEDUP_MAX_ENTRIES"] = int(os.environ.get("WEBHOOK_DEDUP_MAX_ENTRIES", "100000"))
+app.config["TELEGRAM_API_BASE_URL"] = os.environ.get("TELEGRAM_API_BASE_URL", "")
+app.config["TELEGRAM_GLOBAL_RATE"] = float(os.environ.get("TELEGRAM_GLOBAL_RATE", "30"))
+app.config["TELEGRAM_CHAT_RATE"] = float(os.environ.get("TELEGRAM_CHAT_RATE", "1"))
+app.config["TELEGRAM_CHAT_BURST"] = int(os.environ.get("TELEGRAM_CHAT_BURST", "3"))
+app.config["TELEGRAM_GROUP_RATE_PER_MINUTE"] = float(os.environ.get("TELEGRAM_GROUP_RATE_PER_MINUTE", "20"))
+app.config["TELEGRAM_MAX_RETRIES"] = int(os.environ.get("TELEGRAM_MAX_RETRIES", "3"))
+
+# Configuration du moteur d'échecs
+app.config["ANALYSIS_SKILL_LEVEL"] = int(os.environ.get("ANALYSIS_SKILL_LEVEL", "20"))
+app.config["ENGINE_POOL_SIZE"] = int(os.environ.get("ENGINE_POOL_SIZE", "2"))
+app.config["ENGINE_CHECKOUT_TIMEOUT"] = float(os.environ.get("ENGINE_CHECKOUT_TIMEOUT", "10"))
+app.config["ENGINE_HEALTH_CHECK_INTERVAL"] = int(os.environ.get("ENGINE_HEALTH_CHECK_INTERVAL", "60"))
+app.config["ANALYSIS_CACHE_SIZE"] = int(os.environ.get("ANALYSIS_CACHE_SIZE", "10000"))
+app.config["ANALYSIS_CACHE_PERSISTENT"] = os.environ.get("ANALYSIS_CACHE_PERSISTENT", "false").lower() == "true"
+app.config["OPENING_BOOK_PATH"] = os.environ.get("OPENING_BOOK_PATH", "")
+app.config["OPENING_BOOK_MIN_PLIES"] = int(os.environ.get("OPENING_BOOK_MIN_PLIES", "8"))
+app.config["OPENING_BOOK_MAX_PLIES"] = int(os.environ.get("OPENING_BOOK_MAX_PLIES", "12"))
+app.config["ECO_DATA_PATH"] = os.environ.get("ECO_DATA_PATH", "")
+app.config["KEYBOARD_CACHE_SIZE"] = int(os.environ.get("KEYBOARD_CACHE_SIZE", "5000"))
+
+# Configuration du rendu
+app.config["RENDER_CACHE_MAX_BYTES"] = int(os.environ.get("RENDER_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+app.config["RENDER_CACHE_DIR"] = os.environ.get("RENDER_CACHE_DIR", "")
+app.config["TELEGRAM_FILE_CACHE_SIZE"] = int(os.environ.get("TELEGRAM_FILE_CACHE_SIZE", "50000"))
+app.config["RENDER_WORKERS"] = int(os.environ.get("RENDER_WORKERS", "2"))
+app.config["RENDER_BACKEND"] = os.environ.get("RENDER_BACKEND", "svg")
+app.config["RENDER_IMAGE_FORMAT"] = os.environ.get("RENDER_IMAGE_FORMAT", "PNG")
+app.config["GAME_MESSAGE_MODE"] = os.environ.get("GAME_MESSAGE_MODE", "edit")
+
+# Configuration de la persistance
+app.config["LIVE_GAMES_MAX"] = int(os.environ.get("LIVE_GAMES_MAX", "10000"))
+app.config["LIVE_GAMES_IDLE_TIMEOUT"] = int(os.environ.get("LIVE_GAMES_IDLE_TIMEOUT", "3600"))
+app.config["LIVE_GAMES_FLUSH_INTERVAL"] = float(os.environ.get("LIVE_GAMES_FLUSH_INTERVAL", "1.0"))
+app.config["LIVE_GAMES_FLUSH_BATCH"] = int(os.environ.get("LIVE_GAMES_FLUSH_BATCH", "200"))
+app.config["TELEMETRY_FLUSH_INTERVAL_MS"] = int(os.environ.get("TELEMETRY_FLUSH_INTERVAL_MS", "500"))
+app.config["TELEMETRY_BATCH_SIZE"] = int(os.environ.get("TELEMETRY_BATCH_SIZE", "500"))
+app.config["TELEMETRY_MAX_QUEUE"] = int(os.environ.get("TELEMETRY_MAX_QUEUE", "10000"))
+app.config["TELEMETRY_OVERFLOW_POLICY"] = os.environ.get("TELEMETRY_OVERFLOW_POLICY", "drop_oldest")
+app.config["USER_CACHE_SIZE"] = int(os.environ.get("USER_CACHE_SIZE", "100000"))
+app.config["USER_ACTIVITY_FLUSH_INTERVAL"] = int(os.environ.get("USER_ACTIVITY_FLUSH_INTERVAL", "30"))
+app.config["STATS_RECONCILE_INTERVAL"] = int(os.environ.get("STATS_RECONCILE_INTERVAL", "300"))
 
 # Initialiser les extensions
 db.init_app(app)
@@ -53,17 +102,27 @@ def load_user(user_id):
     from models import AdminUser
     return AdminUser.query.get(int(user_id))
 
-# Créer les tables et initialiser les données
+# Vérifier le schéma et initialiser les données
+# (les migrations s'appliquent avec `python migrations.py upgrade`, pas à chaque démarrage;
+# les outils qui importent l'application pour migrer désactivent DB_SCHEMA_CHECK)
 with app.app_context():
     import models  # noqa: F401
-    db.create_all()
+    from migrations import pending_migrations, upgrade
+    
+    pending = pending_migrations(db.engine)
+    if pending and app.config["DB_AUTO_MIGRATE"]:
+        upgrade(db.engine)
+        pending = []
+    elif pending and app.config["DB_SCHEMA_CHECK"]:
+        # Les modèles référencent des colonnes absentes: démarrer casserait chaque requête
+        versions = ', '.join(migration.version for migration in pending)
+        raise RuntimeError(f"Migrations en attente ({versions}): lancez `python migrations.py upgrade`")
     
-    # Créer l'utilisateur admin par défaut
+    # Créer l'utilisateur admin par défaut (une fois le schéma à jour)
     from models import AdminUser
     from werkzeug.security import generate_password_hash
     
-    admin = AdminUser.query.filter_by(username=app.config["OWNER_USERNAME"]).first()
-    if not admin:
+    if not pending and not AdminUser.query.filter_by(username=app.config["OWNER_USERNAME"]).first():
         admin = AdminUser(
             username=app.config["OWNER_USERNAME"],
             telegram_id=app.config["OWNER_ID"],
@@ -1,14 +1,19 @@
 import io
 import chess
-import chess.svg
+import asyncio
 import logging
 from typing import Optional
 
+from render_cache import RenderCache
+from render_service import RenderService
+from board_template import get_template
+from raster_renderer import RasterBoardRenderer, PIL_AVAILABLE
+
 # Lazy import for cairosvg to handle missing Cairo dependencies
 try:
     import cairosvg
     CAIRO_AVAILABLE = True
-except ImportError:
+except (ImportError, OSError):
     CAIRO_AVAILABLE = False
     cairosvg = None
 
@@ -17,11 +22,66 @@ logger = logging.getLogger(__name__)
 class BoardRenderer:
     """Générateur d'images d'échiquier avec étiquettes françaises"""
     
-    def __init__(self, size: int = 400):
+    def __init__(self, size: int = 400, cache: Optional[RenderCache] = None,
+                 render_service: Optional[RenderService] = None,
+                 backend: str = 'svg', image_format: str = 'PNG'):
         self.size = size
+        self.cache = cache
+        self.render_service = render_service
+        self.backend = backend
+        self.image_format = image_format
+        self._raster: Optional[RasterBoardRenderer] = None
+        
+        if backend == 'raster' and not PIL_AVAILABLE:
+            logger.warning("RENDER_BACKEND=raster mais Pillow n'est pas installé: rendu SVG utilisé")
+    
+    def _resolve_backend(self, backend: Optional[str] = None) -> str:
+        """
+        Choisit le moteur de rendu effectif
+        
+        'svg' passe par cairosvg, 'raster' compose directement les sprites
+        avec Pillow. Si le moteur demandé n'est pas installé, l'autre est
+        utilisé à sa place.
+        """
+        backend = backend or self.backend
+        if backend == 'raster' and not PIL_AVAILABLE:
+            return 'svg'
+        if backend == 'svg' and not CAIRO_AVAILABLE and PIL_AVAILABLE:
+            return 'raster'
+        return backend
+    
+    @property
+    def raster(self) -> RasterBoardRenderer:
+        """Moteur bitmap, créé au premier usage"""
+        if self._raster is None:
+            self._raster = RasterBoardRenderer(self.size)
+        return self._raster
+    
+    def render_key(self, board: chess.Board, orientation: chess.Color = chess.WHITE,
+                   lastmove: Optional[chess.Move] = None, backend: Optional[str] = None) -> str:
+        """
+        Clé de cache d'un rendu d'échiquier
+        
+        Elle couvre tout ce qui change l'image: placement des pièces, trait,
+        échec, numéro de coup (affiché dans le bandeau), orientation,
+        dernier coup surligné, taille et moteur de rendu.
+        """
+        backend = self._resolve_backend(backend)
+        return RenderCache.make_key(
+            'board',
+            backend,
+            self.image_format if backend == 'raster' else 'PNG',
+            board.board_fen(),
+            'w' if board.turn == chess.WHITE else 'b',
+            int(board.is_check()),
+            board.fullmove_number,
+            'w' if orientation == chess.WHITE else 'b',
+            lastmove.uci() if lastmove else '-',
+            self.size
+        )
     
     def render_board(self, fen: str, orientation: chess.Color = chess.WHITE, 
-                    highlight_moves: Optional[list] = None) -> io.BytesIO:
+                    highlight_moves: Optional[list] = None, backend: Optional[str] = None) -> io.BytesIO:
         """
         Génère une image PNG de l'échiquier
         
@@ -29,100 +89,101 @@ class BoardRenderer:
             fen: Position FEN
             orientation: Orientation de l'échiquier
             highlight_moves: Coups à surligner
+            backend: Moteur de rendu ('svg' ou 'raster', par défaut celui configuré)
             
         Returns:
             io.BytesIO: Buffer contenant l'image PNG
         """
         try:
-            board = chess.Board(fen)
-            
-            # Générer le SVG
-            svg_data = chess.svg.board(
-                board=board,
-                orientation=orientation,
-                coordinates=True,
-                size=self.size,
-                lastmove=highlight_moves[-1] if highlight_moves else None
-            )
-            
-            # Ajouter les étiquettes françaises
-            svg_with_labels = self._add_french_labels(svg_data, board)
+            backend = self._resolve_backend(backend)
+            board, lastmove, cache_key, cached = self._prepare_board(fen, orientation, highlight_moves, backend)
+            if cached is not None:
+                return io.BytesIO(cached)
             
-            # Convertir en PNG (si Cairo disponible)
-            if CAIRO_AVAILABLE:
+            if backend == 'raster':
+                # Composition directe des sprites, sans aller-retour SVG
+                png_data = self.raster.render(board, orientation, lastmove, self.image_format)
+            elif CAIRO_AVAILABLE:
+                svg_with_labels = self._board_svg(board, orientation, lastmove)
                 png_data = cairosvg.svg2png(
                     bytestring=svg_with_labels.encode('utf-8'),
                     output_width=self.size,
                     output_height=self.size + 80  # Espace pour les étiquettes
                 )
             else:
-                # Fallback: retourner le SVG comme bytes
-                png_data = svg_with_labels.encode('utf-8')
+                raise RuntimeError("Aucun moteur de rendu disponible (Cairo ou Pillow requis)")
             
-            if png_data:
-                png_buffer = io.BytesIO(png_data)
-                png_buffer.seek(0)
-                return png_buffer
-            else:
-                raise ValueError("Erreur lors de la conversion SVG vers PNG")
+            return self._finish_board(png_data, cache_key)
                 
         except Exception as e:
             logger.error(f"Erreur rendu échiquier: {e}")
             return self._create_error_image()
     
-    def _add_french_labels(self, svg_data: str, board: chess.Board) -> str:
-        """Ajoute des étiquettes françaises au SVG"""
+    async def render_board_async(self, fen: str, orientation: chess.Color = chess.WHITE,
+                                 highlight_moves: Optional[list] = None,
+                                 backend: Optional[str] = None) -> io.BytesIO:
+        """Version asynchrone de render_board, rastérisée par le service de rendu"""
+        backend = self._resolve_backend(backend)
+        if backend == 'raster':
+            return await asyncio.to_thread(self.render_board, fen, orientation, highlight_moves, backend)
+        if self.render_service is None or not CAIRO_AVAILABLE:
+            return self.render_board(fen, orientation, highlight_moves, backend)
+        
         try:
-            # Informations de la position
-            turn = "Blancs" if board.turn == chess.WHITE else "Noirs"
-            check_status = " (Échec !)" if board.is_check() else ""
-            move_count = board.fullmove_number
-            
-            # Extraire les dimensions
-            width = self.size
-            new_height = self.size + 80
-            
-            # Modifier la hauteur du SVG
-            svg_modified = svg_data.replace(
-                f'height="{self.size}"',
-                f'height="{new_height}"'
-            )
-            
-            # Ajouter le bandeau d'informations
-            info_band = f'''
-            <rect x="0" y="0" width="{width}" height="80" fill="#2c3e50" stroke="#34495e" stroke-width="1"/>
-            <text x="10" y="25" font-family="Arial, sans-serif" font-size="14" font-weight="bold" fill="#ecf0f1">
-                Tour: {turn}{check_status} | Coup: {move_count}
-            </text>
-            <text x="10" y="45" font-family="Arial, sans-serif" font-size="12" fill="#bdc3c7">
-                ♔ Roi  ♕ Dame  ♖ Tour  ♗ Fou  ♘ Cavalier  ♙ Pion
-            </text>
-            <text x="10" y="65" font-family="Arial, sans-serif" font-size="12" fill="#bdc3c7">
-                Bot d'Échecs Professionnel - Powered by Stockfish
-            </text>
-            '''
+            board, lastmove, cache_key, cached = self._prepare_board(fen, orientation, highlight_moves, backend)
+            if cached is not None:
+                return io.BytesIO(cached)
             
-            # Décaler le plateau vers le bas
-            plateau_shift = 80
-            svg_start = svg_modified.find('>') + 1
-            svg_content = svg_modified[svg_start:]
+            svg_with_labels = self._board_svg(board, orientation, lastmove)
+            png_data = await self.render_service.rasterize(svg_with_labels, self.size, self.size + 80)
             
-            # Wrapper le contenu dans un groupe décalé
-            shifted_content = f'<g transform="translate(0, {plateau_shift})">{svg_content}</g>'
-            
-            # Reconstruire le SVG
-            svg_header = svg_modified[:svg_start]
-            final_svg = svg_header + info_band + shifted_content
-            
-            # Fermer proprement
-            if not final_svg.endswith('</svg>'):
-                final_svg = final_svg.rstrip('</g></svg>') + '</g></svg>'
-            
-            return final_svg
+            return self._finish_board(png_data, cache_key)
             
         except Exception as e:
-            logger.error(f"Erreur ajout étiquettes: {e}")
-            return svg_data  # Retourner le SVG original en cas d'erreur
+            logger.error(f"Erreur rendu échiquier: {e}")
+            return self._create_error_image()
+    
+    def _prepare_board(self, fen: str, orientation: chess.Color, highlight_moves: Optional[list],
+                       backend: str):
+        """Analyse la position et consulte le cache de rendu"""
+        board = chess.Board(fen)
+        lastmove = highlight_moves[-1] if highlight_moves else None
+        if isinstance(lastmove, str):
+            lastmove = chess.Move.from_uci(lastmove)
+        
+        # Position déjà rendue: aucune génération ni rastérisation
+        cache_key = None
+        cached = None
+        if self.cache is not None:
+            cache_key = self.render_key(board, orientation, lastmove, backend)
+            cached = self.cache.get(cache_key)
+        
+        return board, lastmove, cache_key, cached
+    
+    def _board_svg(self, board: chess.Board, orientation: chess.Color,
+                   lastmove: Optional[chess.Move]) -> str:
+        """SVG complet de l'échiquier avec le bandeau français"""
+        turn = "Blancs" if board.turn == chess.WHITE else "Noirs"
+        check_status = " (Échec !)" if board.is_check() else ""
+        
+        return get_template(self.size, orientation, 'board').render(
+            board,
+            [(25, 'font-size="14" font-weight="bold" fill="#ecf0f1"',
+              f"Tour: {turn}{check_status} | Coup: {board.fullmove_number}")],
+            lastmove=lastmove
+        )
+    
+    def _finish_board(self, png_data: bytes, cache_key: Optional[str]) -> io.BytesIO:
+        """Met en cache et emballe le PNG produit"""
+        if not png_data:
+            raise ValueError("Erreur lors de la conversion SVG vers PNG")
+        
+        if cache_key:
+            self.cache.put(cache_key, png_data)
+        
+        png_buffer = io.BytesIO(png_data)
+        png_buffer.seek(0)
+        return png_buffer
     
     def _create_error_image(self) -> io.BytesIO:
         """Crée une image d'erreur"""
@@ -145,29 +206,19 @@ class BoardRenderer:
         except Exception:
             pass
         
+        if PIL_AVAILABLE:
+            try:
+                return io.BytesIO(self.raster.render_error("Erreur de rendu"))
+            except Exception:
+                pass
+        
         # Fallback: image vide
         return io.BytesIO(b"")
     
     def render_analysis(self, fen: str, best_move: str, evaluation: str) -> io.BytesIO:
         """Génère une image avec analyse de position"""
         try:
-            board = chess.Board(fen)
-            move = chess.Move.from_uci(best_move) if best_move != "N/A" else None
-            
-            # Créer le SVG avec surlignage du meilleur coup
-            arrows = []
-            if move:
-                arrows = [chess.svg.Arrow(move.from_square, move.to_square, color="#0080ff")]
-            
-            svg_data = chess.svg.board(
-                board=board,
-                coordinates=True,
-                size=self.size,
-                arrows=arrows
-            )
-            
-            # Ajouter les informations d'analyse
-            svg_with_analysis = self._add_analysis_info(svg_data, evaluation, best_move)
+            svg_with_analysis = self._analysis_svg(fen, best_move, evaluation)
             
             # Convertir en PNG
             png_data = cairosvg.svg2png(
@@ -187,46 +238,39 @@ class BoardRenderer:
             logger.error(f"Erreur rendu analyse: {e}")
             return self._create_error_image()
     
-    def _add_analysis_info(self, svg_data: str, evaluation: str, best_move: str) -> str:
-        """Ajoute les informations d'analyse au SVG"""
+    async def render_analysis_async(self, fen: str, best_move: str, evaluation: str) -> io.BytesIO:
+        """Version asynchrone de render_analysis, rastérisée par le service de rendu"""
+        if self.render_service is None:
+            return self.render_analysis(fen, best_move, evaluation)
+        
         try:
-            width = self.size
-            new_height = self.size + 100
-            
-            svg_modified = svg_data.replace(
-                f'height="{self.size}"',
-                f'height="{new_height}"'
-            )
-            
-            # Bandeau d'analyse
-            analysis_band = f'''
-            <rect x="0" y="0" width="{width}" height="100" fill="#34495e" stroke="#2c3e50" stroke-width="2"/>
-            <text x="10" y="25" font-family="Arial, sans-serif" font-size="16" font-weight="bold" fill="#e67e22">
-                📊 ANALYSE STOCKFISH
-            </text>
-            <text x="10" y="50" font-family="Arial, sans-serif" font-size="14" fill="#ecf0f1">
-                Évaluation: {evaluation}
-            </text>
-            <text x="10" y="75" font-family="Arial, sans-serif" font-size="14" fill="#ecf0f1">
-                Meilleur coup: {best_move}
-            </text>
-            '''
-            
-            # Décaler le plateau
-            plateau_shift = 100
-            svg_start = svg_modified.find('>') + 1
-            svg_content = svg_modified[svg_start:]
-            
-            shifted_content = f'<g transform="translate(0, {plateau_shift})">{svg_content}</g>'
-            
-            svg_header = svg_modified[:svg_start]
-            final_svg = svg_header + analysis_band + shifted_content
-            
-            if not final_svg.endswith('</svg>'):
-                final_svg = final_svg.rstrip('</g></svg>') + '</g></svg>'
-            
-            return final_svg
+            svg_with_analysis = self._analysis_svg(fen, best_move, evaluation)
+            png_data = await self.render_service.rasterize(svg_with_analysis, self.size, self.size + 100)
             
+            if png_data:
+                png_buffer = io.BytesIO(png_data)
+                png_buffer.seek(0)
+                return png_buffer
+            else:
+                return self._create_error_image()
+                
         except Exception as e:
-            logger.error(f"Erreur ajout analyse: {e}")
-            return svg_data
+            logger.error(f"Erreur rendu analyse: {e}")
+            return self._create_error_image()
+    
+    def _analysis_svg(self, fen: str, best_move: str, evaluation: str) -> str:
+        """SVG de l'échiquier avec flèche du meilleur coup et bandeau d'analyse"""
+        board = chess.Board(fen)
+        move = chess.Move.from_uci(best_move) if best_move != "N/A" else None
+        
+        # Surlignage du meilleur coup
+        arrows = []
+        if move:
+            arrows = [(move.from_square, move.to_square, "#0080ff")]
+        
+        return get_template(self.size, chess.WHITE, 'analysis').render(
+            board,
+            [(50, 'font-size="14" fill="#ecf0f1"', f"Évaluation: {evaluation}"),
+             (75, 'font-size="14" fill="#ecf0f1"', f"Meilleur coup: {best_move}")],
+            arrows=arrows
+        )
@@ -0,0 +1,196 @@
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+import chess
+import chess.svg
+
+# Géométrie du plateau produit par chess.svg avec coordonnées (unités du viewBox)
+SQUARE_SIZE = chess.svg.SQUARE_SIZE
+BOARD_OFFSET = 15
+BOARD_VIEWBOX = 2 * BOARD_OFFSET + 8 * SQUARE_SIZE
+
+LASTMOVE_COLORS = {
+    True: chess.svg.DEFAULT_COLORS['square light lastmove'],
+    False: chess.svg.DEFAULT_COLORS['square dark lastmove'],
+}
+
+BAND_HEIGHTS = {
+    'board': 80,
+    'analysis': 100,
+}
+
+class BoardTemplate:
+    """
+    Squelette SVG précompilé pour une taille, une orientation et un bandeau
+
+    Le fond du plateau, les coordonnées, les définitions des pièces et la
+    partie fixe du bandeau sont générés une seule fois; chaque rendu
+    n'injecte que les pièces, les surlignages, les flèches et le texte.
+    """
+
+    def __init__(self, size: int, orientation: chess.Color, kind: str = 'board'):
+        self.size = size
+        self.orientation = orientation
+        self.kind = kind
+        self.band_height = BAND_HEIGHTS[kind]
+        self.height = size + self.band_height
+
+        self._prefix, self._board_open, self._suffix = self._compile()
+        self._square_xy = [self._square_origin(square) for square in chess.SQUARES]
+
+    def _compile(self) -> Tuple[str, str, str]:
+        """Génère les parties statiques du document"""
+        # Fond du plateau (bordure, coordonnées, cases) sans aucune pièce
+        background = str(chess.svg.board(None, orientation=self.orientation, coordinates=True))
+        background = background[background.index('>') + 1:background.rindex('</svg>')]
+
+        defs = ''.join(chess.svg.PIECES[symbol] for symbol in 'PNBRQKpnbrqk')
+
+        prefix = (
+            f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+            f'width="{self.size}" height="{self.height}" viewBox="0 0 {self.size} {self.height}">'
+            f'<defs>{defs}</defs>'
+            + self._band_background()
+        )
+
+        board_open = (
+            f'<svg x="0" y="{self.band_height}" width="{self.size}" height="{self.size}" '
+            f'viewBox="0 0 {BOARD_VIEWBOX} {BOARD_VIEWBOX}">'
+            + background
+        )
+
+        return prefix, board_open, '</svg></svg>'
+
+    def _band_background(self) -> str:
+        """Partie fixe du bandeau d'informations"""
+        if self.kind == 'analysis':
+            return (
+                f'<rect x="0" y="0" width="{self.size}" height="{self.band_height}" '
+                f'fill="#34495e" stroke="#2c3e50" stroke-width="2"/>'
+                '<text x="10" y="25" font-family="Arial, sans-serif" font-size="16" '
+                'font-weight="bold" fill="#e67e22">📊 ANALYSE STOCKFISH</text>'
+            )
+
+        return (
+            f'<rect x="0" y="0" width="{self.size}" height="{self.band_height}" '
+            f'fill="#2c3e50" stroke="#34495e" stroke-width="1"/>'
+            '<text x="10" y="45" font-family="Arial, sans-serif" font-size="12" fill="#bdc3c7">'
+            '♔ Roi  ♕ Dame  ♖ Tour  ♗ Fou  ♘ Cavalier  ♙ Pion</text>'
+            '<text x="10" y="65" font-family="Arial, sans-serif" font-size="12" fill="#bdc3c7">'
+            'Bot d\'Échecs Professionnel - Powered by Stockfish</text>'
+        )
+
+    def _square_origin(self, square: chess.Square) -> Tuple[int, int]:
+        """Coin supérieur gauche d'une case dans le viewBox du plateau"""
+        file_index = chess.square_file(square)
+        rank_index = chess.square_rank(square)
+        x = (file_index if self.orientation else 7 - file_index) * SQUARE_SIZE + BOARD_OFFSET
+        y = (7 - rank_index if self.orientation else rank_index) * SQUARE_SIZE + BOARD_OFFSET
+        return x, y
+
+    def _square_center(self, square: chess.Square) -> Tuple[float, float]:
+        x, y = self._square_xy[square]
+        return x + SQUARE_SIZE / 2, y + SQUARE_SIZE / 2
+
+    def _highlights(self, lastmove: Optional[chess.Move]) -> List[str]:
+        """Cases du dernier coup recolorées par-dessus le fond"""
+        if not lastmove:
+            return []
+
+        parts = []
+        for square in (lastmove.from_square, lastmove.to_square):
+            x, y = self._square_xy[square]
+            light = bool(chess.BB_LIGHT_SQUARES & chess.BB_SQUARES[square])
+            parts.append(
+                f'<rect x="{x}" y="{y}" width="{SQUARE_SIZE}" height="{SQUARE_SIZE}" '
+                f'stroke="none" fill="{LASTMOVE_COLORS[light]}"/>'
+            )
+        return parts
+
+    def _pieces(self, board: chess.Board) -> List[str]:
+        """Éléments <use> des pièces présentes"""
+        parts = []
+        for square, piece in board.piece_map().items():
+            x, y = self._square_xy[square]
+            href = f"#{chess.COLOR_NAMES[piece.color]}-{chess.PIECE_NAMES[piece.piece_type]}"
+            parts.append(f'<use href="{href}" xlink:href="{href}" transform="translate({x}, {y})"/>')
+        return parts
+
+    def _arrow(self, tail: chess.Square, head: chess.Square, color: str) -> str:
+        """Flèche au format de chess.svg"""
+        xtail, ytail = self._square_center(tail)
+        xhead, yhead = self._square_center(head)
+
+        if tail == head:
+            return (
+                f'<circle cx="{xhead}" cy="{yhead}" r="{SQUARE_SIZE * 0.45}" '
+                f'stroke-width="{SQUARE_SIZE * 0.1}" stroke="{color}" fill="none"/>'
+            )
+
+        marker_size = 0.75 * SQUARE_SIZE
+        marker_margin = 0.1 * SQUARE_SIZE
+
+        dx, dy = xhead - xtail, yhead - ytail
+        hypot = math.hypot(dx, dy)
+
+        shaft_x = xhead - dx * (marker_size + marker_margin) / hypot
+        shaft_y = yhead - dy * (marker_size + marker_margin) / hypot
+        xtip = xhead - dx * marker_margin / hypot
+        ytip = yhead - dy * marker_margin / hypot
+
+        marker = [
+            (xtip, ytip),
+            (shaft_x + dy * 0.5 * marker_size / hypot, shaft_y - dx * 0.5 * marker_size / hypot),
+            (shaft_x - dy * 0.5 * marker_size / hypot, shaft_y + dx * 0.5 * marker_size / hypot),
+        ]
+
+        return (
+            f'<line x1="{xtail}" y1="{ytail}" x2="{shaft_x}" y2="{shaft_y}" stroke="{color}" '
+            f'stroke-width="{SQUARE_SIZE * 0.2}" stroke-linecap="butt"/>'
+            f'<polygon points="{" ".join(f"{x},{y}" for x, y in marker)}" fill="{color}"/>'
+        )
+
+    def render(self, board: chess.Board, band_lines: List[Tuple[int, str, str]],
+               lastmove: Optional[chess.Move] = None,
+               arrows: Optional[List[Tuple[chess.Square, chess.Square, str]]] = None) -> str:
+        """
+        Assemble le SVG d'une position
+
+        Args:
+            board: Position à dessiner
+            band_lines: Lignes variables du bandeau (y, style, texte)
+            lastmove: Dernier coup à surligner
+            arrows: Flèches (départ, arrivée, couleur)
+
+        Returns:
+            str: Document SVG complet
+        """
+        parts = [self._prefix]
+        for y, style, text in band_lines:
+            parts.append(f'<text x="10" y="{y}" font-family="Arial, sans-serif" {style}>{escape(text)}</text>')
+
+        parts.append(self._board_open)
+        parts.extend(self._highlights(lastmove))
+        parts.extend(self._pieces(board))
+        for tail, head, color in arrows or []:
+            parts.append(self._arrow(tail, head, color))
+        parts.append(self._suffix)
+
+        return ''.join(parts)
+
+_templates: Dict[Tuple[int, bool, str], BoardTemplate] = {}
+_templates_lock = threading.Lock()
+
+def get_template(size: int, orientation: chess.Color, kind: str = 'board') -> BoardTemplate:
+    """Retourne le squelette partagé pour ces paramètres, compilé au premier usage"""
+    key = (size, bool(orientation), kind)
+    template = _templates.get(key)
+    if template is None:
+        with _templates_lock:
+            template = _templates.get(key)
+            if template is None:
+                template = BoardTemplate(size, orientation, kind)
+                _templates[key] = template
+    return template
@@ -1,20 +1,41 @@
 import asyncio
 import logging
 import json
+import chess
 from datetime import datetime
 from typing import Optional
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto, Message
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
 from telegram.constants import ParseMode
+from telegram.error import BadRequest
 
 from app import app, db, socketio
 from models import TelegramUser, ChessGame, GameMove, UserActivity, BotCommand
 from chess_engine import ChessEngine
 from board_renderer import BoardRenderer
+from render_cache import RenderCache
+from render_service import RenderService
+from photo_cache import TelegramFileCache, is_file_id_error
+from callback_data import decode_callback, KIND_MOVE, KIND_PAGE, PREFIX as GAME_CALLBACK_PREFIX
+from live_games import LiveGameStore, LiveGame
 from utils import track_user_activity, get_or_create_user
+from telemetry import get_telemetry_writer
+from stats_counters import get_stats_counters
+from send_scheduler import SendScheduler
 
 logger = logging.getLogger(__name__)
 
+# Boutons du menu traités par button_handler (hors boutons de partie encodés et game_<id>)
+MENU_ACTIONS = ('new_game', 'active_games', 'my_stats', 'help')
+
+# Anciens boutons de coup (move_<uci>) et boutons de partie illisibles: claviers d'avant la mise à jour
+OUTDATED_CALLBACK_PREFIXES = ('move_', GAME_CALLBACK_PREFIX)
+
+STALE_KEYBOARD = "⌛ Ce clavier n'est plus à jour"
+
+# Demi-coups pendant lesquels le nom de l'ouverture accompagne les coups
+OPENING_DISPLAY_PLIES = 20
+
 class ChessBot:
     """Bot d'échecs Telegram amélioré avec monitoring complet"""
     
@@ -22,7 +43,31 @@ class ChessBot:
         self.token = app.config['TELEGRAM_BOT_TOKEN']
         self.owner_id = app.config['OWNER_ID']
         self.chess_engine = ChessEngine()
-        self.board_renderer = BoardRenderer()
+        self.board_renderer = BoardRenderer(
+            cache=RenderCache(
+                max_bytes=app.config.get('RENDER_CACHE_MAX_BYTES', 32 * 1024 * 1024),
+                disk_dir=app.config.get('RENDER_CACHE_DIR') or None
+            ),
+            render_service=RenderService(app.config.get('RENDER_WORKERS', 2)),
+            backend=app.config.get('RENDER_BACKEND', 'svg'),
+            image_format=app.config.get('RENDER_IMAGE_FORMAT', 'PNG')
+        )
+        self.file_cache = TelegramFileCache(app.config.get('TELEGRAM_FILE_CACHE_SIZE', 50000))
+        # Parties actives en mémoire, écrites en base par lots
+        self.live_games = LiveGameStore(
+            max_games=app.config.get('LIVE_GAMES_MAX', 10000),
+            idle_timeout=app.config.get('LIVE_GAMES_IDLE_TIMEOUT', 3600),
+            batch_size=app.config.get('LIVE_GAMES_FLUSH_BATCH', 200)
+        )
+        self.live_games.start(app.config.get('LIVE_GAMES_FLUSH_INTERVAL', 1.0))
+        # Limites d'envoi de Telegram appliquées à tous les appels sortants
+        self.send_scheduler = SendScheduler(
+            global_rate=app.config.get('TELEGRAM_GLOBAL_RATE', 30),
+            chat_rate=app.config.get('TELEGRAM_CHAT_RATE', 1.0),
+            chat_burst=app.config.get('TELEGRAM_CHAT_BURST', 3),
+            group_rate=app.config.get('TELEGRAM_GROUP_RATE_PER_MINUTE', 20) / 60,
+            max_retries=app.config.get('TELEGRAM_MAX_RETRIES', 3)
+        )
         self.application = None
         
     async def initialize(self):
@@ -30,14 +75,21 @@ class ChessBot:
         if not self.token:
             raise ValueError("Token Telegram manquant dans la configuration")
             
-        self.application = Application.builder().token(self.token).build()
+        builder = Application.builder().token(self.token).rate_limiter(self.send_scheduler)
+        if app.config.get('TELEGRAM_API_BASE_URL'):
+            # Serveur Bot API local ou factice (tests de charge)
+            builder = builder.base_url(app.config['TELEGRAM_API_BASE_URL'])
+        application = builder.build()
         
         # Enregistrer les handlers
-        self.application.add_handler(CommandHandler("start", self.start_command))
-        self.application.add_handler(CommandHandler("help", self.help_command))
-        self.application.add_handler(CommandHandler("stats", self.stats_command))
-        self.application.add_handler(CommandHandler("admin", self.admin_command))
-        self.application.add_handler(CallbackQueryHandler(self.button_handler))
+        application.add_handler(CommandHandler("start", self.start_command))
+        application.add_handler(CommandHandler("help", self.help_command))
+        application.add_handler(CommandHandler("stats", self.stats_command))
+        application.add_handler(CommandHandler("admin", self.admin_command))
+        application.add_handler(CallbackQueryHandler(self.button_handler))
+        
+        # Publiée une fois complète: un nouvel essai après un échec repart de zéro
+        self.application = application
         
         logger.info("Bot Telegram initialisé avec succès")
     
@@ -97,20 +149,38 @@ Utilisez les boutons ci-dessous pour commencer !"""
     async def button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Gestionnaire principal des boutons avec monitoring"""
         query = update.callback_query
-        await query.answer()
+        data = query.data
+        
+        # Une requête ne peut recevoir qu'une réponse: les refus sont faits avant la réponse vide
+        game_callback = decode_callback(data)
+        if not game_callback and data not in MENU_ACTIONS and not data.startswith("game_"):
+            if data.startswith(OUTDATED_CALLBACK_PREFIXES):
+                await query.answer(STALE_KEYBOARD)
+            else:
+                await query.answer("❓ Action non reconnue")
+            return
+        
+        # Bouton d'une position déjà jouée: rejeté sans toucher à la base
+        if game_callback and self.is_stale(game_callback):
+            await query.answer(STALE_KEYBOARD)
+            return
         
         user_telegram_id = query.from_user.id
-        data = query.data
         
         with app.app_context():
             telegram_user = get_or_create_user(query.from_user)
             
-            # Enregistrer la commande
-            command = BotCommand(
-                user_id=telegram_user.id,
-                command=f"button:{data}",
-                created_at=datetime.utcnow()
-            )
+            rejection = self.check_game_callback(telegram_user, game_callback) if game_callback else None
+            await query.answer(rejection)
+            if rejection:
+                return
+            
+            # Enregistrer la commande (écrite par lot avec le reste de la télémétrie)
+            command = {
+                'user_id': telegram_user.id,
+                'command': f"button:{data}",
+                'created_at': datetime.utcnow()
+            }
             
             start_time = datetime.utcnow()
             
@@ -124,36 +194,36 @@ Utilisez les boutons ci-dessous pour commencer !"""
                     await self.handle_user_stats(query, telegram_user)
                 elif data == "help":
                     await self.handle_help(query, telegram_user)
-                elif data.startswith("move_"):
-                    move_uci = data[5:]
-                    await self.handle_move(query, telegram_user, move_uci)
+                elif game_callback and game_callback.kind == KIND_MOVE:
+                    await self.handle_move(query, telegram_user, game_callback)
+                elif game_callback and game_callback.kind == KIND_PAGE:
+                    await self.handle_move_page(query, telegram_user, game_callback)
                 elif data.startswith("game_"):
                     game_id = int(data[5:])
                     await self.handle_game_action(query, telegram_user, game_id)
-                else:
-                    await query.edit_message_text("❓ Action non reconnue")
                 
                 # Marquer comme succès
-                command.success = True
+                command['success'] = True
                 
             except Exception as e:
                 logger.error(f"Erreur dans button_handler: {e}")
-                command.success = False
-                command.error_message = str(e)
-                await query.answer("❌ Une erreur s'est produite")
+                command['success'] = False
+                command['error_message'] = str(e)
+                # Requête déjà répondue: l'erreur est signalée par un message
+                if query.message:
+                    await query.message.reply_text("❌ Une erreur s'est produite")
             
             # Calculer le temps de réponse
             response_time = (datetime.utcnow() - start_time).total_seconds()
-            command.response_time = response_time
+            command['response_time'] = response_time
             
-            db.session.add(command)
-            db.session.commit()
+            get_telemetry_writer().enqueue(BotCommand, command)
             
             # Émettre l'activité en temps réel
             socketio.emit('button_action', {
                 'user_id': user_telegram_id,
                 'action': data,
-                'success': command.success,
+                'success': command['success'],
                 'response_time': response_time,
                 'timestamp': datetime.utcnow().isoformat()
             }, namespace='/admin')
@@ -181,9 +251,8 @@ Utilisez les boutons ci-dessous pour commencer !"""
         )
         db.session.add(game)
         db.session.commit()
-        
-        # Générer l'échiquier initial
-        board_image = self.board_renderer.render_board(game.board_fen)
+        live_game = self.live_games.register(game)
+        get_stats_counters().game_created()
         
         # Tracker l'activité
         track_user_activity(
@@ -196,12 +265,15 @@ Utilisez les boutons ci-dessous pour commencer !"""
         # Interface de jeu
         keyboard = self.chess_engine.get_move_keyboard(game.board_fen, game.id)
         
-        await query.message.reply_photo(
-            photo=board_image,
-            caption=f"🆕 **Nouvelle partie #{game.id}**\n\nVous jouez avec les blancs. À vous de jouer !",
-            reply_markup=keyboard,
-            parse_mode=ParseMode.MARKDOWN
+        sent = await self.send_board_photo(
+            query.message,
+            game,
+            f"🆕 **Nouvelle partie #{game.id}**\n\nVous jouez avec les blancs. À vous de jouer !",
+            keyboard
         )
+        if isinstance(sent, Message):
+            # Ce message sera mis à jour en place à chaque coup
+            self.live_games.update(live_game, message_id=sent.message_id)
         
         await query.edit_message_text(
             "✅ Nouvelle partie créée ! Voir l'échiquier ci-dessus.",
@@ -215,6 +287,108 @@ Utilisez les boutons ci-dessous pour commencer !"""
             'timestamp': datetime.utcnow().isoformat()
         }, namespace='/admin')
     
+    async def send_board_photo(self, message, game, caption, reply_markup):
+        """Envoie l'échiquier, par référence si une image identique a déjà été envoyée"""
+        board = game.board if isinstance(game, LiveGame) else chess.Board(game.board_fen)
+        render_key = self.board_renderer.render_key(board)
+        
+        file_id = self.file_cache.get(render_key)
+        if file_id:
+            try:
+                return await message.reply_photo(
+                    photo=file_id,
+                    caption=caption,
+                    reply_markup=reply_markup,
+                    parse_mode=ParseMode.MARKDOWN
+                )
+            except BadRequest as e:
+                if not is_file_id_error(e):
+                    raise
+                logger.warning(f"file_id refusé par Telegram, nouvel envoi: {e}")
+                self.file_cache.invalidate(render_key)
+        
+        board_image = await self.board_renderer.render_board_async(game.board_fen)
+        sent = await message.reply_photo(
+            photo=board_image,
+            caption=caption,
+            reply_markup=reply_markup,
+            parse_mode=ParseMode.MARKDOWN
+        )
+        
+        if sent and sent.photo:
+            largest = sent.photo[-1]
+            self.file_cache.record(render_key, game.id, largest.file_id, largest.file_size)
+        
+        return sent
+    
+    async def update_board_message(self, message, game, caption, reply_markup):
+        """
+        Affiche la nouvelle position de la partie
+        
+        En mode edit (GAME_MESSAGE_MODE), le message de la partie est modifié
+        en place; si la modification échoue (message supprimé, trop ancien...),
+        un nouveau message est envoyé et devient le message de la partie.
+        """
+        if app.config.get('GAME_MESSAGE_MODE', 'edit') == 'edit':
+            try:
+                return await self.edit_board_photo(message, game, caption, reply_markup)
+            except BadRequest as e:
+                if 'not modified' in str(e).lower():
+                    return None
+                logger.warning(f"Message de la partie {game.id} non modifiable, nouvel envoi: {e}")
+        
+        sent = await self.send_board_photo(message, game, caption, reply_markup)
+        if isinstance(sent, Message):
+            self.live_games.update(game, message_id=sent.message_id)
+        return sent
+    
+    async def edit_board_photo(self, message, game, caption, reply_markup):
+        """
+        Remplace l'image, la légende et le clavier du message de la partie
+        
+        Seul un refus du file_id entraîne un nouvel essai avec l'image rendue;
+        une erreur sur le message lui-même (supprimé, non modifiable) remonte
+        telle quelle pour que l'appelant envoie un nouveau message.
+        """
+        board = game.board if isinstance(game, LiveGame) else chess.Board(game.board_fen)
+        render_key = self.board_renderer.render_key(board)
+        message_id = game.message_id or message.message_id
+        bot = message.get_bot()
+        
+        file_id = self.file_cache.get(render_key)
+        edited = None
+        if file_id:
+            try:
+                edited = await bot.edit_message_media(
+                    media=InputMediaPhoto(media=file_id, caption=caption, parse_mode=ParseMode.MARKDOWN),
+                    chat_id=message.chat_id,
+                    message_id=message_id,
+                    reply_markup=reply_markup
+                )
+            except BadRequest as e:
+                if not is_file_id_error(e):
+                    raise
+                logger.warning(f"file_id refusé par Telegram, nouvel essai avec l'image: {e}")
+                self.file_cache.invalidate(render_key)
+                file_id = None
+        
+        if not file_id:
+            board_image = await self.board_renderer.render_board_async(game.board_fen)
+            edited = await bot.edit_message_media(
+                media=InputMediaPhoto(media=board_image, caption=caption, parse_mode=ParseMode.MARKDOWN),
+                chat_id=message.chat_id,
+                message_id=message_id,
+                reply_markup=reply_markup
+            )
+            
+            if isinstance(edited, Message) and edited.photo:
+                largest = edited.photo[-1]
+                self.file_cache.record(render_key, game.id, largest.file_id, largest.file_size)
+        
+        if game.message_id != message_id:
+            self.live_games.update(game, message_id=message_id)
+        return edited
+    
     def get_main_keyboard(self):
         """Retourne le clavier principal"""
         keyboard = [
@@ -225,16 +399,49 @@ Utilisez les boutons ci-dessous pour commencer !"""
         ]
         return InlineKeyboardMarkup(keyboard)
     
-    async def handle_move(self, query, telegram_user, move_uci):
-        """Traite un coup avec monitoring complet"""
-        # Récupérer la partie active
-        game = ChessGame.query.filter_by(
-            user_id=telegram_user.id,
-            status='active'
-        ).first()
+    def is_stale(self, game_callback) -> bool:
+        """Vrai si le bouton a été émis pour une position qui n'est plus la position courante"""
+        current_ply = self.live_games.current_ply(game_callback.game_id)
+        return current_ply is not None and current_ply != game_callback.ply
+    
+    def check_game_callback(self, telegram_user, game_callback) -> Optional[str]:
+        """Motif de refus d'un bouton de partie (réponse à la requête), None s'il est valable"""
+        game = self.load_callback_game(telegram_user, game_callback)
+        if not game:
+            return "❌ Aucune partie active trouvée"
+        if self.is_stale(game_callback):
+            return STALE_KEYBOARD
+        if game_callback.kind == KIND_MOVE and \
+                not self.chess_engine.resolve_move(game.board, game_callback.ply, game_callback.arg):
+            return STALE_KEYBOARD
+        return None
+    
+    def load_callback_game(self, telegram_user, game_callback) -> Optional[LiveGame]:
+        """Partie active désignée par un bouton, si elle appartient à l'utilisateur"""
+        game = self.live_games.get(game_callback.game_id)
+        if not game or game.user_id != telegram_user.id or game.status != 'active':
+            return None
+        return game
+    
+    async def handle_move_page(self, query, telegram_user, game_callback):
+        """Affiche une autre page du clavier des coups (bouton validé par check_game_callback)"""
+        game = self.load_callback_game(telegram_user, game_callback)
+        if not game:
+            return
         
+        keyboard = self.chess_engine.get_move_keyboard(game.board_fen, game.id, page=game_callback.arg)
+        await query.edit_message_reply_markup(reply_markup=keyboard)
+    
+    async def handle_move(self, query, telegram_user, game_callback):
+        """Traite un coup avec monitoring complet"""
+        # La partie est désignée par le bouton, plus besoin de la deviner;
+        # requête déjà répondue: un refus tardif (clic concurrent) est ignoré
+        game = self.load_callback_game(telegram_user, game_callback)
         if not game:
-            await query.answer("❌ Aucune partie active trouvée")
+            return
+        
+        move_uci = self.chess_engine.resolve_move(game.board, game_callback.ply, game_callback.arg)
+        if not move_uci:
             return
         
         try:
@@ -242,68 +449,70 @@ Utilisez les boutons ci-dessous pour commencer !"""
             result = self.chess_engine.make_move(game, move_uci)
             
             if not result['success']:
-                await query.answer(f"❌ {result['error']}")
+                await query.message.reply_text(f"❌ {result['error']}")
                 return
             
-            # Sauvegarder le coup
-            player_move = GameMove(
-                game_id=game.id,
-                move_number=game.move_count + 1,
-                move_uci=move_uci,
-                move_san=result['move_san'],
-                player='user',
-                created_at=datetime.utcnow()
-            )
-            db.session.add(player_move)
+            # Jouer le coup en mémoire; les lignes GameMove sont écrites en différé
+            start_fen = game.board_fen
+            self.live_games.record_move(game, move_uci, result['move_san'], 'user', game.move_count + 1)
             
-            # Coup de l'IA si la partie continue
+            # Coup de l'IA si la partie continue (recherche hors de la boucle d'événements)
             ai_result = None
             if result['game_continues']:
-                ai_result = self.chess_engine.make_ai_move(game)
+                ai_result = await self.chess_engine.play_async(game)
                 if ai_result['success']:
-                    ai_move = GameMove(
-                        game_id=game.id,
-                        move_number=game.move_count + 2,
-                        move_uci=ai_result['move_uci'],
-                        move_san=ai_result['move_san'],
-                        player='ai',
-                        time_spent=ai_result.get('thinking_time'),
-                        created_at=datetime.utcnow()
+                    self.live_games.record_move(
+                        game,
+                        ai_result['move_uci'],
+                        ai_result['move_san'],
+                        'ai',
+                        game.move_count + 2,
+                        time_spent=ai_result.get('thinking_time')
                     )
-                    db.session.add(ai_move)
+            
+            # La position finale est celle après la réponse de l'IA si elle a joué
+            outcome = ai_result if ai_result and ai_result['success'] else result
             
             # Mettre à jour la partie
-            game.board_fen = result['new_fen']
-            game.move_count = result['move_count']
-            game.status = result.get('status', 'active')
+            played_san = [result['move_san']]
+            if ai_result and ai_result['success']:
+                played_san.append(ai_result['move_san'])
+            updates = {
+                'pgn_moves': self.chess_engine.append_pgn_moves(game.pgn_moves, start_fen, played_san),
+                'move_count': result['move_count'],
+                'status': outcome.get('status', 'active')
+            }
             
-            if result.get('game_over'):
-                game.finished_at = datetime.utcnow()
-                game.result = result.get('result')
+            if outcome.get('game_over'):
+                updates['finished_at'] = datetime.utcnow()
+                updates['result'] = outcome.get('result')
             
-            db.session.commit()
+            self.live_games.update(game, **updates)
             
-            # Générer la nouvelle image
-            board_image = self.board_renderer.render_board(game.board_fen)
+            counters = get_stats_counters()
+            counters.moves_played(len(played_san))
+            if outcome.get('game_over'):
+                counters.game_finished()
             
             # Préparer le message
             message = f"Votre coup: **{result['move_san']}**"
             if ai_result and ai_result['success']:
                 message += f"\nCoup de l'IA: **{ai_result['move_san']}**"
             
-            if result.get('game_over'):
-                message += f"\n\n🏁 **Partie terminée: {result.get('result_message')}**"
+            # Nom de l'ouverture tant que la partie en sort à peine
+            if game.ply <= OPENING_DISPLAY_PLIES:
+                opening = self.chess_engine.identify_opening(game.board)
+                if opening:
+                    message += f"\n📖 {opening}"
+            
+            if outcome.get('game_over'):
+                message += f"\n\n🏁 **Partie terminée: {outcome.get('result_message')}**"
                 keyboard = self.get_game_over_keyboard(game.id)
             else:
                 message += f"\n\n♟️ **À votre tour**"
                 keyboard = self.chess_engine.get_move_keyboard(game.board_fen, game.id)
             
-            await query.message.reply_photo(
-                photo=board_image,
-                caption=message,
-                reply_markup=keyboard,
-                parse_mode=ParseMode.MARKDOWN
-            )
+            await self.update_board_message(query.message, game, message, keyboard)
             
             # Tracker l'activité
             track_user_activity(
@@ -323,13 +532,13 @@ Utilisez les boutons ci-dessous pour commencer !"""
                 'game_id': game.id,
                 'move': result['move_san'],
                 'ai_move': ai_result['move_san'] if ai_result and ai_result['success'] else None,
-                'game_over': result.get('game_over', False),
+                'game_over': outcome.get('game_over', False),
                 'timestamp': datetime.utcnow().isoformat()
             }, namespace='/admin')
             
         except Exception as e:
             logger.error(f"Erreur lors du coup: {e}")
-            await query.answer("❌ Erreur lors du traitement du coup")
+            await query.message.reply_text("❌ Erreur lors du traitement du coup")
     
     def get_game_over_keyboard(self, game_id):
         """Clavier pour la fin de partie"""
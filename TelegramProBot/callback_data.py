@@ -0,0 +1,46 @@
+import base64
+import binascii
+import struct
+from typing import NamedTuple, Optional
+
+# Préfixe des boutons de partie encodés; les autres boutons gardent leur texte lisible
+PREFIX = "k:"
+
+KIND_MOVE = 0
+KIND_PAGE = 1
+
+# type (1 octet), id de partie (4), demi-coup de la position (2), argument (1):
+# 8 octets, soit 11 caractères base64, bien en deçà des 64 octets de Telegram
+_PAYLOAD = struct.Struct('>BIHB')
+
+class GameCallback(NamedTuple):
+    """Bouton de partie décodé"""
+    kind: int
+    game_id: int
+    ply: int
+    arg: int
+
+def encode_callback(kind: int, game_id: int, ply: int, arg: int) -> str:
+    """
+    Encode un bouton de partie
+
+    Args:
+        kind: KIND_MOVE (arg = index du coup légal) ou KIND_PAGE (arg = page)
+        game_id: Identifiant de la partie
+        ply: Demi-coup de la position affichée, pour rejeter les clics périmés
+        arg: Index du coup ou numéro de page
+    """
+    payload = _PAYLOAD.pack(kind, game_id, ply, arg)
+    return PREFIX + base64.urlsafe_b64encode(payload).rstrip(b'=').decode('ascii')
+
+def decode_callback(data: str) -> Optional[GameCallback]:
+    """Décode un bouton de partie, None si la donnée n'en est pas un"""
+    if not data or not data.startswith(PREFIX):
+        return None
+
+    encoded = data[len(PREFIX):]
+    try:
+        payload = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+        return GameCallback(*_PAYLOAD.unpack(payload))
+    except (binascii.Error, struct.error, ValueError):
+        return None
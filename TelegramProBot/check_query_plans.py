@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Vérification des plans d'exécution des requêtes critiques
+
+Lance EXPLAIN (EXPLAIN QUERY PLAN sur SQLite, EXPLAIN FORMAT JSON sur
+PostgreSQL) pour chaque requête de HOT_QUERIES et échoue si l'une d'elles
+parcourt entièrement sa table au lieu d'utiliser un index.
+
+Usage:
+    python check_query_plans.py [--database-url URL] [--create-schema]
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+def hot_queries():
+    """Requêtes des chemins critiques: (nom, table attendue, requête)"""
+    from sqlalchemy import select, func
+    from models import TelegramUser, ChessGame, GameMove, GamePhoto, UserActivity, SystemStats
+
+    cutoff = datetime.utcnow() - timedelta(days=7)
+
+    return [
+        ('utilisateur par telegram_id', 'telegram_users',
+         select(TelegramUser.id).where(TelegramUser.telegram_id == 1)),
+        ('utilisateurs actifs (7 jours)', 'telegram_users',
+         select(func.count(TelegramUser.id)).where(TelegramUser.last_activity >= cutoff)),
+        ('utilisateurs récents', 'telegram_users',
+         select(TelegramUser.id).order_by(TelegramUser.last_activity.desc()).limit(50)),
+        ('parties actives d\'un utilisateur', 'chess_games',
+         select(func.count(ChessGame.id)).where(ChessGame.user_id == 1, ChessGame.status == 'active')),
+        ('parties d\'un utilisateur', 'chess_games',
+         select(ChessGame.id).where(ChessGame.user_id == 1).order_by(ChessGame.created_at.desc()).limit(20)),
+        ('parties par statut', 'chess_games',
+         select(ChessGame.id).where(ChessGame.status == 'active').order_by(ChessGame.created_at.desc()).limit(10)),
+        ('parties du jour', 'chess_games',
+         select(func.count(ChessGame.id)).where(ChessGame.created_at >= cutoff)),
+        ('coups d\'une partie', 'game_moves',
+         select(GameMove.move_uci).where(GameMove.game_id == 1).order_by(GameMove.id)),
+        ('photo par clé de rendu', 'game_photos',
+         select(GamePhoto.telegram_file_id).where(GamePhoto.render_key == 'x')),
+        ('activités récentes', 'user_activities',
+         select(func.count(UserActivity.id)).where(UserActivity.created_at >= cutoff)),
+        ('activités d\'un utilisateur', 'user_activities',
+         select(UserActivity.id).where(UserActivity.user_id == 1).order_by(UserActivity.created_at.desc()).limit(50)),
+        ('activités récentes d\'un utilisateur', 'user_activities',
+         select(func.count(UserActivity.id)).where(UserActivity.user_id == 1, UserActivity.created_at >= cutoff)),
+        ('nettoyage des activités', 'user_activities',
+         select(UserActivity.id).where(UserActivity.created_at < cutoff)),
+        ('métrique sur une période', 'system_stats',
+         select(SystemStats.metric_value).where(SystemStats.metric_name == 'x', SystemStats.recorded_at >= cutoff)),
+        ('nettoyage des métriques', 'system_stats',
+         select(SystemStats.id).where(SystemStats.recorded_at < cutoff)),
+    ]
+
+def explain(connection, statement):
+    """
+    Plan d'exécution d'une requête
+
+    Returns:
+        list: Lignes de plan (SQLite) ou nœuds du plan JSON (PostgreSQL)
+    """
+    compiled = statement.compile(dialect=connection.dialect)
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+
+    if connection.dialect.name == 'postgresql':
+        # Sans parcours séquentiel possible, le plan révèle si un index est utilisable
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        row = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params).scalar()
+        plan = row if isinstance(row, list) else json.loads(row)
+        return list(_plan_nodes(plan[0]['Plan']))
+
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    return [row[-1] for row in rows]
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _plan_nodes(child)
+
+def full_scans(dialect: str, plan, table: str, filtered: bool) -> list:
+    """
+    Étapes du plan qui parcourent toute la table
+
+    Pour une requête filtrée, le parcours complet d'un index (sans condition
+    d'accès) compte aussi comme un parcours complet; sans filtre, seul un
+    parcours ordonné par index est accepté.
+    """
+    if dialect == 'postgresql':
+        scans = []
+        for node in plan:
+            if node.get('Relation Name') != table:
+                continue
+            if node['Node Type'] == 'Seq Scan':
+                scans.append(f"Seq Scan on {table}")
+            elif filtered and node['Node Type'] in ('Index Scan', 'Index Only Scan') and 'Index Cond' not in node:
+                scans.append(f"{node['Node Type']} using {node.get('Index Name')} sans condition d'index")
+        return scans
+
+    return [
+        detail for detail in plan
+        if detail.startswith(f"SCAN {table}") and (filtered or 'INDEX' not in detail)
+    ]
+
+def main() -> int:
+    """Point d'entrée: 0 si toutes les requêtes utilisent un index, 1 sinon"""
+    parser = argparse.ArgumentParser(description="Audit des plans d'exécution des requêtes critiques")
+    parser.add_argument('--database-url', help="Base à auditer (par défaut DATABASE_URL)")
+    parser.add_argument('--create-schema', action='store_true',
+                        help="Appliquer les migrations avant l'audit (base vide de test)")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    if args.create_schema:
+        os.environ['DB_SCHEMA_CHECK'] = 'false'
+
+    from app import app, db
+    from migrations import upgrade
+
+    failures = 0
+    with app.app_context():
+        if args.create_schema:
+            upgrade(db.engine)
+
+        dialect = db.engine.dialect.name
+        for name, table, statement in hot_queries():
+            with db.engine.connect() as connection:
+                with connection.begin():
+                    plan = explain(connection, statement)
+
+            scans = full_scans(dialect, plan, table, statement.whereclause is not None)
+            if scans:
+                failures += 1
+                logger.error(f"Parcours complet [{name}]: {'; '.join(scans)}")
+            else:
+                logger.info(f"OK [{name}]")
+
+    if failures:
+        logger.error(f"{failures} requête(s) critique(s) sans index sur {dialect}")
+        return 1
+
+    logger.info(f"Toutes les requêtes critiques utilisent un index sur {dialect}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,25 @@
+import asyncio
 import chess
 import chess.engine
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, Optional, List
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 from app import app
+from engine_pool import EnginePool, EnginePoolExhausted
+from analysis_cache import AnalysisCache
+from opening_book import OpeningBook
+from eco import get_opening_classifier
+from keyboard_cache import MoveKeyboardCache, paginate_layout
+from callback_data import encode_callback, KIND_MOVE, KIND_PAGE
 
 logger = logging.getLogger(__name__)
 
+# Coups par page du clavier (Telegram limite un clavier à 100 boutons)
+MOVES_PER_PAGE = 45
+
 class ChessEngine:
     """Moteur d'échecs avec Stockfish et interface Telegram"""
     
@@ -16,11 +27,42 @@ class ChessEngine:
         self.stockfish_path = app.config.get('STOCKFISH_PATH', 'stockfish')
         self.default_skill = app.config.get('DEFAULT_SKILL_LEVEL', 5)
         self.default_time = app.config.get('DEFAULT_AI_TIME', 0.8)
+        self.analysis_skill = app.config.get('ANALYSIS_SKILL_LEVEL', 20)
+        
+        # Processus Stockfish persistants partagés par toutes les parties
+        self.engine_pool = EnginePool(
+            self.stockfish_path,
+            size=app.config.get('ENGINE_POOL_SIZE', 2),
+            checkout_timeout=app.config.get('ENGINE_CHECKOUT_TIMEOUT', 10.0)
+        )
+        self.engine_pool.start_health_checks(app.config.get('ENGINE_HEALTH_CHECK_INTERVAL', 60))
+        
+        # Analyses déjà calculées, partagées entre transpositions
+        self.analysis_cache = AnalysisCache(
+            max_entries=app.config.get('ANALYSIS_CACHE_SIZE', 10000),
+            persistent=app.config.get('ANALYSIS_CACHE_PERSISTENT', False)
+        )
+        
+        # Livre d'ouvertures consulté avant toute recherche
+        self.opening_book = OpeningBook(
+            book_path=app.config.get('OPENING_BOOK_PATH') or None,
+            min_plies=app.config.get('OPENING_BOOK_MIN_PLIES', 8),
+            max_plies=app.config.get('OPENING_BOOK_MAX_PLIES', 12)
+        )
+        
+        # Claviers de coups déjà construits, par position et par partie
+        self.keyboard_cache = MoveKeyboardCache(max_entries=app.config.get('KEYBOARD_CACHE_SIZE', 5000))
+        
+        # Un thread par moteur: N parties simultanées = N recherches parallèles
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.engine_pool.size,
+            thread_name_prefix='stockfish'
+        )
     
     def make_move(self, game, move_uci: str) -> Dict:
         """Traite un coup du joueur"""
         try:
-            board = chess.Board(game.board_fen)
+            board = self._board_of(game)
             move = chess.Move.from_uci(move_uci)
             
             if move not in board.legal_moves:
@@ -39,29 +81,7 @@ class ChessEngine:
                 'move_count': game.move_count + 1,
                 'game_continues': not board.is_game_over()
             }
-            
-            if board.is_game_over():
-                result.update({
-                    'game_over': True,
-                    'status': 'finished'
-                })
-                
-                if board.is_checkmate():
-                    if board.turn == chess.WHITE:
-                        result['result'] = 'black_wins'
-                        result['result_message'] = 'Victoire des Noirs par échec et mat'
-                    else:
-                        result['result'] = 'white_wins'
-                        result['result_message'] = 'Victoire des Blancs par échec et mat'
-                elif board.is_stalemate():
-                    result['result'] = 'draw'
-                    result['result_message'] = 'Match nul par pat'
-                elif board.is_insufficient_material():
-                    result['result'] = 'draw'
-                    result['result_message'] = 'Match nul par matériel insuffisant'
-                else:
-                    result['result'] = 'draw'
-                    result['result_message'] = 'Match nul'
+            result.update(self._game_over_info(board))
             
             return result
             
@@ -72,99 +92,198 @@ class ChessEngine:
                 'error': f'Erreur interne: {str(e)}'
             }
     
-    def make_ai_move(self, game) -> Dict:
+    def _board_of(self, game, fen: Optional[str] = None) -> chess.Board:
+        """
+        Échiquier de travail pour une partie
+        
+        Une partie en mémoire (LiveGame) fournit son échiquier avec la pile
+        de coups, copié pour ne pas le modifier; sinon le FEN est analysé.
+        """
+        if fen:
+            return chess.Board(fen)
+        board = getattr(game, 'board', None)
+        if board is not None:
+            return board.copy()
+        return chess.Board(game.board_fen)
+    
+    def _game_over_info(self, board: chess.Board) -> Dict:
+        """Décrit le résultat si la position est terminale"""
+        if not board.is_game_over():
+            return {}
+        
+        info = {
+            'game_over': True,
+            'status': 'finished'
+        }
+        
+        if board.is_checkmate():
+            if board.turn == chess.WHITE:
+                info['result'] = 'black_wins'
+                info['result_message'] = 'Victoire des Noirs par échec et mat'
+            else:
+                info['result'] = 'white_wins'
+                info['result_message'] = 'Victoire des Blancs par échec et mat'
+        elif board.is_stalemate():
+            info['result'] = 'draw'
+            info['result_message'] = 'Match nul par pat'
+        elif board.is_insufficient_material():
+            info['result'] = 'draw'
+            info['result_message'] = 'Match nul par matériel insuffisant'
+        else:
+            info['result'] = 'draw'
+            info['result_message'] = 'Match nul'
+        
+        return info
+    
+    def make_ai_move(self, game, fen: Optional[str] = None) -> Dict:
         """Fait jouer l'IA avec Stockfish"""
+        return self._play(
+            self._board_of(game, fen),
+            game.difficulty_level or self.default_skill,
+            game.ai_thinking_time or self.default_time,
+            game.id
+        )
+    
+    async def play_async(self, game, fen: Optional[str] = None) -> Dict:
+        """
+        Fait jouer l'IA sans bloquer la boucle d'événements
+        
+        Args:
+            game: Partie en cours
+            fen: Position à jouer (par défaut celle enregistrée dans la partie)
+            
+        Returns:
+            Dict: Même format que make_ai_move
+        """
+        # Les attributs ORM et l'échiquier sont lus ici, dans le thread de la boucle
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            self._play,
+            self._board_of(game, fen),
+            game.difficulty_level or self.default_skill,
+            game.ai_thinking_time or self.default_time,
+            game.id
+        )
+    
+    def _play(self, board: chess.Board, skill_level: int, think_time: float, game_key) -> Dict:
+        """Recherche et joue le coup de l'IA sur la position donnée (l'échiquier est modifié)"""
         try:
-            board = chess.Board(game.board_fen)
             
             if board.is_game_over():
                 return {'success': False, 'error': 'Partie terminée'}
             
             start_time = datetime.utcnow()
             
-            with chess.engine.SimpleEngine.popen_uci(self.stockfish_path) as engine:
-                engine.configure({"Skill Level": game.difficulty_level or self.default_skill})
-                result = engine.play(board, chess.engine.Limit(time=game.ai_thinking_time or self.default_time))
-                ai_move = result.move
-                
-                if ai_move is None:
-                    return {'success': False, 'error': 'IA ne peut pas jouer'}
-                
-                ai_move_san = board.san(ai_move)
-                board.push(ai_move)
-                
-                thinking_time = (datetime.utcnow() - start_time).total_seconds()
-                
-                return {
-                    'success': True,
-                    'move_uci': ai_move.uci(),
-                    'move_san': ai_move_san,
-                    'new_fen': board.fen(),
-                    'thinking_time': thinking_time
-                }
-                
+            # Coup du livre d'ouvertures: pas de recherche nécessaire
+            ai_move = self.opening_book.choose(board, skill_level)
+            from_book = ai_move is not None
+            
+            if not from_book:
+                with self.engine_pool.engine(skill_level) as engine:
+                    # La clé de partie déclenche un ucinewgame quand le moteur change de partie
+                    result = engine.play(
+                        board,
+                        chess.engine.Limit(time=think_time),
+                        game=game_key
+                    )
+                    ai_move = result.move
+            
+            if ai_move is None:
+                return {'success': False, 'error': 'IA ne peut pas jouer'}
+            
+            ai_move_san = board.san(ai_move)
+            board.push(ai_move)
+            
+            thinking_time = (datetime.utcnow() - start_time).total_seconds()
+            
+            ai_result = {
+                'success': True,
+                'move_uci': ai_move.uci(),
+                'move_san': ai_move_san,
+                'new_fen': board.fen(),
+                'thinking_time': thinking_time,
+                'from_book': from_book
+            }
+            ai_result.update(self._game_over_info(board))
+            
+            return ai_result
+            
         except FileNotFoundError:
             logger.error("Stockfish non trouvé")
             return {'success': False, 'error': 'Moteur d\'échecs indisponible'}
+        except EnginePoolExhausted:
+            logger.warning("Pool de moteurs saturé")
+            return {'success': False, 'error': 'Moteur d\'échecs occupé, réessayez'}
         except Exception as e:
             logger.error(f"Erreur IA: {e}")
             return {'success': False, 'error': f'Erreur IA: {str(e)}'}
     
-    def get_move_keyboard(self, fen: str, game_id: int) -> InlineKeyboardMarkup:
-        """Génère le clavier des coups possibles groupés par pièce"""
+    def get_move_keyboard(self, fen: str, game_id: int, page: int = 0) -> InlineKeyboardMarkup:
+        """
+        Génère le clavier des coups possibles groupés par pièce
+        
+        Tous les coups légaux sont proposés, répartis sur plusieurs pages si
+        nécessaire. Chaque bouton encode l'id de partie, le demi-coup de la
+        position et l'index du coup (voir callback_data).
+        """
         try:
             board = chess.Board(fen)
+            ply = board.ply()
+            
+            # Même position dans la même partie: clavier réutilisé tel quel
+            position_key = self.keyboard_cache.position_key(board)
+            cache_key = (position_key, board.halfmove_clock >= 150, game_id, ply, page)
+            keyboard = self.keyboard_cache.get_keyboard(cache_key)
+            if keyboard is not None:
+                return keyboard
             
             if board.is_game_over():
-                return self._get_game_over_keyboard(game_id)
+                keyboard = self._get_game_over_keyboard(game_id)
+                self.keyboard_cache.put_keyboard(cache_key, keyboard)
+                return keyboard
             
-            legal_moves = list(board.legal_moves)
-            if not legal_moves:
+            # Coups et notation SAN calculés une seule fois par position
+            layout = self.keyboard_cache.layout(board, position_key)
+            if not layout:
                 return InlineKeyboardMarkup([[]])
             
-            # Grouper les coups par type de pièce
-            moves_by_piece = {
-                "♟️ Pions": [],
-                "♜ Tours": [],
-                "♞ Cavaliers": [],
-                "♝ Fous": [],
-                "♛ Reine": [],
-                "♚ Roi": []
-            }
-            
-            piece_mapping = {
-                chess.PAWN: "♟️ Pions",
-                chess.ROOK: "♜ Tours",
-                chess.KNIGHT: "♞ Cavaliers",
-                chess.BISHOP: "♝ Fous",
-                chess.QUEEN: "♛ Reine",
-                chess.KING: "♚ Roi"
-            }
-            
-            for move in legal_moves:
-                piece = board.piece_at(move.from_square)
-                if piece:
-                    piece_type = piece_mapping.get(piece.piece_type, "♟️ Pions")
-                    move_san = board.san(move)
-                    moves_by_piece[piece_type].append((move_san, f"move_{move.uci()}"))
+            pages = paginate_layout(layout, MOVES_PER_PAGE)
+            page = min(max(page, 0), len(pages) - 1)
             
             keyboard = []
             
             # Créer les boutons pour chaque type de pièce
-            for piece_type, moves in moves_by_piece.items():
-                if moves:
-                    # Ligne de titre pour le type de pièce
-                    keyboard.append([InlineKeyboardButton(piece_type, callback_data="info")])
-                    
-                    # Boutons des coups (max 3 par ligne)
-                    row = []
-                    for move_san, callback_data in moves[:9]:  # Limiter à 9 coups par type
-                        row.append(InlineKeyboardButton(move_san, callback_data=callback_data))
-                        if len(row) == 3:
-                            keyboard.append(row)
-                            row = []
-                    if row:
+            for piece_type, moves in pages[page]:
+                # Ligne de titre pour le type de pièce
+                keyboard.append([InlineKeyboardButton(piece_type, callback_data="info")])
+                
+                # Boutons des coups (max 3 par ligne)
+                row = []
+                for move_san, move_index in moves:
+                    row.append(InlineKeyboardButton(
+                        move_san,
+                        callback_data=encode_callback(KIND_MOVE, game_id, ply, move_index)
+                    ))
+                    if len(row) == 3:
                         keyboard.append(row)
+                        row = []
+                if row:
+                    keyboard.append(row)
+            
+            # Navigation entre les pages
+            if len(pages) > 1:
+                navigation = []
+                if page > 0:
+                    navigation.append(InlineKeyboardButton(
+                        "◀️", callback_data=encode_callback(KIND_PAGE, game_id, ply, page - 1)
+                    ))
+                navigation.append(InlineKeyboardButton(f"{page + 1}/{len(pages)}", callback_data="info"))
+                if page < len(pages) - 1:
+                    navigation.append(InlineKeyboardButton(
+                        "▶️", callback_data=encode_callback(KIND_PAGE, game_id, ply, page + 1)
+                    ))
+                keyboard.append(navigation)
             
             # Boutons d'actions générales
             keyboard.append([
@@ -172,7 +291,9 @@ class ChessEngine:
                 InlineKeyboardButton("🏳️ Abandonner", callback_data=f"resign_{game_id}")
             ])
             
-            return InlineKeyboardMarkup(keyboard)
+            markup = InlineKeyboardMarkup(keyboard)
+            self.keyboard_cache.put_keyboard(cache_key, markup)
+            return markup
             
         except Exception as e:
             logger.error(f"Erreur génération clavier: {e}")
@@ -180,6 +301,22 @@ class ChessEngine:
                 InlineKeyboardButton("❌ Erreur", callback_data="error")
             ]])
     
+    def resolve_move(self, board: chess.Board, ply: int, move_index: int) -> Optional[str]:
+        """
+        Retrouve le coup UCI désigné par un bouton
+        
+        Returns:
+            Optional[str]: Coup UCI, ou None si le bouton ne correspond plus
+            à la position (clic périmé ou index hors limites)
+        """
+        if board.ply() != ply:
+            return None
+        
+        for index, move in enumerate(board.legal_moves):
+            if index == move_index:
+                return move.uci()
+        return None
+    
     def _get_game_over_keyboard(self, game_id: int) -> InlineKeyboardMarkup:
         """Clavier pour une partie terminée"""
         keyboard = [
@@ -196,7 +333,11 @@ class ChessEngine:
         try:
             board = chess.Board(fen)
             
-            with chess.engine.SimpleEngine.popen_uci(self.stockfish_path) as engine:
+            cached = self.analysis_cache.get(board, depth)
+            if cached:
+                return cached
+            
+            with self.engine_pool.engine(self.analysis_skill) as engine:
                 info = engine.analyse(board, chess.engine.Limit(depth=depth))
                 
                 score = info.get('score')
@@ -212,12 +353,15 @@ class ChessEngine:
                 best_move = info.get('pv', [None])[0]
                 best_move_san = board.san(best_move) if best_move else "N/A"
                 
-                return {
+                analysis = {
                     'success': True,
                     'evaluation': evaluation,
                     'best_move': best_move_san,
                     'depth': depth
                 }
+                self.analysis_cache.put(board, analysis)
+                
+                return analysis
                 
         except Exception as e:
             logger.error(f"Erreur analyse: {e}")
@@ -226,21 +370,40 @@ class ChessEngine:
                 'error': str(e)
             }
     
+    async def analyse_async(self, fen: str, depth: int = 15) -> Dict:
+        """Analyse une position sans bloquer la boucle d'événements"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.analyze_position, fen, depth)
+    
+    def identify_opening(self, board: chess.Board) -> Optional[str]:
+        """Ouverture de la partie en cours, depuis la pile de coups de l'échiquier"""
+        match = get_opening_classifier().classify_board(board)
+        if match:
+            eco, name = match
+            return f"{name} ({eco})"
+        return None
+    
     def get_opening_name(self, pgn_moves: str) -> str:
-        """Identifie l'ouverture jouée"""
-        # Dictionnaire des ouvertures populaires
-        openings = {
-            "1.e4 e5 2.Nf3": "Ouverture du Roi",
-            "1.d4 d5": "Jeu de la Dame",
-            "1.e4 c5": "Défense Sicilienne",
-            "1.e4 e6": "Défense Française",
-            "1.e4 c6": "Défense Caro-Kann",
-            "1.Nf3": "Ouverture Réti",
-            "1.c4": "Ouverture Anglaise"
-        }
-        
-        for opening_moves, name in openings.items():
-            if pgn_moves.startswith(opening_moves):
-                return name
+        """Identifie l'ouverture jouée (transpositions comprises)"""
+        match = get_opening_classifier().classify_moves(pgn_moves)
+        if match:
+            eco, name = match
+            return f"{name} ({eco})"
         
         return "Ouverture non identifiée"
+    
+    def append_pgn_moves(self, pgn_moves: str, fen: str, moves_san: List[str]) -> str:
+        """Ajoute des coups SAN numérotés à partir de la position donnée"""
+        board = chess.Board(fen)
+        parts = [pgn_moves] if pgn_moves else []
+        
+        for move_san in moves_san:
+            if board.turn == chess.WHITE:
+                parts.append(f"{board.fullmove_number}.{move_san}")
+            elif not parts:
+                parts.append(f"{board.fullmove_number}...{move_san}")
+            else:
+                parts.append(move_san)
+            board.push_san(move_san)
+        
+        return ' '.join(parts)
@@ -12,21 +12,74 @@ class Config:
         "pool_recycle": 300,
         "pool_pre_ping": True,
     }
+    DB_AUTO_MIGRATE = os.environ.get('DB_AUTO_MIGRATE', 'false').lower() == 'true'  # migrations au démarrage (développement)
+    DB_SCHEMA_CHECK = os.environ.get('DB_SCHEMA_CHECK', 'true').lower() == 'true'  # refuser de démarrer avec des migrations en attente
     
     # Configuration Telegram
     TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
     OWNER_ID = int(os.environ.get('OWNER_ID', '0'))
     OWNER_USERNAME = os.environ.get('OWNER_USERNAME', 'admin')
     WEBHOOK_URL = os.environ.get('WEBHOOK_URL', '')
+    WEBHOOK_QUEUE_SIZE = int(os.environ.get('WEBHOOK_QUEUE_SIZE', '1000'))  # updates en attente de traitement
+    WEBHOOK_WORKERS = int(os.environ.get('WEBHOOK_WORKERS', '8'))  # utilisateurs traités en parallèle
+    WEBHOOK_LANE_SIZE = int(os.environ.get('WEBHOOK_LANE_SIZE', '20'))  # updates en attente par utilisateur
+    WEBHOOK_LANE_IDLE_TIMEOUT = int(os.environ.get('WEBHOOK_LANE_IDLE_TIMEOUT', '60'))  # secondes
+    WEBHOOK_DEDUP_WINDOW = int(os.environ.get('WEBHOOK_DEDUP_WINDOW', '600'))  # secondes de mémoire des update_id
+    WEBHOOK_DEDUP_MAX_ENTRIES = int(os.environ.get('WEBHOOK_DEDUP_MAX_ENTRIES', '100000'))
+    TELEGRAM_API_BASE_URL = os.environ.get('TELEGRAM_API_BASE_URL', '')  # ex. http://localhost:8081/bot (serveur local ou factice)
+    TELEGRAM_GLOBAL_RATE = float(os.environ.get('TELEGRAM_GLOBAL_RATE', '30'))  # messages/s tous chats confondus
+    TELEGRAM_CHAT_RATE = float(os.environ.get('TELEGRAM_CHAT_RATE', '1'))  # messages/s par conversation privée
+    TELEGRAM_CHAT_BURST = int(os.environ.get('TELEGRAM_CHAT_BURST', '3'))
+    TELEGRAM_GROUP_RATE_PER_MINUTE = float(os.environ.get('TELEGRAM_GROUP_RATE_PER_MINUTE', '20'))
+    TELEGRAM_MAX_RETRIES = int(os.environ.get('TELEGRAM_MAX_RETRIES', '3'))  # nouvelles tentatives après un 429
     
     # Configuration du moteur d'échecs
     STOCKFISH_PATH = os.environ.get('STOCKFISH_PATH', 'stockfish')
     DEFAULT_SKILL_LEVEL = int(os.environ.get('DEFAULT_SKILL_LEVEL', '5'))
     DEFAULT_AI_TIME = float(os.environ.get('DEFAULT_AI_TIME', '0.8'))
+    ANALYSIS_SKILL_LEVEL = int(os.environ.get('ANALYSIS_SKILL_LEVEL', '20'))
+    ENGINE_POOL_SIZE = int(os.environ.get('ENGINE_POOL_SIZE', '2'))
+    ENGINE_CHECKOUT_TIMEOUT = float(os.environ.get('ENGINE_CHECKOUT_TIMEOUT', '10'))  # secondes
+    ENGINE_HEALTH_CHECK_INTERVAL = int(os.environ.get('ENGINE_HEALTH_CHECK_INTERVAL', '60'))  # secondes
+    ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', '10000'))
+    ANALYSIS_CACHE_PERSISTENT = os.environ.get('ANALYSIS_CACHE_PERSISTENT', 'false').lower() == 'true'
+    OPENING_BOOK_PATH = os.environ.get('OPENING_BOOK_PATH', '')  # livre Polyglot .bin optionnel
+    OPENING_BOOK_MIN_PLIES = int(os.environ.get('OPENING_BOOK_MIN_PLIES', '8'))
+    OPENING_BOOK_MAX_PLIES = int(os.environ.get('OPENING_BOOK_MAX_PLIES', '12'))
+    # Base ECO à fournir en production (ex. fichiers a.tsv à e.tsv de lichess chess-openings):
+    # sans elle, seule une table intégrée d'une quarantaine d'ouvertures courantes est reconnue
+    ECO_DATA_PATH = os.environ.get('ECO_DATA_PATH', '')  # fichier ou répertoire TSV eco/name/pgn
+    KEYBOARD_CACHE_SIZE = int(os.environ.get('KEYBOARD_CACHE_SIZE', '5000'))
+    
+    # Configuration du rendu
+    RENDER_CACHE_MAX_BYTES = int(os.environ.get('RENDER_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+    RENDER_CACHE_DIR = os.environ.get('RENDER_CACHE_DIR', '')  # niveau disque optionnel
+    TELEGRAM_FILE_CACHE_SIZE = int(os.environ.get('TELEGRAM_FILE_CACHE_SIZE', '50000'))
+    RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', '2'))  # processus de rastérisation
+    RENDER_BACKEND = os.environ.get('RENDER_BACKEND', 'svg')  # svg (cairosvg) ou raster (Pillow)
+    RENDER_IMAGE_FORMAT = os.environ.get('RENDER_IMAGE_FORMAT', 'PNG')  # PNG ou WEBP (moteur raster)
+    GAME_MESSAGE_MODE = os.environ.get('GAME_MESSAGE_MODE', 'edit')  # edit (un message par partie) ou new (un message par coup)
+
+    # Configuration de la persistance
+    # Les parties actives sont tenues en mémoire par processus: une partie ne doit être jouée que
+    # par une seule instance (une écriture en retard sur la base est ignorée, la partie rechargée)
+    LIVE_GAMES_MAX = int(os.environ.get('LIVE_GAMES_MAX', '10000'))  # parties gardées en mémoire
+    LIVE_GAMES_IDLE_TIMEOUT = int(os.environ.get('LIVE_GAMES_IDLE_TIMEOUT', '3600'))  # secondes
+    LIVE_GAMES_FLUSH_INTERVAL = float(os.environ.get('LIVE_GAMES_FLUSH_INTERVAL', '1.0'))  # secondes
+    LIVE_GAMES_FLUSH_BATCH = int(os.environ.get('LIVE_GAMES_FLUSH_BATCH', '200'))  # coups par lot
+    TELEMETRY_FLUSH_INTERVAL_MS = int(os.environ.get('TELEMETRY_FLUSH_INTERVAL_MS', '500'))
+    TELEMETRY_BATCH_SIZE = int(os.environ.get('TELEMETRY_BATCH_SIZE', '500'))  # lignes par lot
+    TELEMETRY_MAX_QUEUE = int(os.environ.get('TELEMETRY_MAX_QUEUE', '10000'))
+    # block ne bloque que les appelants hors boucle asyncio; les handlers du bot passent en drop_oldest
+    TELEMETRY_OVERFLOW_POLICY = os.environ.get('TELEMETRY_OVERFLOW_POLICY', 'drop_oldest')  # drop_oldest, drop_newest ou block
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '100000'))
+    USER_ACTIVITY_FLUSH_INTERVAL = int(os.environ.get('USER_ACTIVITY_FLUSH_INTERVAL', '30'))  # secondes
     
     # Configuration du monitoring
     ENABLE_REAL_TIME_MONITORING = os.environ.get('ENABLE_REAL_TIME_MONITORING', 'true').lower() == 'true'
     MONITORING_UPDATE_INTERVAL = int(os.environ.get('MONITORING_UPDATE_INTERVAL', '5'))  # secondes
+    # Compteurs tenus en mémoire par processus: exacts avec un seul worker gunicorn et une seule instance
+    STATS_RECONCILE_INTERVAL = int(os.environ.get('STATS_RECONCILE_INTERVAL', '300'))  # secondes
     
     # Configuration des sessions
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
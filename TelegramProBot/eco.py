@@ -0,0 +1,182 @@
+import os
+import re
+import glob
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import chess
+
+from app import app
+
+logger = logging.getLogger(__name__)
+
+# Ouvertures intégrées (code ECO, nom, coups) utilisées sans base ECO externe: simple
+# repli pour le développement, la base complète est à fournir via ECO_DATA_PATH
+BUILTIN_OPENINGS: List[Tuple[str, str, str]] = [
+    ("B00", "Ouverture du Pion Roi", "1.e4"),
+    ("C20", "Partie du Pion Roi", "1.e4 e5"),
+    ("C40", "Ouverture du Roi", "1.e4 e5 2.Nf3"),
+    ("C42", "Défense Petrov", "1.e4 e5 2.Nf3 Nf6"),
+    ("C44", "Partie Écossaise", "1.e4 e5 2.Nf3 Nc6 3.d4"),
+    ("C50", "Partie Italienne", "1.e4 e5 2.Nf3 Nc6 3.Bc4"),
+    ("C55", "Défense des Deux Cavaliers", "1.e4 e5 2.Nf3 Nc6 3.Bc4 Nf6"),
+    ("C60", "Partie Espagnole", "1.e4 e5 2.Nf3 Nc6 3.Bb5"),
+    ("C65", "Partie Espagnole, Défense Berlinoise", "1.e4 e5 2.Nf3 Nc6 3.Bb5 Nf6"),
+    ("C68", "Partie Espagnole, Variante d'Échange", "1.e4 e5 2.Nf3 Nc6 3.Bb5 a6 4.Bxc6"),
+    ("C25", "Partie Viennoise", "1.e4 e5 2.Nc3"),
+    ("C30", "Gambit du Roi", "1.e4 e5 2.f4"),
+    ("B20", "Défense Sicilienne", "1.e4 c5"),
+    ("B22", "Défense Sicilienne, Variante Alapine", "1.e4 c5 2.c3"),
+    ("B23", "Défense Sicilienne Fermée", "1.e4 c5 2.Nc3"),
+    ("B90", "Défense Sicilienne, Variante Najdorf", "1.e4 c5 2.Nf3 d6 3.d4 cxd4 4.Nxd4 Nf6 5.Nc3 a6"),
+    ("B70", "Défense Sicilienne, Variante du Dragon", "1.e4 c5 2.Nf3 d6 3.d4 cxd4 4.Nxd4 Nf6 5.Nc3 g6"),
+    ("C00", "Défense Française", "1.e4 e6"),
+    ("C02", "Défense Française, Variante d'Avance", "1.e4 e6 2.d4 d5 3.e5"),
+    ("C03", "Défense Française, Variante Tarrasch", "1.e4 e6 2.d4 d5 3.Nd2"),
+    ("B10", "Défense Caro-Kann", "1.e4 c6"),
+    ("B12", "Défense Caro-Kann, Variante d'Avance", "1.e4 c6 2.d4 d5 3.e5"),
+    ("B01", "Défense Scandinave", "1.e4 d5"),
+    ("B07", "Défense Pirc", "1.e4 d6"),
+    ("B02", "Défense Alekhine", "1.e4 Nf6"),
+    ("A40", "Ouverture du Pion Dame", "1.d4"),
+    ("D00", "Jeu de la Dame", "1.d4 d5"),
+    ("D02", "Système de Londres", "1.d4 d5 2.Nf3 Nf6 3.Bf4"),
+    ("D06", "Gambit Dame", "1.d4 d5 2.c4"),
+    ("D20", "Gambit Dame Accepté", "1.d4 d5 2.c4 dxc4"),
+    ("D30", "Gambit Dame Refusé", "1.d4 d5 2.c4 e6"),
+    ("D10", "Défense Slave", "1.d4 d5 2.c4 c6"),
+    ("A45", "Défense Indienne", "1.d4 Nf6"),
+    ("E20", "Défense Nimzo-Indienne", "1.d4 Nf6 2.c4 e6 3.Nc3 Bb4"),
+    ("E12", "Défense Ouest-Indienne", "1.d4 Nf6 2.c4 e6 3.Nf3 b6"),
+    ("E60", "Défense Est-Indienne", "1.d4 Nf6 2.c4 g6"),
+    ("D80", "Défense Grünfeld", "1.d4 Nf6 2.c4 g6 3.Nc3 d5"),
+    ("A56", "Défense Benoni", "1.d4 Nf6 2.c4 c5"),
+    ("A80", "Défense Hollandaise", "1.d4 f5"),
+    ("A04", "Ouverture Réti", "1.Nf3"),
+    ("A10", "Ouverture Anglaise", "1.c4"),
+    ("A00", "Ouverture Irrégulière", "1.b3"),
+    ("A00", "Ouverture Irrégulière", "1.g3"),
+]
+
+_MOVE_NUMBER = re.compile(r'^\d+\.+')
+_RESULTS = {'1-0', '0-1', '1/2-1/2', '*'}
+
+def parse_san_tokens(moves_text: str) -> List[str]:
+    """Extrait les coups SAN d'un texte du type '1.e4 e5 2.Nf3'"""
+    tokens = []
+    for token in moves_text.split():
+        token = _MOVE_NUMBER.sub('', token)
+        if token and token not in _RESULTS:
+            tokens.append(token)
+    return tokens
+
+class OpeningClassifier:
+    """Index des ouvertures nommées par position (EPD) pour la classification ECO"""
+
+    def __init__(self, data_path: Optional[str] = None):
+        self._index: Dict[str, Tuple[str, str]] = {}
+
+        loaded = self._load_files(data_path) if data_path else 0
+        if not loaded:
+            logger.warning(
+                f"Aucune base ECO chargée (ECO_DATA_PATH={data_path or 'non défini'}): "
+                f"table intégrée de {len(BUILTIN_OPENINGS)} ouvertures seulement"
+            )
+            for eco, name, moves in BUILTIN_OPENINGS:
+                self._add(eco, name, moves)
+
+        logger.info(f"Classification ECO: {len(self._index)} positions indexées")
+
+    def _add(self, eco: str, name: str, moves_text: str) -> bool:
+        """Indexe la position atteinte après la séquence de coups"""
+        board = chess.Board()
+        try:
+            for san in parse_san_tokens(moves_text):
+                board.push_san(san)
+        except ValueError as e:
+            logger.warning(f"Ouverture ignorée ({eco} {name}): {e}")
+            return False
+
+        self._index[board.epd()] = (eco, name)
+        return True
+
+    def _load_files(self, data_path: str) -> int:
+        """
+        Charge des fichiers TSV au format eco/name/pgn (ex. lichess chess-openings)
+
+        Args:
+            data_path: Fichier TSV ou répertoire contenant des fichiers *.tsv
+
+        Returns:
+            int: Nombre d'ouvertures chargées
+        """
+        if os.path.isdir(data_path):
+            paths = sorted(glob.glob(os.path.join(data_path, '*.tsv')))
+        else:
+            paths = [data_path]
+
+        loaded = 0
+        for path in paths:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    for line in f:
+                        columns = line.rstrip('\n').split('\t')
+                        if len(columns) < 3 or columns[0] == 'eco':
+                            continue
+                        if self._add(columns[0], columns[1], columns[2]):
+                            loaded += 1
+            except OSError as e:
+                logger.error(f"Impossible de lire la base ECO {path}: {e}")
+
+        return loaded
+
+    def classify_board(self, board: chess.Board) -> Optional[Tuple[str, str]]:
+        """Ouverture nommée la plus profonde atteinte dans la partie du plateau"""
+        replay = board.root()
+        match = self._index.get(replay.epd())
+
+        for move in board.move_stack:
+            replay.push(move)
+            match = self._index.get(replay.epd(), match)
+
+        return match
+
+    def classify_moves(self, moves_text: str) -> Optional[Tuple[str, str]]:
+        """Ouverture nommée la plus profonde pour une suite de coups SAN"""
+        board = chess.Board()
+        match = None
+
+        for san in parse_san_tokens(moves_text or ''):
+            try:
+                board.push_san(san)
+            except ValueError:
+                break
+            match = self._index.get(board.epd(), match)
+
+        return match
+
+    def opening_stats(self, move_texts: Iterable[str]) -> List[Dict]:
+        """Répartition des ouvertures sur un ensemble de parties"""
+        counts = Counter()
+        for moves_text in move_texts:
+            match = self.classify_moves(moves_text)
+            counts[match or ('', 'Ouverture non identifiée')] += 1
+
+        return [
+            {'eco': eco, 'name': name, 'count': count}
+            for (eco, name), count in counts.most_common()
+        ]
+
+_classifier: Optional[OpeningClassifier] = None
+_classifier_lock = threading.Lock()
+
+def get_opening_classifier() -> OpeningClassifier:
+    """Retourne l'index ECO partagé, chargé une seule fois"""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = OpeningClassifier(app.config.get('ECO_DATA_PATH') or None)
+    return _classifier
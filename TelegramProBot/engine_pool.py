@@ -0,0 +1,181 @@
+import time
+import queue
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import chess.engine
+
+logger = logging.getLogger(__name__)
+
+class EnginePoolExhausted(Exception):
+    """Aucun moteur disponible dans le délai imparti"""
+
+class PooledEngine:
+    """Processus Stockfish maintenu au chaud avec sa configuration courante"""
+
+    def __init__(self, engine: chess.engine.SimpleEngine):
+        self.engine = engine
+        self.skill_level: Optional[int] = None
+        self.broken = False
+
+    def configure_skill(self, skill_level: Optional[int]):
+        """Reconfigure le niveau uniquement s'il a changé"""
+        if skill_level is None or skill_level == self.skill_level:
+            return
+        self.engine.configure({"Skill Level": skill_level})
+        self.skill_level = skill_level
+
+    def close(self):
+        """Arrête le processus sans lever d'erreur"""
+        try:
+            self.engine.quit()
+        except Exception:
+            try:
+                self.engine.close()
+            except Exception:
+                pass
+
+class EnginePool:
+    """Pool borné de processus Stockfish réutilisés entre les requêtes"""
+
+    def __init__(self, engine_path: str, size: int = 2, checkout_timeout: float = 10.0):
+        self.engine_path = engine_path
+        self.size = max(1, size)
+        self.checkout_timeout = checkout_timeout
+
+        # LIFO: le moteur le plus récemment utilisé a les caches les plus chauds
+        self._idle: "queue.LifoQueue[PooledEngine]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+
+    def _spawn(self) -> PooledEngine:
+        """Lance un nouveau processus Stockfish"""
+        engine = chess.engine.SimpleEngine.popen_uci(self.engine_path)
+        logger.info(f"Moteur Stockfish démarré (pool {self._created}/{self.size})")
+        return PooledEngine(engine)
+
+    def checkout(self, timeout: Optional[float] = None) -> PooledEngine:
+        """Emprunte un moteur, en le créant si le pool n'est pas plein"""
+        if self._closed:
+            raise EnginePoolExhausted("Pool de moteurs fermé")
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_spawn = self._created < self.size
+            if can_spawn:
+                self._created += 1
+
+        if can_spawn:
+            try:
+                return self._spawn()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=timeout if timeout is not None else self.checkout_timeout)
+        except queue.Empty:
+            raise EnginePoolExhausted("Tous les moteurs sont occupés")
+
+    def checkin(self, pooled: PooledEngine):
+        """Rend un moteur au pool, ou le détruit s'il est défaillant"""
+        if pooled.broken or self._closed:
+            pooled.close()
+            with self._lock:
+                self._created -= 1
+            if pooled.broken:
+                logger.warning("Moteur Stockfish défaillant retiré du pool")
+            return
+
+        self._idle.put(pooled)
+
+    @contextmanager
+    def engine(self, skill_level: Optional[int] = None) -> Iterator[chess.engine.SimpleEngine]:
+        """
+        Emprunte un moteur configuré pour la durée du bloc
+
+        Args:
+            skill_level: Niveau Stockfish à appliquer (None pour ne pas changer)
+
+        Yields:
+            chess.engine.SimpleEngine: Moteur prêt à l'emploi
+        """
+        pooled = self.checkout()
+        try:
+            pooled.configure_skill(skill_level)
+            yield pooled.engine
+        except (chess.engine.EngineTerminatedError, chess.engine.EngineError, TimeoutError):
+            # Le processus a planté ou ne répond plus: il sera relancé au prochain emprunt
+            pooled.broken = True
+            raise
+        finally:
+            self.checkin(pooled)
+
+    def health_check(self) -> int:
+        """Vérifie les moteurs inactifs et retire ceux qui ne répondent plus"""
+        checked = []
+        removed = 0
+
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                pooled.engine.ping()
+            except Exception as e:
+                logger.warning(f"Moteur Stockfish sans réponse: {e}")
+                pooled.broken = True
+                removed += 1
+            checked.append(pooled)
+
+        for pooled in checked:
+            self.checkin(pooled)
+
+        return removed
+
+    def start_health_checks(self, interval: float = 60.0):
+        """Démarre la vérification périodique des moteurs en arrière-plan"""
+        def loop():
+            while not self._closed:
+                time.sleep(interval)
+                try:
+                    self.health_check()
+                except Exception as e:
+                    logger.error(f"Erreur vérification moteurs: {e}")
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        atexit.register(self.close)
+
+    def stats(self) -> dict:
+        """Statistiques d'occupation du pool"""
+        idle = self._idle.qsize()
+        return {
+            'size': self.size,
+            'created': self._created,
+            'idle': idle,
+            'busy': self._created - idle
+        }
+
+    def close(self):
+        """Arrête tous les moteurs du pool"""
+        self._closed = True
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            pooled.close()
+            with self._lock:
+                self._created -= 1
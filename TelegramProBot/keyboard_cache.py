@@ -0,0 +1,184 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import chess
+import chess.polyglot
+
+logger = logging.getLogger(__name__)
+
+PIECE_GROUPS = [
+    (chess.PAWN, "♟️ Pions"),
+    (chess.ROOK, "♜ Tours"),
+    (chess.KNIGHT, "♞ Cavaliers"),
+    (chess.BISHOP, "♝ Fous"),
+    (chess.QUEEN, "♛ Reine"),
+    (chess.KING, "♚ Roi"),
+]
+
+# Groupes de coups d'une position: [(libellé, [(san, index du coup légal), ...]), ...]
+MoveLayout = List[Tuple[str, List[Tuple[str, int]]]]
+
+def bulk_san(board: chess.Board, moves: List[chess.Move]) -> Dict[chess.Move, str]:
+    """
+    Notation SAN de tous les coups légaux en une seule passe
+
+    Contrairement à board.san(), aucun coup n'est revalidé: la levée
+    d'ambiguïté est déduite de la liste des coups déjà générée, et seuls
+    l'échec et le mat sont vérifiés en jouant le coup.
+    """
+    # Coups de pièces (hors pions) arrivant sur une même case, pour la désambiguïsation
+    rivals: Dict[Tuple[chess.PieceType, chess.Square], List[chess.Square]] = {}
+    piece_types = {}
+    for move in moves:
+        piece_type = board.piece_type_at(move.from_square)
+        piece_types[move] = piece_type
+        if piece_type not in (chess.PAWN, chess.KING):
+            rivals.setdefault((piece_type, move.to_square), []).append(move.from_square)
+
+    sans = {}
+    for move in moves:
+        piece_type = piece_types[move]
+
+        if piece_type == chess.KING and board.is_castling(move):
+            san = "O-O" if chess.square_file(move.to_square) > chess.square_file(move.from_square) else "O-O-O"
+        else:
+            capture = board.is_capture(move)
+            to_name = chess.SQUARE_NAMES[move.to_square]
+
+            if piece_type == chess.PAWN:
+                san = f"{chess.FILE_NAMES[chess.square_file(move.from_square)]}x{to_name}" if capture else to_name
+                if move.promotion:
+                    san += "=" + chess.piece_symbol(move.promotion).upper()
+            else:
+                san = chess.piece_symbol(piece_type).upper()
+                others = [sq for sq in rivals.get((piece_type, move.to_square), []) if sq != move.from_square]
+                if others:
+                    same_file = any(chess.square_file(sq) == chess.square_file(move.from_square) for sq in others)
+                    same_rank = any(chess.square_rank(sq) == chess.square_rank(move.from_square) for sq in others)
+                    if not same_file:
+                        san += chess.FILE_NAMES[chess.square_file(move.from_square)]
+                    elif not same_rank:
+                        san += chess.RANK_NAMES[chess.square_rank(move.from_square)]
+                    else:
+                        san += chess.SQUARE_NAMES[move.from_square]
+                san += ("x" if capture else "") + to_name
+
+        board.push(move)
+        if board.is_check():
+            san += "#" if not any(board.generate_legal_moves()) else "+"
+        board.pop()
+
+        sans[move] = san
+
+    return sans
+
+def build_move_layout(board: chess.Board) -> MoveLayout:
+    """Coups légaux groupés par type de pièce, générés en une passe"""
+    moves = list(board.legal_moves)
+    sans = bulk_san(board, moves)
+
+    # L'index renvoie à l'ordre de génération de board.legal_moves, stable pour une position
+    grouped: Dict[chess.PieceType, List[Tuple[str, int]]] = {piece_type: [] for piece_type, _ in PIECE_GROUPS}
+    for index, move in enumerate(moves):
+        grouped[board.piece_type_at(move.from_square)].append((sans[move], index))
+
+    return [(label, grouped[piece_type]) for piece_type, label in PIECE_GROUPS if grouped[piece_type]]
+
+def paginate_layout(layout: MoveLayout, moves_per_page: int) -> List[MoveLayout]:
+    """
+    Découpe la disposition en pages sans perdre de coup
+
+    Un groupe coupé entre deux pages reprend son libellé en tête de la
+    page suivante.
+    """
+    pages: List[MoveLayout] = []
+    page: MoveLayout = []
+    room = moves_per_page
+
+    for label, moves in layout:
+        start = 0
+        while start < len(moves):
+            if room == 0:
+                pages.append(page)
+                page, room = [], moves_per_page
+            chunk = moves[start:start + room]
+            page.append((label, chunk))
+            start += len(chunk)
+            room -= len(chunk)
+
+    if page:
+        pages.append(page)
+    return pages
+
+class MoveKeyboardCache:
+    """
+    Cache LRU des claviers de coups
+
+    Deux niveaux: la disposition des coups (SAN groupés), partagée par toutes
+    les parties passant par la même position, et le clavier Telegram final,
+    propre à une partie puisque ses boutons d'action portent l'id de partie.
+    """
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+
+        self._layouts: "OrderedDict[int, MoveLayout]" = OrderedDict()
+        self._keyboards: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.layout_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def position_key(board: chess.Board) -> int:
+        """Hash Zobrist: trait, roques et prise en passant inclus"""
+        return chess.polyglot.zobrist_hash(board)
+
+    def get_keyboard(self, key: Hashable):
+        """Clavier déjà construit pour cette clé"""
+        with self._lock:
+            keyboard = self._keyboards.get(key)
+            if keyboard is not None:
+                self._keyboards.move_to_end(key)
+                self.hits += 1
+            return keyboard
+
+    def put_keyboard(self, key: Hashable, keyboard):
+        self._store(self._keyboards, key, keyboard)
+
+    def layout(self, board: chess.Board, position_key: Optional[int] = None) -> MoveLayout:
+        """Disposition des coups de la position, calculée au premier usage"""
+        if position_key is None:
+            position_key = self.position_key(board)
+
+        with self._lock:
+            layout = self._layouts.get(position_key)
+            if layout is not None:
+                self._layouts.move_to_end(position_key)
+                self.layout_hits += 1
+                return layout
+            self.misses += 1
+
+        layout = build_move_layout(board)
+        self._store(self._layouts, position_key, layout)
+        return layout
+
+    def _store(self, entries: OrderedDict, key: Hashable, value):
+        with self._lock:
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Statistiques d'utilisation du cache"""
+        with self._lock:
+            return {
+                'keyboards': len(self._keyboards),
+                'layouts': len(self._layouts),
+                'hits': self.hits,
+                'layout_hits': self.layout_hits,
+                'misses': self.misses
+            }
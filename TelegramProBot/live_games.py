@@ -0,0 +1,402 @@
+import time
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import chess
+from sqlalchemy import bindparam, func
+
+from app import app, db
+from models import ChessGame, GameMove
+
+logger = logging.getLogger(__name__)
+
+# Colonnes de ChessGame tenues à jour en mémoire puis réécrites en lot
+GAME_FIELDS = ('pgn_moves', 'status', 'result', 'move_count', 'finished_at', 'message_id')
+
+# Vidages en échec d'une partie avant de l'écrire seule, puis de l'abandonner
+MAX_WRITE_ATTEMPTS = 3
+
+def _game_update():
+    """UPDATE des colonnes suivies, appliqué seulement si la version en base est celle lue par ce processus"""
+    table = ChessGame.__table__
+    return table.update()\
+        .where(table.c.id == bindparam('game_id'))\
+        .where(func.coalesce(table.c.version, 0) == bindparam('expected_version'))\
+        .values({name: bindparam(name) for name in ('board_fen', 'version') + GAME_FIELDS})
+
+_GAME_UPDATE = _game_update()
+
+class LiveGame:
+    """
+    État d'une partie en cours, tenu en mémoire
+
+    Expose les mêmes attributs que ChessGame (board_fen, move_count, ...)
+    pour être utilisé à sa place par le moteur, le rendu et les claviers,
+    et garde l'échiquier avec sa pile de coups pour éviter de réanalyser
+    le FEN à chaque clic.
+    """
+
+    def __init__(self, game: ChessGame, board: chess.Board):
+        self.id = game.id
+        self.user_id = game.user_id
+        self.board = board
+        self.pgn_moves = game.pgn_moves or ''
+        self.status = game.status
+        self.result = game.result
+        self.difficulty_level = game.difficulty_level
+        self.move_count = game.move_count or 0
+        self.ai_thinking_time = game.ai_thinking_time
+        self.created_at = game.created_at
+        self.finished_at = game.finished_at
+        self.message_id = game.message_id
+        self.version = game.version or 0
+
+        self.last_access = time.monotonic()
+
+    @property
+    def board_fen(self) -> str:
+        return self.board.fen()
+
+    @property
+    def ply(self) -> int:
+        return self.board.ply()
+
+class LiveGameStore:
+    """
+    Parties actives en mémoire avec écriture différée
+
+    Les coups et les changements d'état sont mis en file puis écrits en
+    base par lots (un seul commit) à intervalle régulier. La base reste la
+    référence au redémarrage: une partie absente de la mémoire est rechargée
+    en rejouant ses coups enregistrés.
+
+    Chaque partie ne doit être jouée que par un seul processus à la fois.
+    Par précaution, chaque écriture vérifie la version de la partie
+    (ChessGame.version): si un autre processus l'a modifiée depuis sa
+    lecture, la partie et ses coups en attente ne sont pas écrits, et la
+    partie est rechargée depuis la base au prochain accès.
+
+    Un lot en échec est retenté aux vidages suivants; une partie présente
+    dans MAX_WRITE_ATTEMPTS lots en échec est écrite seule, et abandonnée
+    (rechargée depuis la base) si cette écriture échoue aussi.
+    """
+
+    def __init__(self, max_games: int = 10000, idle_timeout: float = 3600.0, batch_size: int = 200):
+        self.max_games = max_games
+        self.idle_timeout = idle_timeout
+        self.batch_size = batch_size
+
+        self._games: "OrderedDict[int, LiveGame]" = OrderedDict()
+        # Parties modifiées depuis le dernier vidage, gardées même si libérées de _games
+        self._dirty: Dict[int, LiveGame] = {}
+        self._pending_moves: List[Dict] = []
+        self._attempts: Dict[int, int] = {}
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+
+        self.loads = 0
+        self.flushes = 0
+        self.flushed_moves = 0
+        self.flush_errors = 0
+        self.stale_writes = 0
+        self.dropped_moves = 0
+
+    def get(self, game_id: int) -> Optional[LiveGame]:
+        """Partie en mémoire, rechargée depuis la base si nécessaire"""
+        with self._lock:
+            live = self._games.get(game_id)
+            if live is not None:
+                self._games.move_to_end(game_id)
+                live.last_access = time.monotonic()
+                return live
+
+        live = self._load(game_id)
+        if live is None:
+            return None
+
+        with self._lock:
+            # Un autre appel a pu charger la partie entre-temps
+            existing = self._games.get(game_id)
+            if existing is not None:
+                return existing
+            self._remember(live)
+            self.loads += 1
+        return live
+
+    def register(self, game: ChessGame) -> LiveGame:
+        """Ajoute une partie qui vient d'être créée en base"""
+        live = LiveGame(game, chess.Board(game.board_fen))
+        with self._lock:
+            self._remember(live)
+        return live
+
+    def current_ply(self, game_id: int) -> Optional[int]:
+        """Demi-coup courant d'une partie en mémoire, None si elle n'y est pas"""
+        with self._lock:
+            live = self._games.get(game_id)
+            return live.ply if live is not None else None
+
+    def record_move(self, live: LiveGame, move_uci: str, move_san: str, player: str,
+                    move_number: int, time_spent: Optional[float] = None):
+        """Joue le coup sur l'échiquier en mémoire et met sa ligne GameMove en file"""
+        with self._lock:
+            live.board.push_uci(move_uci)
+            self._pending_moves.append({
+                'game_id': live.id,
+                'move_number': move_number,
+                'move_uci': move_uci,
+                'move_san': move_san,
+                'player': player,
+                'time_spent': time_spent,
+                'created_at': datetime.utcnow()
+            })
+            self._dirty[live.id] = live
+
+            # Lot complet: vider sans attendre la fin de l'intervalle
+            if len(self._pending_moves) >= self.batch_size:
+                self._wake.set()
+
+    def update(self, live: LiveGame, **fields):
+        """Modifie l'état de la partie; écrit en base au prochain vidage"""
+        with self._lock:
+            for name, value in fields.items():
+                if name not in GAME_FIELDS:
+                    raise ValueError(f"Champ de partie inconnu: {name}")
+                setattr(live, name, value)
+            self._dirty[live.id] = live
+
+    def flush(self) -> int:
+        """
+        Écrit en un seul commit les coups et états en attente
+
+        Returns:
+            int: Nombre de coups écrits
+        """
+        with self._flush_lock:
+            with self._lock:
+                moves = self._pending_moves
+                dirty = self._dirty
+                self._pending_moves = []
+                self._dirty = {}
+
+            if not moves and not dirty:
+                with self._lock:
+                    self._evict()
+                return 0
+
+            moves_by_game: Dict[int, List[Dict]] = {}
+            for move in moves:
+                moves_by_game.setdefault(move['game_id'], []).append(move)
+            units = [(dirty[game_id], moves_by_game.get(game_id, [])) for game_id in dirty]
+
+            try:
+                written = self._write(units)
+            except Exception as e:
+                logger.error(f"Erreur écriture différée des parties: {e}")
+                with self._lock:
+                    self.flush_errors += 1
+                written = self._retry_later(units)
+
+            with self._lock:
+                self.flushes += 1
+                self.flushed_moves += written
+                self._evict()
+
+            return written
+
+    def _write(self, units: List[Tuple[LiveGame, List[Dict]]]) -> int:
+        """
+        Écrit des parties et leurs coups dans une transaction
+
+        Chaque partie est mise à jour seule, pour savoir si sa version a
+        changé; les coups d'une partie ainsi écartée ne sont pas insérés.
+
+        Returns:
+            int: Nombre de coups écrits
+        """
+        written = []
+        stale = []
+        with app.app_context():
+            try:
+                moves = []
+                for live, game_moves in units:
+                    with self._lock:
+                        params = {
+                            'game_id': live.id,
+                            'expected_version': live.version,
+                            'version': live.version + 1,
+                            'board_fen': live.board_fen,
+                            **{name: getattr(live, name) for name in GAME_FIELDS}
+                        }
+                    if db.session.execute(_GAME_UPDATE, params).rowcount:
+                        written.append((live, params['version']))
+                        moves.extend(game_moves)
+                    else:
+                        stale.append((live, game_moves))
+                if moves:
+                    db.session.bulk_insert_mappings(GameMove, moves)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+        with self._lock:
+            for live, version in written:
+                live.version = version
+                self._attempts.pop(live.id, None)
+            for live, game_moves in stale:
+                logger.warning(f"Partie {live.id} modifiée par un autre processus, "
+                               f"{len(game_moves)} coups écartés, rechargement")
+                self._forget(live)
+                self.stale_writes += 1
+                self.dropped_moves += len(game_moves)
+
+        return len(moves)
+
+    def _retry_later(self, units: List[Tuple[LiveGame, List[Dict]]]) -> int:
+        """
+        Remet en file les parties d'un lot en échec
+
+        Une partie ayant atteint MAX_WRITE_ATTEMPTS échecs est écrite seule,
+        pour qu'une ligne invalide ne bloque plus les autres; si elle échoue
+        encore, ses coups sont abandonnés et elle est rechargée depuis la base.
+
+        Returns:
+            int: Nombre de coups écrits par les parties écrites seules
+        """
+        written = 0
+        requeued = []
+        for live, game_moves in units:
+            with self._lock:
+                attempts = self._attempts.get(live.id, 0) + 1
+                self._attempts[live.id] = attempts
+            if attempts < MAX_WRITE_ATTEMPTS:
+                requeued.append((live, game_moves))
+                continue
+
+            try:
+                written += self._write([(live, game_moves)])
+            except Exception as e:
+                logger.error(f"Partie {live.id} non écrite après {attempts} essais, "
+                             f"{len(game_moves)} coups abandonnés: {e}")
+                with self._lock:
+                    self._attempts.pop(live.id, None)
+                    self._forget(live)
+                    self.dropped_moves += len(game_moves)
+
+        # Remettre en file pour la prochaine tentative, dans l'ordre d'origine
+        with self._lock:
+            self._pending_moves = [move for _, game_moves in requeued for move in game_moves] + self._pending_moves
+            for live, _ in requeued:
+                self._dirty.setdefault(live.id, live)
+
+        return written
+
+    def _forget(self, live: LiveGame):
+        """Retire une partie de la mémoire (rechargée depuis la base au prochain accès)"""
+        if self._games.get(live.id) is live:
+            del self._games[live.id]
+        if self._dirty.get(live.id) is live:
+            del self._dirty[live.id]
+        self._pending_moves = [move for move in self._pending_moves if move['game_id'] != live.id]
+
+    def start(self, interval: float = 1.0):
+        """Démarre le vidage périodique en arrière-plan"""
+        def loop():
+            while not self._closed:
+                self._wake.wait(interval)
+                self._wake.clear()
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"Erreur vidage des parties: {e}")
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        atexit.register(self.close)
+
+    def close(self):
+        """Arrête le vidage périodique et écrit ce qui reste en attente"""
+        self._closed = True
+        self._wake.set()
+        self.flush()
+
+    def _load(self, game_id: int) -> Optional[LiveGame]:
+        """Reconstruit une partie depuis la base"""
+        try:
+            with app.app_context():
+                game = ChessGame.query.get(game_id)
+                if game is None:
+                    return None
+
+                board = self._replay(game)
+                return LiveGame(game, board)
+        except Exception as e:
+            logger.error(f"Erreur chargement partie {game_id}: {e}")
+            return None
+
+    def _replay(self, game: ChessGame) -> chess.Board:
+        """
+        Rejoue les coups enregistrés pour retrouver la pile de coups
+
+        Si la rejouée ne mène pas au FEN enregistré (coups manquants ou
+        partie antérieure à l'historique), seul le FEN est repris.
+        """
+        board = chess.Board()
+        moves = GameMove.query\
+            .filter_by(game_id=game.id)\
+            .order_by(GameMove.id)\
+            .all()
+
+        try:
+            for move in moves:
+                board.push_uci(move.move_uci)
+        except ValueError:
+            return chess.Board(game.board_fen)
+
+        if board.fen() != game.board_fen:
+            return chess.Board(game.board_fen)
+        return board
+
+    def _remember(self, live: LiveGame):
+        self._games[live.id] = live
+        self._games.move_to_end(live.id)
+        # Surnombre: libérer les parties les moins récemment jouées déjà écrites
+        if len(self._games) > self.max_games:
+            for game_id in list(self._games):
+                if len(self._games) <= self.max_games:
+                    break
+                if game_id not in self._dirty:
+                    del self._games[game_id]
+
+    def _evict(self):
+        """Libère les parties terminées ou inactives déjà écrites en base"""
+        now = time.monotonic()
+        for game_id in list(self._games):
+            if game_id in self._dirty:
+                continue
+            live = self._games[game_id]
+            if live.status != 'active' or now - live.last_access > self.idle_timeout:
+                del self._games[game_id]
+
+    def stats(self) -> dict:
+        """Statistiques du magasin de parties"""
+        with self._lock:
+            return {
+                'games': len(self._games),
+                'dirty': len(self._dirty),
+                'pending_moves': len(self._pending_moves),
+                'loads': self.loads,
+                'flushes': self.flushes,
+                'flushed_moves': self.flushed_moves,
+                'flush_errors': self.flush_errors,
+                'stale_writes': self.stale_writes,
+                'dropped_moves': self.dropped_moves,
+                'retrying_games': len(self._attempts)
+            }
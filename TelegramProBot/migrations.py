@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Migrations du schéma de la base
+
+Chaque migration est appliquée une seule fois et enregistrée dans la table
+schema_migrations. Les index sont créés avec CREATE INDEX CONCURRENTLY sur
+PostgreSQL (sans verrouiller les écritures) et les backfills mettent à jour
+les lignes par lots, chaque lot dans sa propre transaction.
+
+Usage:
+    python migrations.py upgrade [--database-url URL]
+    python migrations.py status [--database-url URL]
+"""
+import os
+import sys
+import logging
+import argparse
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Sequence
+
+from sqlalchemy import (Boolean, Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, Text,
+                        inspect, text)
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = 'schema_migrations'
+
+# Verrou consultatif PostgreSQL: un seul processus migre à la fois
+ADVISORY_LOCK_KEY = 720_190_020
+
+class Migration(NamedTuple):
+    """Étape du schéma: version triable, description et fonction appliquée à une connexion"""
+    version: str
+    description: str
+    apply: Callable
+
+def create_index(connection, name: str, table: str, columns: Sequence[str], unique: bool = False):
+    """
+    Crée un index s'il n'existe pas
+
+    Sur PostgreSQL l'index est construit en CONCURRENTLY, hors transaction;
+    un index laissé invalide par une construction interrompue est recréé.
+    """
+    unique_sql = 'UNIQUE ' if unique else ''
+    columns_sql = ', '.join(columns)
+
+    if connection.dialect.name == 'postgresql':
+        valid = connection.execute(text(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name"
+        ), {'name': name}).scalar()
+        connection.commit()
+        if valid:
+            return
+        with connection.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as autocommit:
+            if valid is False:
+                logger.warning(f"Index invalide {name}: reconstruction")
+                autocommit.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            autocommit.exec_driver_sql(
+                f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns_sql})"
+            )
+        return
+
+    connection.exec_driver_sql(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({columns_sql})")
+    connection.commit()
+
+def add_column(connection, table: str, column: str, ddl: str):
+    """Ajoute une colonne (nullable, sans valeur par défaut: pas de réécriture de la table)"""
+    columns = {info['name'] for info in inspect(connection).get_columns(table)}
+    if column in columns:
+        return
+    connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+    connection.commit()
+
+def backfill(connection, table: str, assignments: str, condition: str, batch_size: int = 1000) -> int:
+    """
+    Met à jour par lots les lignes vérifiant condition
+
+    Chaque lot est validé séparément pour ne pas tenir de longs verrous;
+    la condition doit cesser d'être vraie une fois la ligne mise à jour.
+
+    Returns:
+        int: Nombre de lignes mises à jour
+    """
+    statement = text(
+        f"UPDATE {table} SET {assignments} WHERE id IN "
+        f"(SELECT id FROM {table} WHERE {condition} LIMIT :batch_size)"
+    )
+
+    updated = 0
+    while True:
+        result = connection.execute(statement, {'batch_size': batch_size})
+        connection.commit()
+        if not result.rowcount:
+            break
+        updated += result.rowcount
+        logger.info(f"Backfill {table}: {updated} lignes")
+    return updated
+
+# Schéma initial figé: les modèles évoluent, cette définition ne doit plus changer
+_INITIAL_SCHEMA = MetaData()
+
+Table(
+    'admin_users', _INITIAL_SCHEMA,
+    Column('id', Integer, primary_key=True),
+    Column('username', String(64), unique=True, nullable=False),
+    Column('telegram_id', Integer, unique=True, nullable=False),
+    Column('password_hash', String(256), nullable=False),
+    Column('is_active', Boolean),
+    Column('created_at', DateTime),
+    Column('last_login', DateTime),
+)
+
+Table(
+    'telegram_users', _INITIAL_SCHEMA,
+    Column('id', Integer, primary_key=True),
+    Column('telegram_id', Integer, unique=True, nullable=False),
+    Column('username', String(64)),
+    Column('first_name', String(64)),
+    Column('last_name', String(64)),
+    Column('language_code', String(10)),
+    Column('is_bot', Boolean),
+    Column('is_blocked', Boolean),
+    Column('created_at', DateTime),
+    Column('last_activity', DateTime),
+)
+
+Table(
+    'chess_games', _INITIAL_SCHEMA,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('telegram_users.id'), nullable=False),
+    Column('board_fen', Text, nullable=False),
+    Column('pgn_moves', Text),
+    Column('status', String(20)),
+    Column('result', String(20)),
+    Column('difficulty_level', Integer),
+    Column('move_count', Integer),
+    Column('ai_thinking_time', Float),
+    Column('created_at', DateTime),
+    Column('finished_at', DateTime),
+)
+
+Table(
+    'game_moves', _INITIAL_SCHEMA,
+    Column('id', Integer, primary_key=True),
+    Column('game_id', Integer, ForeignKey('chess_games.id'), nullable=False),
+    Column('move_number', Integer, nullable=False),
+    Column('move_uci', String(10), nullable=False),
+    Column('move_san', String(20), nullable=False),
+    Column('player', String(10), nullable=False),
+    Column('time_spent', Float),
+    Column('created_at', DateTime),
+)
+
+Table(
+    'game_photos', _INITIAL_SCHEMA,
+    Column('id', Integer, primary_key=True),
+    Column('game_id', Integer, ForeignKey('chess_games.id'), nullable=False),
+    Column('telegram_file_id', String(255), nullable=False),
+    Column('file_size', Integer),
+    Column('created_at', DateTime),
+)
+
+Table(
+    'user_activities', _INITIAL_SCHEMA,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('telegram_users.id'), nullable=False),
+    Column('activity_type', String(50), nullable=False),
+    Column('description', Text),
+    Column('data', Text),
+    Column('ip_address', String(45)),
+    Column('created_at', DateTime),
+)
+
+Table(
+    'system_stats', _INITIAL_SCHEMA,
+    Column('id', Integer, primary_key=True),
+    Column('metric_name', String(100), nullable=False),
+    Column('metric_value', Float, nullable=False),
+    Column('metric_type', String(20)),
+    Column('recorded_at', DateTime),
+)
+
+Table(
+    'bot_commands', _INITIAL_SCHEMA,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('telegram_users.id'), nullable=False),
+    Column('command', String(100), nullable=False),
+    Column('parameters', Text),
+    Column('response_time', Float),
+    Column('success', Boolean),
+    Column('error_message', Text),
+    Column('created_at', DateTime),
+)
+
+# Tables des caches d'analyse et des agrégats d'activité, figées de même
+_CACHE_TABLES = MetaData()
+
+Table(
+    'activity_rollups', _CACHE_TABLES,
+    Column('id', Integer, primary_key=True),
+    Column('bucket_start', DateTime, unique=True, nullable=False),
+    Column('activity_count', Integer, nullable=False),
+    Column('created_at', DateTime),
+)
+
+Table(
+    'position_analyses', _CACHE_TABLES,
+    Column('id', Integer, primary_key=True),
+    Column('position_key', String(16), unique=True, nullable=False),
+    Column('epd', Text, nullable=False),
+    Column('evaluation', String(20), nullable=False),
+    Column('best_move', String(20), nullable=False),
+    Column('depth', Integer, nullable=False),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+)
+
+def _initial_schema(connection):
+    # Tables manquantes uniquement: les tables existantes ne sont jamais modifiées ici
+    _INITIAL_SCHEMA.create_all(bind=connection, checkfirst=True)
+    connection.commit()
+
+def _game_photo_render_key(connection):
+    add_column(connection, 'game_photos', 'render_key', 'VARCHAR(40)')
+    create_index(connection, 'ix_game_photos_render_key', 'game_photos', ['render_key'])
+
+def _hot_query_indexes(connection):
+    create_index(connection, 'ix_telegram_users_last_activity', 'telegram_users', ['last_activity'])
+    create_index(connection, 'ix_telegram_users_created_at', 'telegram_users', ['created_at'])
+    create_index(connection, 'ix_chess_games_user_status', 'chess_games', ['user_id', 'status'])
+    create_index(connection, 'ix_chess_games_user_created', 'chess_games', ['user_id', 'created_at'])
+    create_index(connection, 'ix_chess_games_status_created', 'chess_games', ['status', 'created_at'])
+    create_index(connection, 'ix_chess_games_created_at', 'chess_games', ['created_at'])
+    create_index(connection, 'ix_game_moves_game', 'game_moves', ['game_id', 'id'])
+    create_index(connection, 'ix_user_activities_created_at', 'user_activities', ['created_at'])
+    create_index(connection, 'ix_user_activities_user_created', 'user_activities', ['user_id', 'created_at'])
+    create_index(connection, 'ix_system_stats_metric_recorded', 'system_stats', ['metric_name', 'recorded_at'])
+    create_index(connection, 'ix_system_stats_recorded_at', 'system_stats', ['recorded_at'])
+
+def _game_move_count(connection):
+    # Les anciennes parties sans compteur faussent les agrégats de coups
+    backfill(connection, 'chess_games', 'move_count = 0', 'move_count IS NULL')
+
+def _game_message_id(connection):
+    add_column(connection, 'chess_games', 'message_id', 'INTEGER')
+
+def _game_version(connection):
+    add_column(connection, 'chess_games', 'version', 'INTEGER')
+
+def _cache_tables(connection):
+    # Déjà présentes sur les bases créées avant le gel du schéma initial
+    _CACHE_TABLES.create_all(bind=connection, checkfirst=True)
+    connection.commit()
+
+MIGRATIONS: List[Migration] = [
+    Migration('0001', 'Schéma initial', _initial_schema),
+    Migration('0002', 'Clé de rendu des photos', _game_photo_render_key),
+    Migration('0003', 'Index des requêtes critiques', _hot_query_indexes),
+    Migration('0004', 'Compteur de coups des anciennes parties', _game_move_count),
+    Migration('0005', 'Message de la partie', _game_message_id),
+    Migration('0006', 'Version des parties', _game_version),
+    Migration('0007', 'Agrégats d\'activité et cache des analyses', _cache_tables),
+]
+
+def _ensure_migrations_table(connection):
+    connection.exec_driver_sql(
+        f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+        "version VARCHAR(20) PRIMARY KEY, "
+        "description VARCHAR(200), "
+        "applied_at TIMESTAMP NOT NULL)"
+    )
+    connection.commit()
+
+def applied_versions(connection) -> set:
+    """Versions déjà appliquées (aucune si la table de suivi n'existe pas)"""
+    if not inspect(connection).has_table(MIGRATIONS_TABLE):
+        return set()
+    return {row[0] for row in connection.exec_driver_sql(f"SELECT version FROM {MIGRATIONS_TABLE}")}
+
+def pending_migrations(engine) -> List[Migration]:
+    """Migrations restant à appliquer"""
+    with engine.connect() as connection:
+        applied = applied_versions(connection)
+    return [migration for migration in MIGRATIONS if migration.version not in applied]
+
+def upgrade(engine) -> int:
+    """
+    Applique les migrations en attente, dans l'ordre
+
+    Returns:
+        int: Nombre de migrations appliquées
+    """
+    with engine.connect() as connection:
+        postgresql = connection.dialect.name == 'postgresql'
+        if postgresql:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {'key': ADVISORY_LOCK_KEY})
+            connection.commit()
+
+        try:
+            _ensure_migrations_table(connection)
+            applied = applied_versions(connection)
+
+            count = 0
+            for migration in MIGRATIONS:
+                if migration.version in applied:
+                    continue
+
+                logger.info(f"Migration {migration.version}: {migration.description}")
+                migration.apply(connection)
+                connection.execute(
+                    text(f"INSERT INTO {MIGRATIONS_TABLE} (version, description, applied_at) "
+                         "VALUES (:version, :description, :applied_at)"),
+                    {'version': migration.version, 'description': migration.description,
+                     'applied_at': datetime.utcnow()}
+                )
+                connection.commit()
+                count += 1
+
+            return count
+
+        except Exception:
+            connection.rollback()
+            raise
+
+        finally:
+            if postgresql:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': ADVISORY_LOCK_KEY})
+                connection.commit()
+
+def main() -> int:
+    """Point d'entrée en ligne de commande"""
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+
+    parser = argparse.ArgumentParser(description="Migrations du schéma de la base")
+    parser.add_argument('command', choices=('upgrade', 'status'))
+    parser.add_argument('--database-url', help="Base à migrer (par défaut DATABASE_URL)")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    # L'application refuse sinon de s'importer tant que des migrations sont en attente
+    os.environ['DB_SCHEMA_CHECK'] = 'false'
+
+    from app import app, db
+
+    with app.app_context():
+        if args.command == 'status':
+            pending = pending_migrations(db.engine)
+            for migration in pending:
+                logger.info(f"En attente {migration.version}: {migration.description}")
+            logger.info(f"{len(MIGRATIONS) - len(pending)} appliquée(s), {len(pending)} en attente")
+            return 0
+
+        count = upgrade(db.engine)
+        logger.info(f"{count} migration(s) appliquée(s)")
+        return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
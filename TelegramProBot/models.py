@@ -1,7 +1,7 @@
 from datetime import datetime
 from app import db
 from flask_login import UserMixin
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 
 class AdminUser(UserMixin, db.Model):
@@ -19,6 +19,10 @@ class AdminUser(UserMixin, db.Model):
 class TelegramUser(db.Model):
     """Modèle pour les utilisateurs Telegram du bot"""
     __tablename__ = 'telegram_users'
+    __table_args__ = (
+        Index('ix_telegram_users_last_activity', 'last_activity'),
+        Index('ix_telegram_users_created_at', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     telegram_id = Column(Integer, unique=True, nullable=False)
@@ -41,6 +45,12 @@ class TelegramUser(db.Model):
 class ChessGame(db.Model):
     """Modèle pour les parties d'échecs"""
     __tablename__ = 'chess_games'
+    __table_args__ = (
+        Index('ix_chess_games_user_status', 'user_id', 'status'),
+        Index('ix_chess_games_user_created', 'user_id', 'created_at'),
+        Index('ix_chess_games_status_created', 'status', 'created_at'),
+        Index('ix_chess_games_created_at', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('telegram_users.id'), nullable=False)
@@ -53,6 +63,8 @@ class ChessGame(db.Model):
     ai_thinking_time = Column(Float, default=0.8)
     created_at = Column(DateTime, default=datetime.utcnow)
     finished_at = Column(DateTime)
+    message_id = Column(Integer)  # message Telegram affichant l'échiquier de la partie
+    version = Column(Integer)  # incrémentée à chaque écriture différée (contrôle de concurrence)
     
     # Relations
     user = relationship('TelegramUser', back_populates='games')
@@ -65,6 +77,9 @@ class ChessGame(db.Model):
 class GameMove(db.Model):
     """Modèle pour les coups de la partie"""
     __tablename__ = 'game_moves'
+    __table_args__ = (
+        Index('ix_game_moves_game', 'game_id', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     game_id = Column(Integer, ForeignKey('chess_games.id'), nullable=False)
@@ -87,6 +102,7 @@ class GamePhoto(db.Model):
     
     id = Column(Integer, primary_key=True)
     game_id = Column(Integer, ForeignKey('chess_games.id'), nullable=False)
+    render_key = Column(String(40), index=True)  # clé du cache de rendu
     telegram_file_id = Column(String(255), nullable=False)
     file_size = Column(Integer)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -97,6 +113,10 @@ class GamePhoto(db.Model):
 class UserActivity(db.Model):
     """Modèle pour traquer les activités des utilisateurs"""
     __tablename__ = 'user_activities'
+    __table_args__ = (
+        Index('ix_user_activities_created_at', 'created_at'),
+        Index('ix_user_activities_user_created', 'user_id', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('telegram_users.id'), nullable=False)
@@ -115,6 +135,10 @@ class UserActivity(db.Model):
 class SystemStats(db.Model):
     """Modèle pour les statistiques système"""
     __tablename__ = 'system_stats'
+    __table_args__ = (
+        Index('ix_system_stats_metric_recorded', 'metric_name', 'recorded_at'),
+        Index('ix_system_stats_recorded_at', 'recorded_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     metric_name = Column(String(100), nullable=False)
@@ -125,6 +149,34 @@ class SystemStats(db.Model):
     def __repr__(self):
         return f'<SystemStats {self.metric_name}: {self.metric_value}>'
 
+class ActivityRollup(db.Model):
+    """Modèle pour les comptes d'activités pré-agrégés par heure"""
+    __tablename__ = 'activity_rollups'
+    
+    id = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime, unique=True, nullable=False)  # début de l'heure (UTC)
+    activity_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ActivityRollup {self.bucket_start}: {self.activity_count}>'
+
+class PositionAnalysis(db.Model):
+    """Modèle pour le cache persistant des analyses de position"""
+    __tablename__ = 'position_analyses'
+    
+    id = Column(Integer, primary_key=True)
+    position_key = Column(String(16), unique=True, nullable=False)  # hash Zobrist hexadécimal
+    epd = Column(Text, nullable=False)
+    evaluation = Column(String(20), nullable=False)
+    best_move = Column(String(20), nullable=False)
+    depth = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<PositionAnalysis {self.position_key} depth {self.depth}>'
+
 class BotCommand(db.Model):
     """Modèle pour les commandes envoyées au bot"""
     __tablename__ = 'bot_commands'
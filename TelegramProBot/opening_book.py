@@ -0,0 +1,129 @@
+import random
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import chess
+import chess.polyglot
+
+logger = logging.getLogger(__name__)
+
+# Arbre d'ouvertures intégré: lignes principales et poids relatifs
+BUILTIN_LINES: List[Tuple[str, int]] = [
+    # Ouvertures ouvertes
+    ("e4 e5 Nf3 Nc6 Bb5 a6 Ba4 Nf6 O-O Be7 Re1 b5 Bb3 d6", 40),
+    ("e4 e5 Nf3 Nc6 Bb5 Nf6 O-O Nxe4 d4 Nd6 Bxc6 dxc6 dxe5 Nf5", 15),
+    ("e4 e5 Nf3 Nc6 Bc4 Bc5 c3 Nf6 d3 d6 O-O O-O", 25),
+    ("e4 e5 Nf3 Nc6 Bc4 Nf6 d3 Be7 O-O O-O Re1 d6", 15),
+    ("e4 e5 Nf3 Nc6 d4 exd4 Nxd4 Nf6 Nxc6 bxc6 e5 Qe7", 15),
+    ("e4 e5 Nf3 Nf6 Nxe5 d6 Nf3 Nxe4 d4 d5 Bd3 Nc6", 10),
+    ("e4 e5 Nc3 Nf6 f4 d5 fxe5 Nxe4 Nf3 Be7", 5),
+    # Sicilienne
+    ("e4 c5 Nf3 d6 d4 cxd4 Nxd4 Nf6 Nc3 a6 Be3 e5 Nb3 Be6", 35),
+    ("e4 c5 Nf3 Nc6 d4 cxd4 Nxd4 Nf6 Nc3 e5 Ndb5 d6 Bg5 a6", 20),
+    ("e4 c5 Nf3 e6 d4 cxd4 Nxd4 Nc6 Nc3 Qc7 Be3 a6", 15),
+    ("e4 c5 Nc3 Nc6 g3 g6 Bg2 Bg7 d3 d6", 5),
+    ("e4 c5 c3 Nf6 e5 Nd5 d4 cxd4 Nf3 Nc6", 5),
+    # Française, Caro-Kann, Scandinave, Pirc
+    ("e4 e6 d4 d5 Nc3 Nf6 Bg5 Be7 e5 Nfd7 Bxe7 Qxe7", 15),
+    ("e4 e6 d4 d5 Nd2 Nf6 e5 Nfd7 Bd3 c5 c3 Nc6", 10),
+    ("e4 e6 d4 d5 e5 c5 c3 Nc6 Nf3 Qb6", 10),
+    ("e4 c6 d4 d5 Nc3 dxe4 Nxe4 Bf5 Ng3 Bg6 h4 h6", 15),
+    ("e4 c6 d4 d5 e5 Bf5 Nf3 e6 Be2 c5", 10),
+    ("e4 d5 exd5 Qxd5 Nc3 Qa5 d4 Nf6 Nf3 c6", 5),
+    ("e4 d6 d4 Nf6 Nc3 g6 Nf3 Bg7 Be2 O-O O-O c6", 5),
+    # Jeu de la Dame
+    ("d4 d5 c4 e6 Nc3 Nf6 Bg5 Be7 e3 O-O Nf3 h6", 25),
+    ("d4 d5 c4 c6 Nf3 Nf6 Nc3 dxc4 a4 Bf5 e3 e6", 20),
+    ("d4 d5 c4 dxc4 Nf3 Nf6 e3 e6 Bxc4 c5 O-O a6", 10),
+    ("d4 d5 Nf3 Nf6 Bf4 e6 e3 c5 c3 Nc6 Nbd2 Bd6", 10),
+    # Défenses indiennes
+    ("d4 Nf6 c4 e6 Nc3 Bb4 e3 O-O Bd3 d5 Nf3 c5", 20),
+    ("d4 Nf6 c4 e6 Nf3 b6 g3 Ba6 b3 Bb4 Bd2 Be7", 10),
+    ("d4 Nf6 c4 g6 Nc3 Bg7 e4 d6 Nf3 O-O Be2 e5", 20),
+    ("d4 Nf6 c4 g6 Nc3 d5 cxd5 Nxd5 e4 Nxc3 bxc3 Bg7", 10),
+    ("d4 Nf6 c4 c5 d5 e6 Nc3 exd5 cxd5 d6 e4 g6", 5),
+    ("d4 Nf6 Nf3 g6 g3 Bg7 Bg2 O-O O-O d6", 5),
+    # Anglaise et Réti
+    ("c4 e5 Nc3 Nf6 Nf3 Nc6 g3 d5 cxd5 Nxd5 Bg2 Nb6", 15),
+    ("c4 Nf6 Nc3 e6 Nf3 d5 d4 Be7", 10),
+    ("c4 c5 Nf3 Nf6 Nc3 Nc6 g3 g6 Bg2 Bg7", 5),
+    ("Nf3 d5 g3 Nf6 Bg2 e6 O-O Be7 d3 O-O", 10),
+    ("Nf3 Nf6 c4 g6 Nc3 Bg7 e4 d6 d4 O-O", 5),
+]
+
+class OpeningBook:
+    """Livre d'ouvertures consulté avant de lancer une recherche Stockfish"""
+
+    def __init__(self, book_path: Optional[str] = None, min_plies: int = 8, max_plies: int = 12):
+        self.min_plies = min_plies
+        self.max_plies = max_plies
+        self._reader = None
+        self._tree: Dict[int, Dict[chess.Move, int]] = {}
+
+        if book_path:
+            try:
+                self._reader = chess.polyglot.open_reader(book_path)
+                logger.info(f"Livre d'ouvertures Polyglot chargé: {book_path}")
+            except Exception as e:
+                logger.error(f"Impossible de charger le livre {book_path}: {e}")
+
+        if self._reader is None:
+            self._tree = self._build_tree(BUILTIN_LINES)
+
+    @staticmethod
+    def _build_tree(lines: List[Tuple[str, int]]) -> Dict[int, Dict[chess.Move, int]]:
+        """Construit l'arbre position → coups pondérés à partir des lignes SAN"""
+        tree: Dict[int, Dict[chess.Move, int]] = defaultdict(lambda: defaultdict(int))
+
+        for line, weight in lines:
+            board = chess.Board()
+            try:
+                for san in line.split():
+                    move = board.parse_san(san)
+                    tree[chess.polyglot.zobrist_hash(board)][move] += weight
+                    board.push(move)
+            except ValueError as e:
+                logger.error(f"Ligne d'ouverture invalide '{line}': {e}")
+
+        return {key: dict(moves) for key, moves in tree.items()}
+
+    def book_depth(self, difficulty_level: int) -> int:
+        """Nombre de demi-coups joués dans le livre selon le niveau (0 à 20)"""
+        level = min(max(difficulty_level, 0), 20)
+        return self.min_plies + (self.max_plies - self.min_plies) * level // 20
+
+    def candidates(self, board: chess.Board) -> List[Tuple[chess.Move, int]]:
+        """Coups du livre disponibles pour la position"""
+        if self._reader is not None:
+            return [(entry.move, entry.weight) for entry in self._reader.find_all(board)]
+
+        moves = self._tree.get(chess.polyglot.zobrist_hash(board), {})
+        return [(move, weight) for move, weight in moves.items() if board.is_legal(move)]
+
+    def choose(self, board: chess.Board, difficulty_level: int) -> Optional[chess.Move]:
+        """
+        Choisit un coup du livre en tenant compte du niveau
+
+        Aux niveaux faibles les poids sont aplatis (variantes secondaires
+        plus fréquentes), aux niveaux élevés ils sont accentués vers les
+        lignes principales.
+
+        Returns:
+            Optional[chess.Move]: Coup du livre, ou None hors du livre
+        """
+        if board.ply() >= self.book_depth(difficulty_level):
+            return None
+
+        entries = [(move, weight) for move, weight in self.candidates(board) if weight > 0]
+        if not entries:
+            return None
+
+        exponent = min(max(difficulty_level, 0), 20) / 10
+        weights = [weight ** exponent for _, weight in entries]
+        return random.choices([move for move, _ in entries], weights=weights)[0]
+
+    def close(self):
+        """Ferme le livre Polyglot"""
+        if self._reader is not None:
+            self._reader.close()
@@ -0,0 +1,120 @@
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from app import db
+from models import GamePhoto
+
+logger = logging.getLogger(__name__)
+
+# Fragments des messages d'erreur de Telegram désignant un file_id inutilisable
+FILE_ID_ERRORS = ('file identifier', 'file_id', 'remote file', 'file reference')
+
+# Marque une clé de rendu absente de la base: la requête n'est pas refaite à chaque coup
+NOT_UPLOADED = ''
+
+def is_file_id_error(error: Exception) -> bool:
+    """Vrai si Telegram a refusé la requête à cause du file_id (et non du message visé)"""
+    message = str(error).lower()
+    return any(fragment in message for fragment in FILE_ID_ERRORS)
+
+class TelegramFileCache:
+    """
+    Correspondance clé de rendu → file_id Telegram des images déjà envoyées
+
+    La base n'est consultée qu'une fois par clé: une absence est mémorisée
+    (NOT_UPLOADED) au même titre qu'un file_id, jusqu'au premier envoi.
+    """
+
+    def __init__(self, max_entries: int = 50000):
+        self.max_entries = max_entries
+
+        self._file_ids: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uploads = 0
+
+    def get(self, render_key: str) -> Optional[str]:
+        """Retourne le file_id d'une image identique déjà envoyée"""
+        with self._lock:
+            file_id = self._file_ids.get(render_key)
+            if file_id is not None:
+                self._file_ids.move_to_end(render_key)
+                if file_id == NOT_UPLOADED:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                return file_id
+
+        try:
+            photo = GamePhoto.query\
+                .filter_by(render_key=render_key)\
+                .order_by(GamePhoto.created_at.desc())\
+                .first()
+        except Exception as e:
+            logger.error(f"Erreur lecture file_id: {e}")
+            db.session.rollback()
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if photo is None:
+            self._remember(render_key, NOT_UPLOADED)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._remember(render_key, photo.telegram_file_id)
+        with self._lock:
+            self.hits += 1
+        return photo.telegram_file_id
+
+    def record(self, render_key: str, game_id: int, file_id: str, file_size: Optional[int] = None):
+        """Mémorise le file_id retourné par le premier envoi d'une image"""
+        self._remember(render_key, file_id)
+        with self._lock:
+            self.uploads += 1
+
+        try:
+            db.session.add(GamePhoto(
+                game_id=game_id,
+                render_key=render_key,
+                telegram_file_id=file_id,
+                file_size=file_size,
+                created_at=datetime.utcnow()
+            ))
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Erreur enregistrement file_id: {e}")
+            db.session.rollback()
+
+    def invalidate(self, render_key: str):
+        """Oublie un file_id refusé par Telegram"""
+        self._remember(render_key, NOT_UPLOADED)
+
+        try:
+            GamePhoto.query.filter_by(render_key=render_key).delete()
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Erreur invalidation file_id: {e}")
+            db.session.rollback()
+
+    def _remember(self, render_key: str, file_id: str):
+        with self._lock:
+            self._file_ids[render_key] = file_id
+            self._file_ids.move_to_end(render_key)
+            while len(self._file_ids) > self.max_entries:
+                self._file_ids.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Statistiques de réutilisation"""
+        with self._lock:
+            return {
+                'entries': len(self._file_ids),
+                'hits': self.hits,
+                'misses': self.misses,
+                'uploads': self.uploads
+            }
@@ -0,0 +1,226 @@
+import io
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import chess
+import chess.svg
+
+# Pillow est une dépendance déclarée (pyproject.toml); la garde couvre les installations
+# incomplètes, où seul le rendu SVG reste disponible
+try:
+    from PIL import Image, ImageDraw, ImageFont
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    Image = ImageDraw = ImageFont = None
+
+logger = logging.getLogger(__name__)
+
+BAND_HEIGHT = 80
+BOARD_VIEWBOX = 390
+MARGIN_UNITS = 15
+SQUARE_UNITS = 45
+
+COLORS = {
+    'band': '#2c3e50',
+    'band_border': '#34495e',
+    'title': '#ecf0f1',
+    'subtitle': '#bdc3c7',
+    'margin': chess.svg.DEFAULT_COLORS['margin'],
+    'coord': chess.svg.DEFAULT_COLORS['coord'],
+    'light': chess.svg.DEFAULT_COLORS['square light'],
+    'dark': chess.svg.DEFAULT_COLORS['square dark'],
+    'light_lastmove': chess.svg.DEFAULT_COLORS['square light lastmove'],
+    'dark_lastmove': chess.svg.DEFAULT_COLORS['square dark lastmove'],
+}
+
+FONT_CANDIDATES = {
+    False: ['DejaVuSans.ttf', 'Arial.ttf', 'LiberationSans-Regular.ttf'],
+    True: ['DejaVuSans-Bold.ttf', 'Arial Bold.ttf', 'LiberationSans-Bold.ttf'],
+}
+
+# Glyphes Unicode utilisés quand les sprites ne peuvent pas être rastérisés depuis le SVG
+PIECE_GLYPHS = {
+    'K': '♔', 'Q': '♕', 'R': '♖', 'B': '♗', 'N': '♘', 'P': '♙',
+    'k': '♚', 'q': '♛', 'r': '♜', 'b': '♝', 'n': '♞', 'p': '♟',
+}
+
+def _load_font(size: int, bold: bool = False):
+    """Charge une police TrueType disponible, sinon la police par défaut"""
+    for name in FONT_CANDIDATES[bold]:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+class RasterBoardRenderer:
+    """
+    Rendu direct en bitmap: sprites de pièces composés sur un fond précalculé
+
+    Reproduit la mise en page du rendu SVG (bandeau français de 80 px puis
+    plateau avec coordonnées) sans passer par cairosvg.
+    """
+
+    def __init__(self, size: int = 400):
+        if not PIL_AVAILABLE:
+            raise RuntimeError("Pillow est requis pour le rendu bitmap")
+
+        self.size = size
+        self.scale = size / BOARD_VIEWBOX
+        self.margin = MARGIN_UNITS * self.scale
+        self.square = SQUARE_UNITS * self.scale
+
+        self._lock = threading.Lock()
+        self._backgrounds: Dict[bool, "Image.Image"] = {}
+        self._sprites: Dict[str, "Image.Image"] = {}
+        self._title_font = _load_font(14, bold=True)
+
+    def _square_box(self, square: chess.Square, orientation: chess.Color) -> Tuple[int, int, int, int]:
+        """Rectangle en pixels d'une case"""
+        file_index = chess.square_file(square)
+        rank_index = chess.square_rank(square)
+        col = file_index if orientation else 7 - file_index
+        row = 7 - rank_index if orientation else rank_index
+
+        x0 = round(self.margin + col * self.square)
+        y0 = round(BAND_HEIGHT + self.margin + row * self.square)
+        x1 = round(self.margin + (col + 1) * self.square)
+        y1 = round(BAND_HEIGHT + self.margin + (row + 1) * self.square)
+        return x0, y0, x1, y1
+
+    def _background(self, orientation: chess.Color) -> "Image.Image":
+        """Bandeau fixe, marge, coordonnées et cases, calculés une fois par orientation"""
+        key = bool(orientation)
+        background = self._backgrounds.get(key)
+        if background is not None:
+            return background
+
+        with self._lock:
+            background = self._backgrounds.get(key)
+            if background is not None:
+                return background
+
+            image = Image.new('RGB', (self.size, self.size + BAND_HEIGHT), COLORS['margin'])
+            draw = ImageDraw.Draw(image)
+
+            # Bandeau d'informations (partie fixe)
+            draw.rectangle([0, 0, self.size - 1, BAND_HEIGHT - 1], fill=COLORS['band'], outline=COLORS['band_border'])
+            small_font = _load_font(12)
+            draw.text((10, 45), "♔ Roi  ♕ Dame  ♖ Tour  ♗ Fou  ♘ Cavalier  ♙ Pion",
+                      font=small_font, fill=COLORS['subtitle'], anchor='ls')
+            draw.text((10, 65), "Bot d'Échecs Professionnel - Powered by Stockfish",
+                      font=small_font, fill=COLORS['subtitle'], anchor='ls')
+
+            # Cases
+            for square in chess.SQUARES:
+                light = bool(chess.BB_LIGHT_SQUARES & chess.BB_SQUARES[square])
+                x0, y0, x1, y1 = self._square_box(square, orientation)
+                draw.rectangle([x0, y0, x1 - 1, y1 - 1], fill=COLORS['light' if light else 'dark'])
+
+            # Coordonnées dans la marge
+            coord_font = _load_font(max(8, round(self.margin * 0.8)), bold=True)
+            for index in range(8):
+                file_name = chess.FILE_NAMES[index if orientation else 7 - index]
+                rank_name = chess.RANK_NAMES[7 - index if orientation else index]
+                center = self.margin + (index + 0.5) * self.square
+                for y in (BAND_HEIGHT + self.margin / 2, BAND_HEIGHT + self.size - self.margin / 2):
+                    draw.text((center, y), file_name, font=coord_font, fill=COLORS['coord'], anchor='mm')
+                for x in (self.margin / 2, self.size - self.margin / 2):
+                    draw.text((x, BAND_HEIGHT + center), rank_name, font=coord_font, fill=COLORS['coord'], anchor='mm')
+
+            self._backgrounds[key] = image
+            return image
+
+    def _sprite(self, symbol: str) -> "Image.Image":
+        """Sprite RGBA d'une pièce à la taille d'une case"""
+        sprite = self._sprites.get(symbol)
+        if sprite is not None:
+            return sprite
+
+        with self._lock:
+            sprite = self._sprites.get(symbol)
+            if sprite is not None:
+                return sprite
+
+            side = round(self.square)
+            try:
+                import cairosvg
+                png_data = cairosvg.svg2png(
+                    bytestring=chess.svg.piece(chess.Piece.from_symbol(symbol), size=side).encode('utf-8'),
+                    output_width=side,
+                    output_height=side
+                )
+                sprite = Image.open(io.BytesIO(png_data)).convert('RGBA')
+            except (ImportError, OSError):
+                sprite = self._glyph_sprite(symbol, side)
+
+            self._sprites[symbol] = sprite
+            return sprite
+
+    def _glyph_sprite(self, symbol: str, side: int) -> "Image.Image":
+        """Sprite dessiné à partir du glyphe Unicode quand Cairo est absent"""
+        sprite = Image.new('RGBA', (side, side), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(sprite)
+        font = _load_font(round(side * 0.85))
+        color = '#ffffff' if symbol.isupper() else '#000000'
+        # Glyphe plein pour la silhouette, contour noir pour les pièces blanches
+        draw.text((side / 2, side / 2), PIECE_GLYPHS[symbol.lower()], font=font, fill=color, anchor='mm')
+        draw.text((side / 2, side / 2), PIECE_GLYPHS[symbol.upper()], font=font, fill='#000000', anchor='mm')
+        return sprite
+
+    def render(self, board: chess.Board, orientation: chess.Color = chess.WHITE,
+               lastmove: Optional[chess.Move] = None, image_format: str = 'PNG') -> bytes:
+        """
+        Compose et encode l'image d'une position
+
+        Args:
+            board: Position à dessiner
+            orientation: Orientation de l'échiquier
+            lastmove: Dernier coup à surligner
+            image_format: 'PNG' ou 'WEBP'
+
+        Returns:
+            bytes: Image encodée
+        """
+        image = self._background(orientation).copy()
+        draw = ImageDraw.Draw(image)
+
+        turn = "Blancs" if board.turn == chess.WHITE else "Noirs"
+        check_status = " (Échec !)" if board.is_check() else ""
+        draw.text((10, 25), f"Tour: {turn}{check_status} | Coup: {board.fullmove_number}",
+                  font=self._title_font, fill=COLORS['title'], anchor='ls')
+
+        if lastmove:
+            for square in (lastmove.from_square, lastmove.to_square):
+                light = bool(chess.BB_LIGHT_SQUARES & chess.BB_SQUARES[square])
+                x0, y0, x1, y1 = self._square_box(square, orientation)
+                draw.rectangle([x0, y0, x1 - 1, y1 - 1],
+                               fill=COLORS['light_lastmove' if light else 'dark_lastmove'])
+
+        for square, piece in board.piece_map().items():
+            x0, y0, _, _ = self._square_box(square, orientation)
+            sprite = self._sprite(piece.symbol())
+            image.paste(sprite, (x0, y0), sprite)
+
+        output = io.BytesIO()
+        if image_format.upper() == 'WEBP':
+            image.save(output, format='WEBP', lossless=True, method=0)
+        else:
+            # Compression rapide: le coût d'encodage domine sinon le rendu
+            image.save(output, format='PNG', compress_level=1)
+        return output.getvalue()
+
+    def render_error(self, message: str) -> bytes:
+        """Image d'erreur unie, utilisée quand Cairo est absent"""
+        image = Image.new('RGB', (self.size, self.size), '#e74c3c')
+        draw = ImageDraw.Draw(image)
+        draw.text((self.size / 2, self.size / 2), message, font=_load_font(20), fill='#ffffff', anchor='mm')
+
+        output = io.BytesIO()
+        image.save(output, format='PNG', compress_level=1)
+        return output.getvalue()
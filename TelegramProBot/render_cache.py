@@ -0,0 +1,111 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class RenderCache:
+    """Cache LRU d'images rendues, borné en octets, avec niveau disque optionnel"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, disk_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if disk_dir:
+            try:
+                os.makedirs(disk_dir, exist_ok=True)
+            except OSError as e:
+                logger.error(f"Répertoire de cache d'images indisponible {disk_dir}: {e}")
+                self.disk_dir = None
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Clé adressée par contenu à partir des paramètres de rendu"""
+        return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.png")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Retourne l'image en cache ou None"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), 'rb') as f:
+                    data = f.read()
+                self._remember(key, data)
+                with self._lock:
+                    self.hits += 1
+                return data
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Lecture du cache disque impossible: {e}")
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes):
+        """Enregistre une image rendue"""
+        if not data:
+            return
+
+        self._remember(key, data)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Écriture atomique: un autre worker peut lire le même fichier
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Écriture du cache disque impossible: {e}")
+
+    def _remember(self, key: str, data: bytes):
+        """Insère en mémoire en respectant le budget d'octets"""
+        if len(data) > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+
+            self._entries[key] = data
+            self._size += len(data)
+
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self) -> dict:
+        """Statistiques du cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total * 100) if total > 0 else 0
+            }
@@ -0,0 +1,99 @@
+import time
+import asyncio
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# forkserver (processus vierges lancés par un serveur dédié), spawn là où il n'existe pas
+RENDER_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+def rasterize_svg(svg_bytes: bytes, width: int, height: int) -> bytes:
+    """Conversion SVG → PNG exécutée dans un processus de rendu"""
+    import cairosvg
+    return cairosvg.svg2png(bytestring=svg_bytes, output_width=width, output_height=height)
+
+class RenderService:
+    """Rastérisation des échiquiers dans un pool de processus borné"""
+
+    def __init__(self, max_workers: int = 2, latency_window: int = 500):
+        self.max_workers = max(1, max_workers)
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._latencies = deque(maxlen=latency_window)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Création paresseuse: les processus ne sont lancés qu'après le fork des workers
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # Pas de fork: le processus parent a déjà des threads (boucle des updates,
+                    # vidages) dont un verrou pourrait être copié fermé dans l'enfant
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context(RENDER_START_METHOD)
+                    )
+        return self._executor
+
+    async def rasterize(self, svg: str, width: int, height: int) -> bytes:
+        """
+        Convertit un SVG en PNG sans bloquer la boucle d'événements
+
+        Args:
+            svg: Document SVG
+            width: Largeur de sortie en pixels
+            height: Hauteur de sortie en pixels
+
+        Returns:
+            bytes: Image PNG
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+
+        with self._lock:
+            self._pending += 1
+
+        try:
+            png_data = await loop.run_in_executor(
+                self._get_executor(), rasterize_svg, svg.encode('utf-8'), width, height
+            )
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+        with self._lock:
+            self._completed += 1
+            self._latencies.append(time.perf_counter() - start)
+
+        return png_data
+
+    def stats(self) -> dict:
+        """Profondeur de file et latences de rendu (en millisecondes)"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                'workers': self.max_workers,
+                'queue_depth': self._pending,
+                'completed': self._completed,
+                'failed': self._failed,
+                'avg_latency_ms': (sum(latencies) / len(latencies) * 1000) if latencies else 0,
+                'p95_latency_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0
+            }
+
+    def shutdown(self):
+        """Arrête les processus de rendu"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,271 @@
+import time
+import asyncio
+import logging
+import itertools
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Classes de priorité (la plus petite passe en premier)
+PRIORITY_INTERACTIVE = 0   # réponses directes à une action de l'utilisateur
+PRIORITY_NOTIFICATION = 1  # messages non sollicités, diffusions
+
+# Méthodes soumises aux limites d'envoi de Telegram; les autres (answerCallbackQuery, getMe...) passent directement
+LIMITED_ENDPOINT_PREFIXES = ('send', 'edit', 'copy', 'forward')
+
+class TokenBucket:
+    """Seau à jetons: rate jetons par seconde, au plus capacity en réserve"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Secondes avant qu'un jeton soit disponible (0 s'il l'est déjà)"""
+        self._refill(now)
+        wait = max(0.0, self.paused_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, until: float):
+        """Suspend le seau jusqu'à until (retry_after d'une erreur 429)"""
+        self.paused_until = max(self.paused_until, until)
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.paused_until
+
+class SendScheduler(BaseRateLimiter):
+    """
+    Ordonnanceur des appels sortants vers l'API Telegram
+
+    Branché comme rate limiter de l'Application, il voit passer chaque appel
+    de l'API. Les envois et modifications de messages attendent un jeton du
+    seau global (~30 messages/s) et du seau de leur conversation (1/s en
+    privé, 20/min en groupe); parmi les appels en attente, la priorité la
+    plus forte passe en premier, sans qu'une conversation limitée bloque les
+    autres. Une modification d'un message remplacée par une modification plus
+    récente du même message avant son envoi n'est pas envoyée: l'appelant
+    reçoit le résultat (ou l'erreur) de celle qui l'a remplacée. Une erreur
+    429 suspend la conversation (ou tout l'envoi) pendant retry_after
+    secondes; l'appel repasse alors par la file à sa place d'origine, derrière
+    les seaux, au plus max_retries fois.
+
+    La priorité d'un appel se passe par rate_limit_args (PRIORITY_*).
+    """
+
+    def __init__(self, global_rate: float = 30.0, chat_rate: float = 1.0, chat_burst: float = 3.0,
+                 group_rate: float = 20 / 60, max_retries: int = 3):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: Dict[Any, TokenBucket] = {}
+        self._waiting: List[list] = []
+        self._edit_versions: Dict[Tuple, int] = {}
+        # Résultat attendu de la modification la plus récente de chaque message
+        self._edit_outcomes: Dict[Tuple, asyncio.Future] = {}
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pruned_at = time.monotonic()
+
+        self.sent = 0
+        self.coalesced = 0
+        self.throttled = 0
+        self.failed = 0
+
+    async def initialize(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        for ticket in self._waiting:
+            if not ticket[-1].done():
+                ticket[-1].set_exception(RuntimeError("Ordonnanceur d'envoi arrêté"))
+        self._waiting = []
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if self._task is None or not endpoint.startswith(LIMITED_ENDPOINT_PREFIXES):
+            return await callback(*args, **kwargs)
+
+        chat_id = data.get('chat_id')
+        priority = rate_limit_args if isinstance(rate_limit_args, int) else PRIORITY_INTERACTIVE
+
+        edit_key = None
+        version = 0
+        outcome = None
+        if endpoint.startswith('edit'):
+            edit_key = (endpoint, chat_id, data.get('message_id'), data.get('inline_message_id'))
+            version = self._edit_versions.get(edit_key, 0) + 1
+            self._edit_versions[edit_key] = version
+            outcome = asyncio.get_running_loop().create_future()
+            # Le résultat n'est pas forcément attendu: éviter l'avertissement d'exception non lue
+            outcome.add_done_callback(lambda future: future.cancelled() or future.exception())
+            self._edit_outcomes[edit_key] = outcome
+
+        # Rang fixé à la première demande: un nouvel essai après un 429 garde sa place dans la file
+        seq = next(self._seq)
+        try:
+            for attempt in range(self.max_retries + 1):
+                granted = await self._acquire(priority, seq, chat_id, edit_key, version)
+                if granted is not True:
+                    # Remplacée par une modification plus récente du même message: même résultat qu'elle
+                    self.coalesced += 1
+                    result = await asyncio.shield(granted)
+                    break
+
+                try:
+                    result = await callback(*args, **kwargs)
+                    self.sent += 1
+                    break
+                except RetryAfter as e:
+                    delay = _seconds(e.retry_after)
+                    self.throttled += 1
+                    logger.warning(f"429 sur {endpoint} (chat {chat_id}), nouvel essai dans {delay:.0f}s")
+
+                    bucket = self._global if chat_id is None else self._chat_bucket(chat_id)
+                    bucket.pause(time.monotonic() + delay)
+                    if attempt == self.max_retries:
+                        self.failed += 1
+                        raise
+        except BaseException as e:
+            if outcome is not None and not outcome.done():
+                if isinstance(e, asyncio.CancelledError):
+                    outcome.cancel()
+                else:
+                    outcome.set_exception(e)
+            raise
+        finally:
+            if edit_key is not None and self._edit_versions.get(edit_key) == version:
+                del self._edit_versions[edit_key]
+                del self._edit_outcomes[edit_key]
+
+        if outcome is not None:
+            outcome.set_result(result)
+        return result
+
+    async def _acquire(self, priority: int, seq: int, chat_id, edit_key, version: int):
+        """
+        Attend son tour dans la file
+
+        Returns:
+            True si l'appel peut partir, sinon le résultat à venir de la
+            modification plus récente qui l'a remplacé
+        """
+        granted = asyncio.get_running_loop().create_future()
+        ticket = [priority, seq, chat_id, edit_key, version, granted]
+        self._waiting.append(ticket)
+        self._wakeup.set()
+
+        try:
+            return await granted
+        except asyncio.CancelledError:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+            raise
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            timeout = self._grant()
+            if timeout is None:
+                await self._wakeup.wait()
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _grant(self) -> Optional[float]:
+        """
+        Accorde leur tour aux appels qui peuvent partir maintenant
+
+        Returns:
+            float | None: Secondes avant le prochain jeton utile (None si rien n'attend)
+        """
+        now = time.monotonic()
+        next_wakeup = None
+        remaining = []
+
+        for ticket in sorted(self._waiting, key=lambda t: (t[0], t[1])):
+            priority, seq, chat_id, edit_key, version, granted = ticket
+            if granted.done():
+                continue
+
+            if edit_key is not None and self._edit_versions.get(edit_key) != version:
+                granted.set_result(self._edit_outcomes[edit_key])
+                continue
+
+            wait = self._global.delay(now)
+            if chat_id is not None:
+                wait = max(wait, self._chat_bucket(chat_id).delay(now))
+
+            if wait > 0:
+                remaining.append(ticket)
+                next_wakeup = wait if next_wakeup is None else min(next_wakeup, wait)
+                continue
+
+            self._global.take(now)
+            if chat_id is not None:
+                self._chat_bucket(chat_id).take(now)
+            granted.set_result(True)
+
+        self._waiting = remaining
+
+        if now - self._pruned_at > 60:
+            self._chats = {chat_id: bucket for chat_id, bucket in self._chats.items() if not bucket.idle(now)}
+            self._pruned_at = now
+
+        return next_wakeup
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Identifiant négatif ou @nom: groupe ou canal, limites plus strictes
+            group = not isinstance(chat_id, int) or chat_id < 0
+            bucket = TokenBucket(self.group_rate, 1) if group else TokenBucket(self.chat_rate, self.chat_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def stats(self) -> dict:
+        """État de l'ordonnanceur d'envoi"""
+        return {
+            'queue_depth': len(self._waiting),
+            'chats_tracked': len(self._chats),
+            'global_rate': self.global_rate,
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'throttled': self.throttled,
+            'failed': self.failed
+        }
+
+def _seconds(retry_after) -> float:
+    """retry_after en secondes (entier ou timedelta selon la version de la bibliothèque)"""
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
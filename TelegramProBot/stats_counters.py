@@ -0,0 +1,155 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Compteurs tenus à jour par événement entre deux réconciliations
+COUNTERS = ('total_users', 'total_games', 'active_games', 'finished_games', 'total_moves', 'today_activities')
+
+class SystemStatsCounters:
+    """
+    Statistiques système maintenues en mémoire
+
+    Les totaux sont ajustés à chaque événement (utilisateur, partie, coups,
+    activité) et recalés périodiquement sur la base par reconcile_fn, qui
+    fournit aussi les valeurs coûteuses à calculer (utilisateurs actifs sur
+    7 jours, top utilisateurs, uptime). Une lecture ne fait qu'une copie.
+
+    Les compteurs sont propres au processus: ils ne sont exacts qu'avec un
+    seul worker gunicorn et une seule instance. Avec plusieurs processus,
+    chacun ne voit que ses propres événements entre deux réconciliations
+    et les chiffres affichés varient d'une requête à l'autre.
+    """
+
+    def __init__(self, reconcile_fn: Callable[[], Dict[str, Any]], reconcile_interval: float = 300.0):
+        self.reconcile_fn = reconcile_fn
+        self.reconcile_interval = reconcile_interval
+
+        self._snapshot: Dict[str, Any] = {}
+        self._day = datetime.utcnow().date()
+        self._lock = threading.Lock()
+        self._reconciled_at: Optional[float] = None
+        self._closed = False
+
+        self.reconciliations = 0
+        self.drift: Dict[str, int] = {}
+
+    def increment(self, counter: str, amount: int = 1):
+        """Ajuste un compteur après un événement"""
+        with self._lock:
+            self._roll_day()
+            if counter in self._snapshot:
+                self._snapshot[counter] += amount
+
+    def user_created(self):
+        self.increment('total_users')
+
+    def game_created(self):
+        with self._lock:
+            self._roll_day()
+            if self._snapshot:
+                self._snapshot['total_games'] += 1
+                self._snapshot['active_games'] += 1
+
+    def game_finished(self):
+        with self._lock:
+            if self._snapshot:
+                self._snapshot['active_games'] -= 1
+                self._snapshot['finished_games'] += 1
+
+    def moves_played(self, count: int):
+        self.increment('total_moves', count)
+
+    def activity_recorded(self):
+        self.increment('today_activities')
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Statistiques courantes; réconciliées au premier appel"""
+        if self._reconciled_at is None:
+            self.reconcile()
+
+        with self._lock:
+            self._roll_day()
+            stats = dict(self._snapshot)
+        stats['last_updated'] = datetime.utcnow().isoformat()
+        return stats
+
+    def reconcile(self) -> bool:
+        """Recalcule toutes les statistiques depuis la base"""
+        stats = self.reconcile_fn()
+        if not stats:
+            return False
+
+        with self._lock:
+            # Écart entre compteurs incrémentaux et base, utile pour repérer un événement oublié
+            if self._snapshot:
+                self.drift = {
+                    name: stats[name] - self._snapshot.get(name, 0)
+                    for name in COUNTERS
+                    if stats.get(name) != self._snapshot.get(name)
+                }
+            self._snapshot = stats
+            self._day = datetime.utcnow().date()
+            self._reconciled_at = time.monotonic()
+            self.reconciliations += 1
+
+        return True
+
+    def _roll_day(self):
+        """Remise à zéro des activités du jour au passage de minuit (UTC)"""
+        today = datetime.utcnow().date()
+        if today != self._day:
+            self._day = today
+            if self._snapshot:
+                self._snapshot['today_activities'] = 0
+
+    def start(self):
+        """Démarre la réconciliation périodique"""
+        def loop():
+            while not self._closed:
+                time.sleep(self.reconcile_interval)
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    logger.error(f"Erreur réconciliation statistiques: {e}")
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+
+    def stats(self) -> dict:
+        """État des compteurs"""
+        with self._lock:
+            return {
+                'reconciliations': self.reconciliations,
+                'seconds_since_reconcile': (time.monotonic() - self._reconciled_at) if self._reconciled_at else None,
+                'last_drift': dict(self.drift)
+            }
+
+_counters: Optional[SystemStatsCounters] = None
+_counters_lock = threading.Lock()
+
+def get_stats_counters() -> SystemStatsCounters:
+    """Retourne les compteurs partagés, démarrés au premier usage"""
+    global _counters
+    if _counters is None:
+        with _counters_lock:
+            if _counters is None:
+                # Import lazy pour éviter la référence circulaire
+                from app import app
+                from utils import compute_system_stats
+
+                counters = SystemStatsCounters(
+                    compute_system_stats,
+                    reconcile_interval=app.config.get('STATS_RECONCILE_INTERVAL', 300)
+                )
+                counters.start()
+                _counters = counters
+
+                if int(os.environ.get('WEB_CONCURRENCY', '1')) > 1:
+                    logger.warning("Compteurs de statistiques par processus avec plusieurs workers "
+                                   "(WEB_CONCURRENCY): les totaux affichés ne sont exacts qu'après réconciliation")
+    return _counters
@@ -0,0 +1,290 @@
+import io
+import time
+import atexit
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+from app import app, db
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+# Tentatives d'écriture d'un lot avant de l'abandonner
+MAX_WRITE_ATTEMPTS = 3
+
+class TelemetryWriter:
+    """
+    File d'écriture des lignes de télémétrie (UserActivity, BotCommand, SystemStats)
+
+    Les handlers mettent les lignes en file sans attendre la base; un thread
+    les écrit par lots toutes les flush_interval secondes ou dès que
+    batch_size lignes sont en attente: COPY sur PostgreSQL, INSERT multiple
+    (executemany) ailleurs. La file est bornée à max_queue lignes, lots
+    en échec compris; au-delà, overflow_policy décide: jeter les plus
+    anciennes, jeter les nouvelles ou bloquer l'appelant au plus
+    block_timeout secondes. Un appelant exécuté sur une boucle asyncio (les
+    handlers du bot) n'est jamais bloqué: block s'y comporte comme
+    drop_oldest. Un lot dont l'écriture échoue est retenté aux vidages
+    suivants, au plus MAX_WRITE_ATTEMPTS fois.
+    """
+
+    def __init__(self, flush_interval: float = 0.5, batch_size: int = 500, max_queue: int = 10000,
+                 overflow_policy: str = 'drop_oldest', block_timeout: float = 1.0):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Politique de débordement inconnue: {overflow_policy}")
+
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+
+        self._queue = deque()
+        self._retries: List[Tuple[object, List[Dict], int]] = []
+        self._retry_rows = 0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.errors = 0
+
+    def enqueue(self, model, row: Dict) -> bool:
+        """
+        Met une ligne en file d'écriture
+
+        Args:
+            model: Classe du modèle SQLAlchemy
+            row: Valeurs des colonnes
+
+        Returns:
+            bool: False si la ligne a été rejetée faute de place
+        """
+        policy = self.overflow_policy
+        if policy == 'block' and _on_event_loop():
+            # Attendre ici gèlerait la boucle, donc tous les utilisateurs
+            policy = 'drop_oldest'
+
+        with self._cond:
+            if self._full():
+                if policy == 'drop_oldest' and self._queue:
+                    self._queue.popleft()
+                    self.dropped += 1
+                elif policy != 'block':
+                    self.dropped += 1
+                    return False
+                else:
+                    # Contre-pression: l'appelant attend que le thread d'écriture libère de la place
+                    self._cond.notify_all()
+                    deadline = time.monotonic() + self.block_timeout
+                    while self._full():
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or not self._cond.wait(remaining):
+                            self.dropped += 1
+                            return False
+
+            self._queue.append((model, row))
+            self.enqueued += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+
+        return True
+
+    def _full(self) -> bool:
+        """File pleine, lots en échec compris (à appeler sous self._cond)"""
+        return len(self._queue) + self._retry_rows >= self.max_queue
+
+    def flush(self) -> int:
+        """
+        Écrit immédiatement toutes les lignes en attente
+
+        Returns:
+            int: Nombre de lignes écrites
+        """
+        with self._flush_lock:
+            with self._cond:
+                items = list(self._queue)
+                self._queue.clear()
+                retries = self._retries
+                self._retries = []
+                self._retry_rows = 0
+                self._cond.notify_all()
+
+            if not items and not retries:
+                return 0
+
+            # Regrouper par table en conservant l'ordre d'arrivée, lots en échec d'abord
+            batches: List[Tuple[object, List[Dict], int]] = list(retries)
+            grouped: "OrderedDict[object, List[Dict]]" = OrderedDict()
+            for model, row in items:
+                grouped.setdefault(model, []).append(row)
+            batches.extend((model, rows, 0) for model, rows in grouped.items())
+
+            written = 0
+            with app.app_context():
+                for model, rows, attempts in batches:
+                    try:
+                        self._write(model, rows)
+                        written += len(rows)
+                    except Exception as e:
+                        db.session.rollback()
+                        self.errors += 1
+                        if attempts + 1 < MAX_WRITE_ATTEMPTS:
+                            logger.error(f"Erreur écriture télémétrie {model.__tablename__}, lot conservé: {e}")
+                            self._requeue(model, rows, attempts + 1)
+                        else:
+                            logger.error(f"Erreur écriture télémétrie {model.__tablename__}, "
+                                         f"{len(rows)} lignes abandonnées: {e}")
+                            self.dropped += len(rows)
+
+            self.flushes += 1
+            self.written += written
+            return written
+
+    def _requeue(self, model, rows: List[Dict], attempts: int):
+        """Garde un lot en échec dans la limite de max_queue (les lignes les plus anciennes sont jetées)"""
+        with self._cond:
+            room = max(0, self.max_queue - len(self._queue) - self._retry_rows)
+            if len(rows) > room:
+                logger.warning(f"File de télémétrie pleine, {len(rows) - room} lignes "
+                               f"{model.__tablename__} en échec abandonnées")
+                self.dropped += len(rows) - room
+                rows = rows[len(rows) - room:]
+            if rows:
+                self._retries.append((model, rows, attempts))
+                self._retry_rows += len(rows)
+
+    def _write(self, model, rows: List[Dict]):
+        """Insertion d'un lot dans une table"""
+        table_columns = [column for column in model.__table__.columns if column.name != 'id']
+        columns = [column.name for column in table_columns]
+        values = [
+            {column.name: row[column.name] if column.name in row else _column_default(column)
+             for column in table_columns}
+            for row in rows
+        ]
+
+        if db.engine.dialect.name == 'postgresql':
+            self._copy(model.__tablename__, columns, values)
+            return
+
+        db.session.execute(model.__table__.insert(), values)
+        db.session.commit()
+
+    def _copy(self, table: str, columns: List[str], values: List[Dict]):
+        """COPY ... FROM STDIN: une seule instruction pour tout le lot"""
+        buffer = io.StringIO()
+        for value in values:
+            buffer.write(','.join(_csv_field(value[name]) for name in columns))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        connection = db.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.copy_expert(
+                f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    def start(self):
+        """Démarre le thread d'écriture"""
+        def loop():
+            while not self._closed:
+                with self._cond:
+                    if len(self._queue) < self.batch_size:
+                        self._cond.wait(self.flush_interval)
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"Erreur vidage télémétrie: {e}")
+
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def close(self):
+        """Arrête le thread d'écriture et écrit ce qui reste en file"""
+        self._closed = True
+        with self._cond:
+            self._cond.notify_all()
+        self.flush()
+
+    def stats(self) -> dict:
+        """Statistiques de la file d'écriture"""
+        with self._cond:
+            return {
+                'queue_depth': len(self._queue),
+                'retry_batches': len(self._retries),
+                'max_queue': self.max_queue,
+                'overflow_policy': self.overflow_policy,
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'flushes': self.flushes,
+                'errors': self.errors
+            }
+
+def _on_event_loop() -> bool:
+    """Vrai si l'appelant s'exécute sur une boucle asyncio (il ne doit pas bloquer)"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+def _csv_field(value) -> str:
+    """
+    Champ CSV pour COPY: NULL en champ vide non quoté, chaînes toujours quotées
+
+    Le module csv ne distingue pas None de '' (QUOTE_MINIMAL) ou les quote
+    tous deux (QUOTE_NONNUMERIC); COPY lirait alors '' au lieu de NULL.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, (bool, int, float)):
+        return str(value)
+    text = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+    return '"' + text.replace('"', '""') + '"'
+
+def _column_default(column):
+    """Valeur par défaut Python d'une colonne (les INSERT groupés ne l'appliquent pas d'eux-mêmes)"""
+    default = column.default
+    if default is None:
+        return None
+    if default.is_callable:
+        return default.arg(None)
+    return default.arg
+
+_writer: Optional[TelemetryWriter] = None
+_writer_lock = threading.Lock()
+
+def get_telemetry_writer() -> TelemetryWriter:
+    """Retourne l'écrivain partagé, démarré au premier usage"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                writer = TelemetryWriter(
+                    flush_interval=app.config.get('TELEMETRY_FLUSH_INTERVAL_MS', 500) / 1000,
+                    batch_size=app.config.get('TELEMETRY_BATCH_SIZE', 500),
+                    max_queue=app.config.get('TELEMETRY_MAX_QUEUE', 10000),
+                    overflow_policy=app.config.get('TELEMETRY_OVERFLOW_POLICY', 'drop_oldest')
+                )
+                writer.start()
+                _writer = writer
+    return _writer
@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+import pytest
+
+# L'application lit sa configuration à l'import: base SQLite jetable, sans contrôle des migrations
+_DB_DIR = tempfile.mkdtemp(prefix='chessbot-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_DB_DIR, 'tests.db')}"
+os.environ['DB_SCHEMA_CHECK'] = 'false'
+os.environ.setdefault('SESSION_SECRET', 'tests')
+
+# Importée d'abord, comme par main.py: les modules du bot importent app, qui importe leurs routes
+import app  # noqa: E402,F401
+
+@pytest.fixture
+def database():
+    """Contexte applicatif sur une base migrée, vidée après le test"""
+    from app import app, db
+    from migrations import upgrade
+
+    with app.app_context():
+        upgrade(db.engine)
+        yield db
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import pytest
+
+from models import ActivityRollup, TelegramUser, UserActivity
+from utils import rollup_activity_hours, truncate_datetime
+
+@pytest.fixture
+def user(database):
+    user = TelegramUser(telegram_id=42)
+    database.session.add(user)
+    database.session.commit()
+    return user
+
+def add_activities(database, user, *timestamps):
+    for created_at in timestamps:
+        database.session.add(UserActivity(user_id=user.id, activity_type='move', created_at=created_at))
+    database.session.commit()
+
+def rollups(database):
+    rows = database.session.query(ActivityRollup).order_by(ActivityRollup.bucket_start).all()
+    return [(row.bucket_start, row.activity_count) for row in rows]
+
+def test_truncate_datetime():
+    value = datetime(2026, 3, 4, 15, 42, 17, 123)
+    assert truncate_datetime(value, 'minute') == datetime(2026, 3, 4, 15, 42)
+    assert truncate_datetime(value, 'hour') == datetime(2026, 3, 4, 15)
+    assert truncate_datetime(value, 'day') == datetime(2026, 3, 4)
+
+def test_nothing_to_roll_up(database):
+    assert rollup_activity_hours(datetime(2026, 3, 4, 12)) == 0
+
+def test_buckets_complete_hours_including_empty_ones(database, user):
+    add_activities(database, user,
+                   datetime(2026, 3, 4, 10, 0, 0),
+                   datetime(2026, 3, 4, 10, 59, 59),
+                   datetime(2026, 3, 4, 12, 30),
+                   datetime(2026, 3, 4, 13, 5))  # heure en cours: pas encore cumulée
+
+    assert rollup_activity_hours(datetime(2026, 3, 4, 13, 20)) == 3
+    assert rollups(database) == [
+        (datetime(2026, 3, 4, 10), 2),
+        (datetime(2026, 3, 4, 11), 0),
+        (datetime(2026, 3, 4, 12), 1),
+    ]
+
+def test_resumes_after_last_rollup(database, user):
+    add_activities(database, user, datetime(2026, 3, 4, 10, 15))
+    assert rollup_activity_hours(datetime(2026, 3, 4, 11)) == 1
+
+    # Activités d'heures déjà cumulées ignorées, seules les nouvelles heures sont ajoutées
+    add_activities(database, user, datetime(2026, 3, 4, 10, 45), datetime(2026, 3, 4, 11, 30))
+    assert rollup_activity_hours(datetime(2026, 3, 4, 11, 59)) == 0
+    assert rollup_activity_hours(datetime(2026, 3, 4, 12, 1)) == 1
+    assert rollups(database) == [
+        (datetime(2026, 3, 4, 10), 1),
+        (datetime(2026, 3, 4, 11), 1),
+    ]
@@ -0,0 +1,27 @@
+import struct
+
+import pytest
+
+from callback_data import GameCallback, KIND_MOVE, KIND_PAGE, PREFIX, decode_callback, encode_callback
+
+@pytest.mark.parametrize('kind, game_id, ply, arg', [
+    (KIND_MOVE, 1, 0, 0),
+    (KIND_MOVE, 123456, 57, 41),
+    (KIND_PAGE, 2 ** 32 - 1, 2 ** 16 - 1, 255),
+])
+def test_round_trip(kind, game_id, ply, arg):
+    data = encode_callback(kind, game_id, ply, arg)
+    assert data.startswith(PREFIX)
+    assert decode_callback(data) == GameCallback(kind, game_id, ply, arg)
+
+def test_fits_telegram_limit():
+    # callback_data est limité à 64 octets par Telegram
+    assert len(encode_callback(KIND_PAGE, 2 ** 32 - 1, 2 ** 16 - 1, 255).encode()) <= 64
+
+@pytest.mark.parametrize('data', [None, '', 'new_game', 'game_12', 'move_e2e4', PREFIX, PREFIX + '!!!', PREFIX + 'AQID'])
+def test_decode_rejects_other_buttons(data):
+    assert decode_callback(data) is None
+
+def test_encode_rejects_out_of_range_values():
+    with pytest.raises(struct.error):
+        encode_callback(KIND_MOVE, 1, 2 ** 16, 0)
@@ -0,0 +1,41 @@
+import random
+
+import chess
+import pytest
+
+from keyboard_cache import bulk_san
+
+POSITIONS = [
+    chess.STARTING_FEN,
+    # Cavaliers et tours rivaux: désambiguïsation par colonne, rangée ou les deux
+    '7k/8/8/1N3N2/8/1N3N2/8/K7 w - - 0 1',
+    'k7/8/8/8/R6R/8/8/K6R w - - 0 1',
+    # Promotions avec et sans prise, échec
+    '1r2k3/P7/8/8/8/8/8/4K3 w - - 0 1',
+    # Prise en passant
+    'rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3',
+    # Roques des deux côtés
+    'r3k2r/pppppppp/8/8/8/8/PPPPPPPP/R3K2R w KQkq - 0 1',
+    # Mat du couloir (Qd8#)
+    '6k1/5ppp/8/8/8/8/5PPP/3Q2K1 w - - 0 1',
+]
+
+def assert_matches_board_san(board: chess.Board):
+    moves = list(board.legal_moves)
+    sans = bulk_san(board, moves)
+    assert sans == {move: board.san(move) for move in moves}
+
+@pytest.mark.parametrize('fen', POSITIONS)
+def test_bulk_san_matches_board_san(fen):
+    assert_matches_board_san(chess.Board(fen))
+
+def test_bulk_san_matches_board_san_along_random_games():
+    rng = random.Random(20)
+    for _ in range(20):
+        board = chess.Board()
+        while not board.is_game_over() and board.ply() < 120:
+            assert_matches_board_san(board)
+            board.push(rng.choice(list(board.legal_moves)))
+
+def test_bulk_san_without_moves():
+    assert bulk_san(chess.Board(), []) == {}
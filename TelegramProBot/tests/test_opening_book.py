@@ -0,0 +1,54 @@
+import random
+from collections import Counter
+
+import chess
+
+from opening_book import OpeningBook
+
+def make_book(lines, min_plies=8, max_plies=12):
+    book = OpeningBook(min_plies=min_plies, max_plies=max_plies)
+    book._tree = OpeningBook._build_tree(lines)
+    return book
+
+def test_tree_sums_weights_of_shared_prefixes():
+    book = make_book([("e4 e5", 10), ("e4 c5", 5), ("d4 d5", 3)])
+    candidates = dict(book.candidates(chess.Board()))
+    assert candidates == {chess.Move.from_uci('e2e4'): 15, chess.Move.from_uci('d2d4'): 3}
+
+def test_invalid_line_keeps_valid_prefix():
+    book = make_book([("e4 Ke3", 7)])
+    assert dict(book.candidates(chess.Board())) == {chess.Move.from_uci('e2e4'): 7}
+
+def test_book_depth_grows_with_level():
+    book = make_book([], min_plies=8, max_plies=12)
+    assert [book.book_depth(level) for level in (-5, 0, 10, 20, 99)] == [8, 8, 10, 12, 12]
+
+def test_no_book_move_past_depth():
+    book = make_book([("e4 e5 Nf3", 1)], min_plies=1, max_plies=1)
+    board = chess.Board()
+    board.push_san('e4')
+    assert book.choose(board, 0) is None
+
+def test_out_of_book_position():
+    assert make_book([("e4 e5", 1)]).choose(chess.Board('8/8/8/8/8/8/8/K6k w - - 0 1'), 10) is None
+
+def _frequencies(book, level, draws=4000):
+    random.seed(4)
+    counts = Counter(book.choose(chess.Board(), level).uci() for _ in range(draws))
+    return counts['e2e4'] / draws
+
+def test_weights_sharpen_with_level():
+    book = make_book([("e4", 9), ("d4", 1)])
+    # Niveau 0: poids aplatis (exposant 0), niveau 20: poids au carré
+    assert abs(_frequencies(book, 0) - 0.5) < 0.05
+    assert abs(_frequencies(book, 10) - 0.9) < 0.03
+    assert _frequencies(book, 20) > 0.97
+
+def test_builtin_lines_are_legal():
+    book = OpeningBook()
+    assert book.candidates(chess.Board())
+    board = chess.Board()
+    for _ in range(6):
+        move = book.choose(board, 20)
+        assert move in board.legal_moves
+        board.push(move)
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+import pytest
+
+from send_scheduler import TokenBucket, _seconds
+
+def make_bucket(rate, capacity):
+    bucket = TokenBucket(rate, capacity)
+    bucket.updated = 0.0
+    return bucket
+
+def test_burst_then_rate():
+    bucket = make_bucket(rate=1.0, capacity=3)
+    for _ in range(3):
+        assert bucket.delay(0.0) == 0
+        bucket.take(0.0)
+    assert bucket.delay(0.0) == pytest.approx(1.0)
+    assert bucket.delay(0.5) == pytest.approx(0.5)
+    assert bucket.delay(1.0) == 0
+
+def test_refill_is_capped():
+    bucket = make_bucket(rate=10.0, capacity=2)
+    bucket.take(0.0)
+    bucket.take(0.0)
+    bucket.delay(100.0)
+    assert bucket.tokens == 2
+
+def test_pause_delays_even_with_tokens():
+    bucket = make_bucket(rate=1.0, capacity=5)
+    bucket.pause(4.0)
+    bucket.pause(2.0)  # une pause plus courte ne raccourcit pas la précédente
+    assert bucket.delay(1.0) == pytest.approx(3.0)
+    assert bucket.delay(4.0) == 0
+
+def test_idle_only_when_full_and_unpaused():
+    bucket = make_bucket(rate=1.0, capacity=2)
+    assert bucket.idle(0.0)
+    bucket.take(0.0)
+    assert not bucket.idle(0.5)
+    assert bucket.idle(1.0)
+    bucket.pause(3.0)
+    assert not bucket.idle(2.0)
+
+def test_retry_after_seconds():
+    assert _seconds(5) == 5.0
+    assert _seconds(timedelta(seconds=2.5)) == 2.5
@@ -0,0 +1,51 @@
+import pytest
+
+import update_dispatcher
+from update_dispatcher import RecentUpdates, update_user_id
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(update_dispatcher.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_remembers_within_window(clock):
+    recent = RecentUpdates(window=10)
+    recent.add(1)
+    clock[0] += 9
+    assert 1 in recent
+    assert 2 not in recent
+
+def test_forgets_after_window(clock):
+    recent = RecentUpdates(window=10)
+    recent.add(1)
+    clock[0] += 5
+    recent.add(2)
+    clock[0] += 6
+    assert 1 not in recent
+    assert 2 in recent
+    assert len(recent) == 1
+
+def test_bounded_oldest_first(clock):
+    recent = RecentUpdates(window=60, max_entries=3)
+    for update_id in range(5):
+        recent.add(update_id)
+    assert [update_id in recent for update_id in range(5)] == [False, False, True, True, True]
+
+def test_readd_refreshes(clock):
+    recent = RecentUpdates(window=10)
+    recent.add(1)
+    clock[0] += 8
+    recent.add(1)
+    clock[0] += 8
+    assert 1 in recent
+
+@pytest.mark.parametrize('update, user_id', [
+    ({'update_id': 1, 'message': {'from': {'id': 7}}}, 7),
+    ({'update_id': 1, 'callback_query': {'from': {'id': 8}}}, 8),
+    ({'update_id': 1, 'poll_answer': {'user': {'id': 9}}}, 9),
+    ({'update_id': 1, 'channel_post': {'chat': {'id': -1}}}, None),
+    ({'update_id': 1, 'message': {'chat': {'id': 3}}}, None),
+])
+def test_update_user_id(update, user_id):
+    assert update_user_id(update) == user_id
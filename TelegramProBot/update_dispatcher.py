@@ -0,0 +1,327 @@
+import time
+import atexit
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Tuple
+
+from telegram import Update
+
+from app import app
+
+logger = logging.getLogger(__name__)
+
+# Champs d'un update portant l'utilisateur à l'origine de l'action
+USER_UPDATE_FIELDS = ('message', 'edited_message', 'callback_query', 'inline_query', 'chosen_inline_result',
+                      'shipping_query', 'pre_checkout_query', 'poll_answer', 'my_chat_member', 'chat_member')
+
+def update_user_id(update_data: dict) -> Optional[int]:
+    """Identifiant Telegram de l'auteur d'un update brut (None si aucun)"""
+    for field in USER_UPDATE_FIELDS:
+        payload = update_data.get(field)
+        if payload:
+            user = payload.get('from') or payload.get('user')
+            return user.get('id') if user else None
+    return None
+
+class RecentUpdates:
+    """
+    update_id vus récemment, pour écarter les redistributions de Telegram
+
+    Un identifiant est oublié après window secondes ou quand plus de
+    max_entries identifiants sont suivis (les plus anciens d'abord).
+    """
+
+    def __init__(self, window: float = 600.0, max_entries: int = 100000):
+        self.window = window
+        self.max_entries = max_entries
+        self._seen: "OrderedDict[int, float]" = OrderedDict()
+
+    def __contains__(self, update_id: int) -> bool:
+        self._expire(time.monotonic())
+        return update_id in self._seen
+
+    def add(self, update_id: int):
+        now = time.monotonic()
+        self._seen[update_id] = now
+        self._seen.move_to_end(update_id)
+        self._expire(now)
+
+    def _expire(self, now: float):
+        while self._seen:
+            update_id, seen_at = next(iter(self._seen.items()))
+            if len(self._seen) <= self.max_entries and now - seen_at < self.window:
+                break
+            self._seen.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+class UpdateDispatcher:
+    """
+    Traitement des updates Telegram sur une boucle asyncio persistante
+
+    Le webhook confie l'update (JSON déjà décodé) à submit() et répond aussitôt
+    à Telegram; une boucle unique, dans un thread dédié, garde l'Application
+    et son client HTTP initialisés. Les updates sont répartis par utilisateur
+    dans des files FIFO (lanes): ceux d'un même utilisateur sont traités dans
+    l'ordre, un à la fois, ceux d'utilisateurs différents en parallèle, au
+    plus `workers` à la fois. Une lane est bornée à lane_size updates et
+    libérée après lane_idle_timeout secondes sans activité; l'ensemble est
+    borné à max_queue updates en attente. Ces bornes sont vérifiées dans
+    submit(), avant que l'update soit mémorisé: un update refusé n'est pas
+    acquitté et Telegram le renvoie plus tard. Un update_id déjà accepté dans les
+    dedup_window dernières secondes est acquitté sans être traité.
+
+    Le démarrage (getMe, initialisation de l'Application) se fait sur la
+    boucle, sans bloquer l'appelant: tant qu'il n'a pas abouti, submit()
+    refuse les updates et Telegram les renvoie plus tard. Si la boucle
+    s'arrête sur une erreur, elle est relancée après un délai croissant
+    (restart_delay, doublé à chaque échec jusqu'à max_restart_delay).
+    """
+
+    def __init__(self, max_queue: int = 1000, workers: int = 8, lane_size: int = 20,
+                 lane_idle_timeout: float = 60.0, dedup_window: float = 600.0,
+                 dedup_max_entries: int = 100000, latency_window: int = 500,
+                 restart_delay: float = 1.0, max_restart_delay: float = 60.0):
+        self.max_queue = max_queue
+        self.workers = workers
+        self.lane_size = lane_size
+        self.lane_idle_timeout = lane_idle_timeout
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lanes: Dict[Optional[int], Tuple[asyncio.Queue, asyncio.Task]] = {}
+        # Updates acceptés et pas encore traités, par utilisateur (protégé par _lock)
+        self._lane_depths: Dict[Optional[int], int] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._application = None
+        self._ready = threading.Event()
+        self._closed = threading.Event()
+        self._stopping: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._recent = RecentUpdates(dedup_window, dedup_max_entries)
+
+        self._pending = 0
+        self._wait_times = deque(maxlen=latency_window)
+        self._process_times = deque(maxlen=latency_window)
+        self.accepted = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.processed = 0
+        self.failed = 0
+        self.lane_overflows = 0
+        self.lanes_created = 0
+        self.lanes_reclaimed = 0
+        self.restarts = 0
+
+    def submit(self, update_data: dict) -> bool:
+        """
+        Met un update en file (appelable depuis n'importe quel thread)
+
+        Returns:
+            bool: False si la file est pleine ou le dispatcher arrêté;
+                True si l'update est accepté ou déjà reçu
+        """
+        update_id = update_data.get('update_id')
+        user_id = update_user_id(update_data)
+
+        with self._lock:
+            if update_id in self._recent:
+                # Redistribution d'un update déjà accepté: acquitté sans nouveau traitement
+                self.duplicates += 1
+                return True
+            # Refusés sans être mémorisés: la nouvelle tentative de Telegram doit pouvoir passer
+            if not self._ready.is_set() or self._pending >= self.max_queue:
+                self.rejected += 1
+                return False
+            lane_depth = self._lane_depths.get(user_id, 0)
+            if lane_depth >= self.lane_size:
+                # Rafale d'un seul utilisateur: refusé sans bloquer les autres
+                self.lane_overflows += 1
+                return False
+            self._lane_depths[user_id] = lane_depth + 1
+            self._recent.add(update_id)
+            self._pending += 1
+            self.accepted += 1
+
+        self._loop.call_soon_threadsafe(self._route, user_id, update_data, time.monotonic())
+        return True
+
+    def _route(self, user_id: Optional[int], update_data: dict, enqueued_at: float):
+        """Place l'update dans la lane de son utilisateur (exécuté sur la boucle)"""
+        lane = self._lanes.get(user_id)
+        if lane is None:
+            queue = asyncio.Queue()
+            lane = (queue, asyncio.create_task(self._lane_worker(user_id, queue)))
+            self._lanes[user_id] = lane
+            self.lanes_created += 1
+
+        lane[0].put_nowait((update_data, enqueued_at))
+
+    def run(self, coroutine, timeout: float = 30.0):
+        """Exécute une coroutine sur la boucle du dispatcher et attend son résultat"""
+        if not self._ready.wait(timeout):
+            coroutine.close()
+            raise RuntimeError("Boucle de traitement des updates non démarrée")
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout)
+
+    def start(self):
+        """Démarre la boucle dans son thread, sans attendre qu'elle soit prête"""
+        self._thread = threading.Thread(target=self._run_loop, name='update-dispatcher', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        delay = self.restart_delay
+        try:
+            while not self._closed.is_set():
+                try:
+                    self._loop.run_until_complete(self._main())
+                    break
+                except Exception as e:
+                    self._ready.clear()
+                    self.restarts += 1
+                    logger.error(f"Arrêt de la boucle des updates: {e}, redémarrage dans {delay:g}s")
+                    self._closed.wait(delay)
+                    delay = min(delay * 2, self.max_restart_delay)
+        finally:
+            self._ready.clear()
+            self._loop.close()
+
+    async def _main(self):
+        # Import lazy pour éviter la référence circulaire
+        from bot import chess_bot
+
+        self._semaphore = asyncio.Semaphore(self.workers)
+        self._stopping = asyncio.Event()
+        if self._closed.is_set():
+            return
+
+        if chess_bot.application is None:
+            await chess_bot.initialize()
+        application = chess_bot.application
+        await application.initialize()
+        self._application = application
+
+        self._ready.set()
+        logger.info(f"Dispatcher d'updates démarré ({self.workers} utilisateurs en parallèle)")
+
+        await self._stopping.wait()
+        self._ready.clear()
+
+        # Terminer ce qui a déjà été accepté avant de fermer le client HTTP
+        deadline = time.monotonic() + 10
+        while self._pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._pending:
+            logger.warning(f"Arrêt avec {self._pending} updates non traités")
+
+        tasks = [task for _, task in self._lanes.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await application.shutdown()
+
+    async def _lane_worker(self, user_id: Optional[int], queue: asyncio.Queue):
+        """Traite une lane dans l'ordre d'arrivée, puis la libère une fois inactive"""
+        while True:
+            try:
+                update_data, enqueued_at = await asyncio.wait_for(queue.get(), self.lane_idle_timeout)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    del self._lanes[user_id]
+                    self.lanes_reclaimed += 1
+                    return
+                continue
+
+            async with self._semaphore:
+                await self._process(user_id, update_data, enqueued_at)
+
+    async def _process(self, user_id: Optional[int], update_data: dict, enqueued_at: float):
+        started = time.monotonic()
+        try:
+            update = Update.de_json(update_data, self._application.bot)
+            if update is None:
+                raise ValueError("Update invalide")
+            await self._application.process_update(update)
+            self.processed += 1
+        except Exception as e:
+            logger.error(f"Erreur traitement update {update_data.get('update_id')}: {e}")
+            self.failed += 1
+        finally:
+            with self._lock:
+                self._pending -= 1
+                if self._lane_depths.get(user_id, 0) <= 1:
+                    self._lane_depths.pop(user_id, None)
+                else:
+                    self._lane_depths[user_id] -= 1
+                self._wait_times.append(started - enqueued_at)
+                self._process_times.append(time.monotonic() - started)
+
+    def close(self):
+        """Arrête la boucle après avoir traité les updates en file"""
+        self._closed.set()
+        if self._loop is None or self._loop.is_closed():
+            return
+        if self._stopping is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._stopping.set)
+            except RuntimeError:
+                return
+        if self._thread is not None:
+            self._thread.join(15)
+
+    def stats(self) -> dict:
+        """Profondeur de file et latences (en millisecondes)"""
+        with self._lock:
+            wait_times = sorted(self._wait_times)
+            process_times = sorted(self._process_times)
+            return {
+                'running': self._ready.is_set(),
+                'restarts': self.restarts,
+                'workers': self.workers,
+                'queue_depth': self._pending,
+                'max_queue': self.max_queue,
+                'lanes': len(self._lanes),
+                'lane_size': self.lane_size,
+                'lanes_created': self.lanes_created,
+                'lanes_reclaimed': self.lanes_reclaimed,
+                'lane_overflows': self.lane_overflows,
+                'accepted': self.accepted,
+                'rejected': self.rejected,
+                'duplicates': self.duplicates,
+                'dedup_entries': len(self._recent),
+                'processed': self.processed,
+                'failed': self.failed,
+                'avg_wait_ms': (sum(wait_times) / len(wait_times) * 1000) if wait_times else 0,
+                'p95_wait_ms': wait_times[int(len(wait_times) * 0.95) - 1] * 1000 if wait_times else 0,
+                'avg_processing_ms': (sum(process_times) / len(process_times) * 1000) if process_times else 0,
+                'p95_processing_ms': process_times[int(len(process_times) * 0.95) - 1] * 1000 if process_times else 0
+            }
+
+_dispatcher: Optional[UpdateDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+def get_update_dispatcher() -> UpdateDispatcher:
+    """Retourne le dispatcher partagé, démarré au premier usage"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                dispatcher = UpdateDispatcher(
+                    max_queue=app.config.get('WEBHOOK_QUEUE_SIZE', 1000),
+                    workers=app.config.get('WEBHOOK_WORKERS', 8),
+                    lane_size=app.config.get('WEBHOOK_LANE_SIZE', 20),
+                    lane_idle_timeout=app.config.get('WEBHOOK_LANE_IDLE_TIMEOUT', 60),
+                    dedup_window=app.config.get('WEBHOOK_DEDUP_WINDOW', 600),
+                    dedup_max_entries=app.config.get('WEBHOOK_DEDUP_MAX_ENTRIES', 100000)
+                )
+                dispatcher.start()
+                _dispatcher = dispatcher
+    return _dispatcher
@@ -0,0 +1,191 @@
+import time
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from app import app, db
+from models import TelegramUser
+from stats_counters import get_stats_counters
+
+logger = logging.getLogger(__name__)
+
+class UserRef(NamedTuple):
+    """Identité d'un utilisateur résolu, sans objet ORM attaché à une session"""
+    id: int
+    telegram_id: int
+    username: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    language_code: Optional[str]
+
+def profile_fingerprint(api_user) -> Tuple:
+    """Champs de profil Telegram recopiés dans TelegramUser"""
+    return (api_user.username, api_user.first_name, api_user.last_name, api_user.language_code)
+
+class UserCache:
+    """
+    Cache telegram_id → TelegramUser.id et empreinte du profil
+
+    Une interaction d'un utilisateur connu dont le profil n'a pas changé ne
+    touche pas la base: seule sa dernière activité est notée en mémoire, puis
+    écrite par lot à intervalle régulier.
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+
+        self._users: "OrderedDict[int, Tuple[UserRef, Tuple]]" = OrderedDict()
+        self._last_activity: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.hits = 0
+        self.misses = 0
+        self.profile_updates = 0
+
+    def resolve(self, api_user) -> UserRef:
+        """
+        Récupère ou crée l'utilisateur correspondant à un utilisateur Telegram
+
+        Args:
+            api_user: telegram.User de la mise à jour
+
+        Returns:
+            UserRef: Identité de l'utilisateur en base
+        """
+        fingerprint = profile_fingerprint(api_user)
+        now = datetime.utcnow()
+
+        with self._lock:
+            cached = self._users.get(api_user.id)
+            if cached is not None and cached[1] == fingerprint:
+                self._users.move_to_end(api_user.id)
+                self._last_activity[cached[0].id] = now
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+
+        user = TelegramUser.query.filter_by(telegram_id=api_user.id).first()
+
+        if not user:
+            user = TelegramUser(
+                telegram_id=api_user.id,
+                username=api_user.username,
+                first_name=api_user.first_name,
+                last_name=api_user.last_name,
+                language_code=api_user.language_code,
+                is_bot=api_user.is_bot,
+                created_at=now,
+                last_activity=now
+            )
+            db.session.add(user)
+            db.session.commit()
+            get_stats_counters().user_created()
+            logger.info(f"Nouvel utilisateur créé: {api_user.id}")
+        elif profile_fingerprint(user) != fingerprint:
+            # Profil modifié côté Telegram: seule cette écriture est synchrone
+            user.username = api_user.username
+            user.first_name = api_user.first_name
+            user.last_name = api_user.last_name
+            user.language_code = api_user.language_code
+            user.last_activity = now
+            db.session.commit()
+            with self._lock:
+                self.profile_updates += 1
+        else:
+            with self._lock:
+                self._last_activity[user.id] = now
+
+        ref = UserRef(user.id, user.telegram_id, user.username, user.first_name,
+                      user.last_name, user.language_code)
+
+        with self._lock:
+            self._users[api_user.id] = (ref, fingerprint)
+            self._users.move_to_end(api_user.id)
+            while len(self._users) > self.max_entries:
+                self._users.popitem(last=False)
+
+        return ref
+
+    def invalidate(self, telegram_id: int):
+        """Oublie un utilisateur (supprimé ou modifié hors du bot)"""
+        with self._lock:
+            self._users.pop(telegram_id, None)
+
+    def flush(self) -> int:
+        """
+        Écrit les dernières activités accumulées
+
+        Returns:
+            int: Nombre d'utilisateurs mis à jour
+        """
+        with self._lock:
+            pending = self._last_activity
+            self._last_activity = {}
+
+        if not pending:
+            return 0
+
+        with app.app_context():
+            try:
+                db.session.bulk_update_mappings(TelegramUser, [
+                    {'id': user_id, 'last_activity': last_activity}
+                    for user_id, last_activity in pending.items()
+                ])
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Erreur écriture dernière activité: {e}")
+                db.session.rollback()
+                with self._lock:
+                    for user_id, last_activity in pending.items():
+                        self._last_activity.setdefault(user_id, last_activity)
+                return 0
+
+        return len(pending)
+
+    def start(self, interval: float = 30.0):
+        """Démarre l'écriture périodique des dernières activités"""
+        def loop():
+            while not self._closed:
+                time.sleep(interval)
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"Erreur vidage dernière activité: {e}")
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        atexit.register(self.close)
+
+    def close(self):
+        """Arrête l'écriture périodique et écrit ce qui reste en attente"""
+        self._closed = True
+        self.flush()
+
+    def stats(self) -> dict:
+        """Statistiques du cache d'utilisateurs"""
+        with self._lock:
+            return {
+                'entries': len(self._users),
+                'hits': self.hits,
+                'misses': self.misses,
+                'profile_updates': self.profile_updates,
+                'pending_activity': len(self._last_activity)
+            }
+
+_cache: Optional[UserCache] = None
+_cache_lock = threading.Lock()
+
+def get_user_cache() -> UserCache:
+    """Retourne le cache partagé, démarré au premier usage"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                cache = UserCache(app.config.get('USER_CACHE_SIZE', 100000))
+                cache.start(app.config.get('USER_ACTIVITY_FLUSH_INTERVAL', 30))
+                _cache = cache
+    return _cache
@@ -1,78 +1,63 @@
 import json
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from telegram import User as TelegramUserAPI
 
 from app import db
-from models import TelegramUser, UserActivity, SystemStats
+from models import TelegramUser, ChessGame, UserActivity, SystemStats
+from telemetry import get_telemetry_writer
+from user_cache import get_user_cache, UserRef
+from stats_counters import get_stats_counters
 
 logger = logging.getLogger(__name__)
 
-def get_or_create_user(telegram_user: TelegramUserAPI) -> TelegramUser:
-    """Récupère ou crée un utilisateur Telegram"""
-    user = TelegramUser.query.filter_by(telegram_id=telegram_user.id).first()
+def get_or_create_user(telegram_user: TelegramUserAPI) -> UserRef:
+    """
+    Récupère ou crée un utilisateur Telegram
     
-    if not user:
-        user = TelegramUser(
-            telegram_id=telegram_user.id,
-            username=telegram_user.username,
-            first_name=telegram_user.first_name,
-            last_name=telegram_user.last_name,
-            language_code=telegram_user.language_code,
-            is_bot=telegram_user.is_bot,
-            created_at=datetime.utcnow(),
-            last_activity=datetime.utcnow()
-        )
-        db.session.add(user)
-        logger.info(f"Nouvel utilisateur créé: {telegram_user.id}")
-    else:
-        # Mettre à jour les informations
-        user.username = telegram_user.username
-        user.first_name = telegram_user.first_name
-        user.last_name = telegram_user.last_name
-        user.language_code = telegram_user.language_code
-        user.last_activity = datetime.utcnow()
-    
-    db.session.commit()
-    return user
+    Passe par le cache d'identités: la base n'est lue qu'au premier contact
+    et n'est écrite que si le profil a changé; la dernière activité est
+    mise à jour par lot.
+    """
+    return get_user_cache().resolve(telegram_user)
 
 def track_user_activity(user_id: int, activity_type: str, description: str, 
                        data: Optional[Dict[str, Any]] = None, ip_address: Optional[str] = None):
-    """Enregistre une activité utilisateur"""
+    """Enregistre une activité utilisateur (écriture groupée en arrière-plan)"""
     try:
-        activity = UserActivity(
-            user_id=user_id,
-            activity_type=activity_type,
-            description=description,
-            data=json.dumps(data) if data else None,
-            ip_address=ip_address,
-            created_at=datetime.utcnow()
-        )
-        db.session.add(activity)
-        db.session.commit()
+        get_telemetry_writer().enqueue(UserActivity, {
+            'user_id': user_id,
+            'activity_type': activity_type,
+            'description': description,
+            'data': json.dumps(data) if data else None,
+            'ip_address': ip_address,
+            'created_at': datetime.utcnow()
+        })
+        
+        get_stats_counters().activity_recorded()
         
         logger.debug(f"Activité enregistrée: {activity_type} pour utilisateur {user_id}")
         
     except Exception as e:
         logger.error(f"Erreur enregistrement activité: {e}")
-        db.session.rollback()
 
 def record_system_metric(metric_name: str, value: float, metric_type: str = 'counter'):
-    """Enregistre une métrique système"""
+    """Enregistre une métrique système (écriture groupée en arrière-plan)"""
     try:
-        metric = SystemStats(
-            metric_name=metric_name,
-            metric_value=value,
-            metric_type=metric_type,
-            recorded_at=datetime.utcnow()
-        )
-        db.session.add(metric)
-        db.session.commit()
+        get_telemetry_writer().enqueue(SystemStats, {
+            'metric_name': metric_name,
+            'metric_value': value,
+            'metric_type': metric_type,
+            'recorded_at': datetime.utcnow()
+        })
         
     except Exception as e:
         logger.error(f"Erreur enregistrement métrique: {e}")
-        db.session.rollback()
+
+def _count_if(condition):
+    """Nombre de lignes vérifiant la condition (SUM conditionnel, portable SQLite/PostgreSQL)"""
+    return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
 
 def get_user_stats(user_id: int) -> Dict[str, Any]:
     """Récupère les statistiques d'un utilisateur"""
@@ -81,18 +66,26 @@ def get_user_stats(user_id: int) -> Dict[str, Any]:
         if not user:
             return {}
         
-        # Statistiques des parties
-        total_games = len(user.games)
-        active_games = len([g for g in user.games if g.status == 'active'])
-        finished_games = len([g for g in user.games if g.status == 'finished'])
-        
-        # Résultats
-        wins = len([g for g in user.games if g.result == 'white_wins'])
-        losses = len([g for g in user.games if g.result == 'black_wins'])
-        draws = len([g for g in user.games if g.result == 'draw'])
+        # Statistiques des parties et des coups en une seule requête agrégée
+        totals = db.session.query(
+                db.func.count(ChessGame.id).label('total_games'),
+                _count_if(ChessGame.status == 'active').label('active_games'),
+                _count_if(ChessGame.status == 'finished').label('finished_games'),
+                _count_if(ChessGame.result == 'white_wins').label('wins'),
+                _count_if(ChessGame.result == 'black_wins').label('losses'),
+                _count_if(ChessGame.result == 'draw').label('draws'),
+                db.func.coalesce(db.func.sum(ChessGame.move_count), 0).label('total_moves')
+            )\
+            .filter(ChessGame.user_id == user_id)\
+            .one()
         
-        # Statistiques des coups
-        total_moves = sum([g.move_count for g in user.games if g.move_count])
+        total_games = totals.total_games
+        active_games = int(totals.active_games)
+        finished_games = int(totals.finished_games)
+        wins = int(totals.wins)
+        losses = int(totals.losses)
+        draws = int(totals.draws)
+        total_moves = int(totals.total_moves)
         
         # Activité récente
         recent_activities = UserActivity.query.filter_by(user_id=user_id)\
@@ -118,7 +111,20 @@ def get_user_stats(user_id: int) -> Dict[str, Any]:
         return {}
 
 def get_system_stats() -> Dict[str, Any]:
-    """Récupère les statistiques système globales"""
+    """
+    Récupère les statistiques système globales
+    
+    Lecture des compteurs en mémoire, tenus à jour par événement et
+    recalés périodiquement par compute_system_stats.
+    """
+    try:
+        return get_stats_counters().snapshot()
+    except Exception as e:
+        logger.error(f"Erreur récupération stats système: {e}")
+        return {}
+
+def compute_system_stats() -> Dict[str, Any]:
+    """Calcule les statistiques système globales depuis la base"""
     try:
         from app import app
         with app.app_context():
@@ -141,12 +147,18 @@ def get_system_stats() -> Dict[str, Any]:
                 UserActivity.created_at >= datetime.utcnow().replace(hour=0, minute=0, second=0)
             ).count()
             
-            # Top utilisateurs actifs
-            top_users = db.session.query(TelegramUser)\
+            # Top utilisateurs actifs (compte fait par la base)
+            activity_count = db.func.count(UserActivity.id).label('activity_count')
+            top_users = db.session.query(
+                    TelegramUser.telegram_id,
+                    TelegramUser.first_name,
+                    TelegramUser.username,
+                    activity_count
+                )\
                 .join(UserActivity)\
                 .filter(UserActivity.created_at >= datetime.utcnow() - timedelta(days=7))\
                 .group_by(TelegramUser.id)\
-                .order_by(db.func.count(UserActivity.id).desc())\
+                .order_by(activity_count.desc())\
                 .limit(5)\
                 .all()
             
@@ -154,8 +166,7 @@ def get_system_stats() -> Dict[str, Any]:
                 {
                     'id': user.telegram_id,
                     'name': user.first_name or user.username or f"User {user.telegram_id}",
-                    'activity_count': len([a for a in user.activities 
-                                         if a.created_at >= datetime.utcnow() - timedelta(days=7)])
+                    'activity_count': user.activity_count
                 } for user in top_users
             ]
             
@@ -176,6 +187,172 @@ def get_system_stats() -> Dict[str, Any]:
         logger.error(f"Erreur récupération stats système: {e}")
         return {}
 
+# Granularités de l'histogramme d'activité et format SQLite du début de tranche
+HISTOGRAM_GRANULARITIES = {
+    'minute': (timedelta(minutes=1), '%Y-%m-%d %H:%M:00'),
+    'hour': (timedelta(hours=1), '%Y-%m-%d %H:00:00'),
+    'day': (timedelta(days=1), '%Y-%m-%d 00:00:00'),
+}
+
+# Au-delà de cette durée, les heures révolues sont lues dans la table de cumuls
+ROLLUP_MIN_RANGE = timedelta(hours=48)
+
+# Délai avant de figer une heure, le temps que la télémétrie en file soit écrite
+ROLLUP_GRACE = timedelta(minutes=5)
+
+def truncate_datetime(value: datetime, granularity: str) -> datetime:
+    """Début de la tranche contenant value"""
+    if granularity == 'minute':
+        return value.replace(second=0, microsecond=0)
+    if granularity == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _bucket_expression(granularity: str):
+    """Début de tranche calculé par la base: date_trunc sur PostgreSQL, strftime sur SQLite"""
+    if db.engine.dialect.name == 'postgresql':
+        return db.func.date_trunc(granularity, UserActivity.created_at)
+    return db.func.strftime(HISTOGRAM_GRANULARITIES[granularity][1], UserActivity.created_at)
+
+def _as_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+
+def _count_activities(start: datetime, end: datetime, granularity: str) -> Dict[datetime, int]:
+    """Activités par tranche sur [start, end), en une requête GROUP BY"""
+    bucket = _bucket_expression(granularity).label('bucket')
+    rows = db.session.query(bucket, db.func.count(UserActivity.id))\
+        .filter(UserActivity.created_at >= start)\
+        .filter(UserActivity.created_at < end)\
+        .group_by(bucket)\
+        .all()
+    return {_as_datetime(row[0]): row[1] for row in rows}
+
+def rollup_activity_hours(until: Optional[datetime] = None) -> int:
+    """
+    Complète la table des cumuls horaires jusqu'à l'heure révolue précédant until
+    
+    Seules les heures postérieures au dernier cumul sont calculées, en une
+    requête; les cumuls survivent au nettoyage des anciennes activités.
+    
+    Returns:
+        int: Nombre d'heures ajoutées
+    """
+    from models import ActivityRollup
+    
+    try:
+        end = truncate_datetime(until or datetime.utcnow(), 'hour')
+        
+        last = db.session.query(db.func.max(ActivityRollup.bucket_start)).scalar()
+        if last is not None:
+            start = _as_datetime(last) + timedelta(hours=1)
+        else:
+            first = db.session.query(db.func.min(UserActivity.created_at)).scalar()
+            if first is None:
+                return 0
+            start = truncate_datetime(_as_datetime(first), 'hour')
+        
+        if start >= end:
+            return 0
+        
+        counts = _count_activities(start, end, 'hour')
+        
+        # Une ligne par heure, y compris les heures sans activité, pour marquer la progression
+        rows = []
+        bucket = start
+        while bucket < end:
+            rows.append({'bucket_start': bucket, 'activity_count': counts.get(bucket, 0),
+                         'created_at': datetime.utcnow()})
+            bucket += timedelta(hours=1)
+        
+        db.session.bulk_insert_mappings(ActivityRollup, rows)
+        db.session.commit()
+        return len(rows)
+        
+    except Exception as e:
+        logger.error(f"Erreur cumul horaire des activités: {e}")
+        db.session.rollback()
+        return 0
+
+def get_activity_histogram(start: datetime, end: datetime, granularity: str = 'hour') -> List[Tuple[datetime, int]]:
+    """
+    Nombre d'activités par tranche de temps
+    
+    Args:
+        start: Début de la période (UTC)
+        end: Fin de la période (UTC, exclue)
+        granularity: 'minute', 'hour' ou 'day'
+        
+    Returns:
+        List[Tuple[datetime, int]]: (début de tranche, nombre), tranches vides incluses
+    """
+    if granularity not in HISTOGRAM_GRANULARITIES:
+        raise ValueError(f"Granularité inconnue: {granularity}")
+    
+    step = HISTOGRAM_GRANULARITIES[granularity][0]
+    first_bucket = truncate_datetime(start, granularity)
+    counts: Dict[datetime, int] = {}
+    
+    raw_start = start
+    if granularity != 'minute' and end - start > ROLLUP_MIN_RANGE:
+        # Heures révolues depuis les cumuls, fin de période depuis les activités brutes
+        from models import ActivityRollup
+        
+        rollup_end = truncate_datetime(min(end, datetime.utcnow() - ROLLUP_GRACE), 'hour')
+        rollup_activity_hours(rollup_end)
+        rollup_start = truncate_datetime(start, 'hour')
+        if rollup_start < start:
+            rollup_start += timedelta(hours=1)
+        
+        rows = ActivityRollup.query\
+            .filter(ActivityRollup.bucket_start >= rollup_start)\
+            .filter(ActivityRollup.bucket_start < rollup_end)\
+            .all()
+        for row in rows:
+            bucket = truncate_datetime(row.bucket_start, granularity)
+            counts[bucket] = counts.get(bucket, 0) + row.activity_count
+        
+        # Heure partielle du début de période, lue à la source
+        if rollup_start > start:
+            for bucket, count in _count_activities(start, rollup_start, granularity).items():
+                counts[bucket] = counts.get(bucket, 0) + count
+        raw_start = max(rollup_end, start)
+    
+    if raw_start < end:
+        for bucket, count in _count_activities(raw_start, end, granularity).items():
+            counts[bucket] = counts.get(bucket, 0) + count
+    
+    histogram = []
+    bucket = first_bucket
+    while bucket < end:
+        histogram.append((bucket, counts.get(bucket, 0)))
+        bucket += step
+    return histogram
+
+def get_opening_stats(limit: int = 1000) -> Dict[str, Any]:
+    """Répartition des ouvertures jouées dans les parties récentes"""
+    try:
+        from models import ChessGame
+        from eco import get_opening_classifier
+        
+        rows = db.session.query(ChessGame.pgn_moves)\
+            .filter(ChessGame.pgn_moves != '')\
+            .order_by(ChessGame.created_at.desc())\
+            .limit(limit)\
+            .all()
+        
+        openings = get_opening_classifier().opening_stats(row.pgn_moves for row in rows)
+        
+        return {
+            'games_analyzed': len(rows),
+            'openings': openings
+        }
+        
+    except Exception as e:
+        logger.error(f"Erreur statistiques d'ouvertures: {e}")
+        return {}
+
 def get_uptime() -> str:
     """Calcule le temps de fonctionnement du système"""
     # Simplification: calcul basé sur la première activité enregistrée
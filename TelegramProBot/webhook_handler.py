@@ -1,9 +1,8 @@
 from flask import Blueprint, request, jsonify
 import logging
-import asyncio
-from telegram import Update
 
 from app import app, socketio
+from update_dispatcher import get_update_dispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -23,18 +22,14 @@ def telegram_webhook():
             logger.warning("Webhook reçu avec JSON vide")
             return jsonify({'error': 'Données manquantes'}), 400
         
-        # Import lazy pour éviter la référence circulaire
-        from bot import chess_bot
-        
-        # Créer l'objet Update de python-telegram-bot
-        update = Update.de_json(update_data, chess_bot.application.bot)
-        
-        if not update:
+        if 'update_id' not in update_data:
             logger.warning("Impossible de parser l'update Telegram")
             return jsonify({'error': 'Update invalide'}), 400
         
-        # Traiter l'update de manière asynchrone
-        asyncio.run(process_telegram_update(update))
+        # Traitement sur la boucle du dispatcher: réponse immédiate à Telegram
+        if not get_update_dispatcher().submit(update_data):
+            logger.warning(f"File des updates pleine, update {update_data['update_id']} refusé")
+            return jsonify({'error': 'Surcharge, réessayer plus tard'}), 503
         
         # Émettre l'événement en temps réel
         emit_webhook_event(update_data)
@@ -45,15 +40,6 @@ def telegram_webhook():
         logger.error(f"Erreur webhook Telegram: {e}")
         return jsonify({'error': 'Erreur interne'}), 500
 
-async def process_telegram_update(update: Update):
-    """Traite un update Telegram de manière asynchrone"""
-    try:
-        # Traiter l'update avec le bot
-        await chess_bot.application.process_update(update)
-        
-    except Exception as e:
-        logger.error(f"Erreur traitement update: {e}")
-
 def emit_webhook_event(update_data):
     """Émet un événement webhook en temps réel"""
     try:
@@ -91,7 +77,7 @@ def set_webhook():
             return jsonify({'error': 'URL webhook requise'}), 400
         
         # Définir le webhook avec l'API Telegram
-        success = asyncio.run(set_telegram_webhook(webhook_url))
+        success = get_update_dispatcher().run(set_telegram_webhook(webhook_url))
         
         if success:
             app.config['WEBHOOK_URL'] = webhook_url
@@ -110,8 +96,8 @@ def set_webhook():
 async def set_telegram_webhook(webhook_url: str) -> bool:
     """Configure le webhook avec l'API Telegram"""
     try:
-        if not chess_bot.application:
-            await chess_bot.initialize()
+        # Import lazy pour éviter la référence circulaire
+        from bot import chess_bot
         
         bot = chess_bot.application.bot
         webhook_endpoint = f"{webhook_url}/webhook/telegram"